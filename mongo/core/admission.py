@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+    Admission Control: deadlines, per-class concurrency limits, load shedding
+"""
+
+from typing import Dict, Any, Optional, Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+import functools
+import threading
+import time
+
+from ..core.routing import read_route
+
+class Overloaded(RuntimeError):
+    """Запрос отброшен на входе: очередь класса переполнена или ожидание слишком долгое"""
+
+class DeadlineExceeded(TimeoutError):
+    """Истек срок запроса (до отправки в MongoDB или по maxTimeMS)"""
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[float]:
+    """Абсолютный срок (time.monotonic()) текущего запроса или None"""
+    return _deadline.get()
+
+def remaining_ms() -> Optional[float]:
+    """Остаток времени до срока, мс (None - срока нет)"""
+    deadline_at = _deadline.get()
+    if deadline_at is None:
+        return None
+    return (deadline_at - time.monotonic()) * 1000
+
+@contextmanager
+def deadline(timeout_ms: Optional[float] = None, at: Optional[float] = None):
+    """Срок выполнения: with deadline(500): ... Вложенный срок не продлевает внешний.
+
+    at - абсолютный срок из current_deadline() (перенос в рабочий поток).
+    """
+    if at is None and timeout_ms is not None:
+        at = time.monotonic() + timeout_ms / 1000
+    outer = _deadline.get()
+    if at is None or (outer is not None and outer < at):
+        at = outer
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+def max_time_ms() -> Optional[int]:
+    """maxTimeMS для MongoDB по текущему сроку; DeadlineExceeded, если срок уже истек"""
+    remaining = remaining_ms()
+    if remaining is None:
+        return None
+    if remaining <= 0:
+        raise DeadlineExceeded("deadline exceeded before query was sent")
+    return max(int(remaining), 1)
+
+@dataclass
+class QueryClassLimits:
+    """Ограничения класса запросов"""
+    max_concurrent: int
+    max_queue: int  # ожидающих слот; сверх - немедленный отказ
+    max_queue_ms: float  # дольше в очереди - отказ
+    deadline_ms: Optional[float] = None  # срок по умолчанию (если внешний не задан)
+
+# Классы ограничиваются раздельно: тяжелые агрегации и выборки занимают не
+# больше своих слотов и не вытесняют поиск. point - ограниченные чтения
+# (limit, страница), batch - пачки id (get_by_ids), scan - выборки без
+# limit (поддерево, все товары уровня), analytics - агрегации по каталогу
+DEFAULT_QUERY_CLASSES = {
+    "point": QueryClassLimits(max_concurrent=32, max_queue=256, max_queue_ms=50, deadline_ms=500),
+    "batch": QueryClassLimits(max_concurrent=8, max_queue=64, max_queue_ms=200, deadline_ms=3000),
+    "scan": QueryClassLimits(max_concurrent=4, max_queue=16, max_queue_ms=1000, deadline_ms=15000),
+    "analytics": QueryClassLimits(max_concurrent=2, max_queue=8, max_queue_ms=2000, deadline_ms=30000),
+}
+
+class ConcurrencyLimiter:
+    """Ограничение одновременных запросов класса с отказом по времени в очереди.
+
+    Новый запрос отбрасывается сразу (без ожидания), если очередь полна
+    или если сглаженное время ожидания последних запросов уже больше
+    max_queue_ms: при перегрузке клиент быстро получает Overloaded, а не
+    ждет, пока истечет его срок.
+    """
+
+    def __init__(self, name: str, limits: QueryClassLimits):
+        self.name = name
+        self.limits = limits
+        self._slots = threading.BoundedSemaphore(limits.max_concurrent)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._queue_ewma_ms = 0.0
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def _reject(self, reason: str) -> Overloaded:
+        with self._lock:
+            self.shed += 1
+        return Overloaded(f"{self.name}: {reason}")
+
+    def _record_wait(self, wait_ms: float) -> None:
+        self._queue_ewma_ms = 0.8 * self._queue_ewma_ms + 0.2 * wait_ms
+
+    @contextmanager
+    def slot(self):
+        if self._slots.acquire(blocking=False):
+            wait_ms = 0.0
+        else:
+            with self._lock:
+                if self._queued >= self.limits.max_queue:
+                    reason = "queue is full"
+                elif self._queue_ewma_ms > self.limits.max_queue_ms:
+                    reason = f"queue wait ~{self._queue_ewma_ms:.0f} ms"
+                else:
+                    reason = None
+                    self._queued += 1
+            if reason is not None:
+                raise self._reject(reason)
+
+            budget_ms = self.limits.max_queue_ms
+            remaining = remaining_ms()
+            if remaining is not None:
+                budget_ms = min(budget_ms, remaining)
+            start = time.monotonic()
+            acquired = budget_ms > 0 and self._slots.acquire(timeout=budget_ms / 1000)
+            wait_ms = (time.monotonic() - start) * 1000
+            with self._lock:
+                self._queued -= 1
+                self._record_wait(wait_ms)
+            if not acquired:
+                if remaining is not None and remaining <= self.limits.max_queue_ms:
+                    raise DeadlineExceeded(f"{self.name}: deadline exceeded in queue")
+                raise self._reject(f"waited {wait_ms:.0f} ms for a slot")
+
+        with self._lock:
+            if wait_ms == 0.0:
+                self._record_wait(0.0)
+            self.in_flight += 1
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"in_flight": self.in_flight, "queued": self._queued, "admitted": self.admitted,
+                    "shed": self.shed, "queue_wait_ms": round(self._queue_ewma_ms, 1)}
+
+class AdmissionController:
+    """Пропуск запросов по классам: срок по умолчанию + слот ограничителя"""
+
+    def __init__(self, classes: Optional[Dict[str, QueryClassLimits]] = None):
+        self.classes = dict(classes or DEFAULT_QUERY_CLASSES)
+        self.limiters = {name: ConcurrencyLimiter(name, limits) for name, limits in self.classes.items()}
+
+    @contextmanager
+    def admit(self, query_class: str):
+        limiter = self.limiters[query_class]
+        with deadline(limiter.limits.deadline_ms):
+            with limiter.slot():
+                yield
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+def admitted(query_class: str) -> Callable:
+    """Декоратор метода сервиса: класс запроса.
+
+    Класс - маршрут чтений (routing) и, если задан self.db_ops.admission,
+    ограничитель и срок по умолчанию.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with read_route(query_class):
+                controller = getattr(self.db_ops, "admission", None)
+                if controller is None:
+                    return func(self, *args, **kwargs)
+                with controller.admit(query_class):
+                    return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
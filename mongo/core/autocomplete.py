@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+    Autocomplete Prefix Index (in-process, без MongoDB)
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from array import array
+from bisect import bisect_left
+import heapq
+import json
+import time
+
+from ..core.database import QueryResult
+
+KIND_CATEGORY = 0
+KIND_PATH = 1
+KIND_TYPE = 2
+KIND_NAMES = {KIND_CATEGORY: "category", KIND_PATH: "path", KIND_TYPE: "type"}
+
+def fold(text: str) -> str:
+    """Нормализация для поиска: casefold + ё -> е"""
+    return text.casefold().replace("ё", "е")
+
+class PrefixIndex:
+    """Отсортированный массив ключей + bisect.
+
+    Ключи хранятся одним отсортированным списком строк, счетчики и типы
+    записей - в array. Диапазон префикса находится двумя bisect; для
+    коротких префиксов (самые широкие диапазоны) top-k считается заранее.
+    """
+
+    PRECOMPUTED_PREFIX_LEN = 2
+    PRECOMPUTED_K = 20
+
+    def __init__(self, entries: Dict[Tuple[int, str], int]):
+        ordered = sorted(entries.items(), key=lambda item: (fold(item[0][1]), item[0][0]))
+        self.keys: List[str] = [fold(text) for (_, text), _ in ordered]
+        self.texts: List[str] = [text for (_, text), _ in ordered]
+        self.kinds = array('B', [kind for (kind, _), _ in ordered])
+        self.counts = array('I', [count for _, count in ordered])
+
+        self._top: Dict[str, List[int]] = {}
+        for length in range(1, self.PRECOMPUTED_PREFIX_LEN + 1):
+            for prefix in {key[:length] for key in self.keys if len(key) >= length}:
+                lo, hi = self._range(prefix)
+                self._top[prefix] = self._top_k(lo, hi, self.PRECOMPUTED_K, None)
+
+    @classmethod
+    def from_dataframe(cls, df) -> "PrefixIndex":
+        """Построение из DataFrame исходного parquet (выход загрузчика)"""
+        entries: Dict[Tuple[int, str], int] = {}
+        for full_path, count in df.groupby('Category_FullPathName').size().items():
+            path_array = full_path.split('\\')
+            for depth in range(1, len(path_array) + 1):
+                name_key = (KIND_CATEGORY, path_array[depth - 1])
+                entries[name_key] = entries.get(name_key, 0) + int(count)
+                # Путь корня совпадает с его именем
+                if depth > 1:
+                    path_key = (KIND_PATH, "/".join(path_array[:depth]))
+                    entries[path_key] = entries.get(path_key, 0) + int(count)
+
+        for product_type, count in df.groupby('Offer_Type').size().items():
+            entries[(KIND_TYPE, product_type)] = int(count)
+        return cls(entries)
+
+    def save(self, path: str) -> None:
+        """Сохранение в JSON"""
+        entries = [[kind, text, count] for kind, text, count in zip(self.kinds, self.texts, self.counts)]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "PrefixIndex":
+        """Загрузка из JSON"""
+        with open(path, encoding="utf-8") as f:
+            return cls({(kind, text): count for kind, text, count in json.load(f)})
+
+    def _range(self, folded_prefix: str) -> Tuple[int, int]:
+        lo = bisect_left(self.keys, folded_prefix)
+        hi = bisect_left(self.keys, folded_prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def _top_k(self, lo: int, hi: int, k: int, kind: Optional[int]) -> List[int]:
+        positions = range(lo, hi) if kind is None else (i for i in range(lo, hi) if self.kinds[i] == kind)
+        return heapq.nlargest(k, positions, key=self.counts.__getitem__)
+
+    def complete(self, prefix: str, k: int = 10, kind: Optional[str] = None) -> QueryResult:
+        """Top-k вариантов по количеству товаров (kind: category/path/type)"""
+        start_time = time.perf_counter()
+        folded = fold(prefix)
+        kind_id = None if kind is None else {v: key for key, v in KIND_NAMES.items()}[kind]
+
+        if kind_id is None and k <= self.PRECOMPUTED_K and folded in self._top:
+            positions = self._top[folded][:k]
+        else:
+            positions = self._top_k(*self._range(folded), k, kind_id)
+
+        documents: List[Dict[str, Any]] = [
+            {"text": self.texts[i], "kind": KIND_NAMES[self.kinds[i]], "products": self.counts[i]}
+            for i in positions
+        ]
+        execution_time = time.perf_counter() - start_time
+        return QueryResult(documents, execution_time * 1000, query_info=f"Autocomplete: {prefix}")
+
+    def __len__(self) -> int:
+        return len(self.keys)
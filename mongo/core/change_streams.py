@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Change Stream Consumers
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import os
+import time
+from bson import Timestamp
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ..core.database import MongoDBBaseOperations, QueryResult
+
+ROLLUPS = "category_rollups"
+STREAM_STATE = "_change_stream_state"
+
+class ConsumerLeaseHeld(RuntimeError):
+    """Состояние потока занято: работает потребитель или идет пересчет"""
+
+class ConsumerLeaseLost(RuntimeError):
+    """Аренда потребителя истекла или перехвачена - батч не применен"""
+
+def _category_key(doc: Optional[Dict[str, Any]]) -> Optional[Tuple[str, Any, str]]:
+    """(partner, category.id, full_path) товара или None"""
+    if not doc or "category" not in doc:
+        return None
+    category = doc["category"]
+    return doc.get("partner"), category.get("id"), category.get("full_path", "")
+
+class CategoryCountMaintainer:
+    """Инкрементальное обновление metadata.total_products по change stream products.
+
+    Дельты копятся по категориям и применяются пачкой $inc в categories и
+    category_rollups (счетчики по каждому префиксу пути) в одной транзакции
+    вместе с resume token - после перезапуска поток продолжается с места
+    последнего примененного батча без двойного счета. Полный пересчет
+    (rebuild_rollups) сбрасывает token и задает точку старта потока сразу
+    после своего снимка.
+
+    Потребитель и пересчет не работают одновременно: документ состояния
+    служит арендой (owner, lease_until). run() берет ее и продлевает,
+    каждый батч применяется только пока аренда принадлежит потребителю;
+    rebuild_rollups() при занятой аренде отказывает (ConsumerLeaseHeld) -
+    иначе потребитель затер бы сброшенный token, а $set пересчета -
+    его $inc в полете. Потребитель нужно остановить перед пересчетом.
+
+    Для delete и переноса товара нужен предыдущий образ документа, поэтому
+    на products включается changeStreamPreAndPostImages (MongoDB 6.0+,
+    replica set).
+    """
+
+    def __init__(self, db_ops: MongoDBBaseOperations, consumer_name: str = "products_category_counts",
+                 batch_size: int = 500, max_await_ms: int = 1000, lease_sec: float = 30.0):
+        self.db_ops = db_ops
+        self.consumer_name = consumer_name
+        self.batch_size = batch_size
+        self.max_await_ms = max_await_ms
+        self.lease_sec = lease_sec
+        self.owner = f"{os.getpid()}-{os.urandom(4).hex()}"
+        self.events_processed = 0
+
+    def _acquire_lease(self, role: str) -> None:
+        """Аренда состояния потока: свободна, своя или истекла; иначе ConsumerLeaseHeld"""
+        state = self.db_ops.connection.get_collection(STREAM_STATE)
+        now = time.time()
+        free = {"$or": [{"owner": None}, {"owner": self.owner}, {"lease_until": {"$lt": now}}]}
+        try:
+            state.find_one_and_update(
+                {"_id": self.consumer_name, **free},
+                {"$set": {"owner": self.owner, "role": role, "lease_until": now + self.lease_sec}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            holder = state.find_one({"_id": self.consumer_name}) or {}
+            raise ConsumerLeaseHeld(f"{self.consumer_name}: held by {holder.get('role')} {holder.get('owner')} "
+                                    f"for {holder.get('lease_until', now) - now:.0f} s more") from None
+
+    def _renew_lease(self, session=None) -> None:
+        """Продление аренды; ConsumerLeaseLost, если она уже не наша"""
+        result = self.db_ops.connection.get_collection(STREAM_STATE).update_one(
+            {"_id": self.consumer_name, "owner": self.owner},
+            {"$set": {"lease_until": time.time() + self.lease_sec}}, session=session
+        )
+        if result.matched_count == 0:
+            raise ConsumerLeaseLost(f"{self.consumer_name}: lease lost")
+
+    def _release_lease(self) -> None:
+        self.db_ops.connection.get_collection(STREAM_STATE).update_one(
+            {"_id": self.consumer_name, "owner": self.owner},
+            {"$unset": {"owner": "", "role": "", "lease_until": ""}}
+        )
+
+    def enable_pre_images(self) -> None:
+        """Включение pre-images для products"""
+        db = self.db_ops.connection.db
+        db.command("collMod", "products", changeStreamPreAndPostImages={"enabled": True})
+
+    def rebuild_rollups(self) -> QueryResult:
+        """Полный пересчет category_rollups и metadata.total_products.
+
+        Пересчет читает снимок на момент T (readConcern snapshot,
+        atClusterTime), а в состоянии потока вместо старого resume token
+        сохраняется точка сразу после T: run() продолжит ровно с первого
+        события, не вошедшего в пересчет. Без replica set пересчет идет
+        без снимка и точки старта.
+
+        Работающий потребитель держит аренду состояния - тогда пересчет
+        отказывает с ConsumerLeaseHeld.
+        """
+        self._acquire_lease("rebuild")
+        try:
+            return self._rebuild_rollups()
+        finally:
+            self._release_lease()
+
+    def _rebuild_rollups(self) -> QueryResult:
+        start_at = self.db_ops.operation_time()
+        options: Dict[str, Any] = {"allowDiskUse": True}
+        if start_at is not None:
+            options["readConcern"] = {"level": "snapshot", "atClusterTime": start_at}
+        pipeline = [
+            {"$group": {"_id": {"partner": "$partner", "id": "$category.id", "path": "$category.full_path"},
+                        "count": {"$sum": 1}}},
+        ]
+        result = self.db_ops.aggregate("products", pipeline, options)
+
+        category_counts: Dict[str, int] = {}
+        deltas: Dict[Tuple[str, str], int] = {}
+        for doc in result.documents:
+            partner, path = doc["_id"]["partner"], doc["_id"].get("path") or ""
+            category_id = f"{partner}_{doc['_id'].get('id')}"
+            category_counts[category_id] = category_counts.get(category_id, 0) + doc["count"]
+            parts = path.split("/")
+            for depth in range(1, len(parts) + 1):
+                key = (partner, "/".join(parts[:depth]))
+                deltas[key] = deltas.get(key, 0) + doc["count"]
+
+        # Сначала обнуление, затем точные значения: категории без товаров тоже сбрасываются
+        category_ops = [UpdateMany({}, {"$set": {"metadata.total_products": 0}})] + [
+            UpdateOne({"_id": category_id}, {"$set": {"metadata.total_products": count}})
+            for category_id, count in category_counts.items()
+        ]
+        self.db_ops.bulk_write("categories", category_ops, ordered=True)
+
+        self.db_ops.connection.get_collection(ROLLUPS).delete_many({})
+        operations = [
+            UpdateOne({"_id": f"{partner}:{path}"},
+                      {"$set": {"partner": partner, "path": path, "level": path.count("/") + 1,
+                                "total_products": count}},
+                      upsert=True)
+            for (partner, path), count in deltas.items()
+        ]
+        rollups = self.db_ops.bulk_write(ROLLUPS, operations)
+
+        self.db_ops.connection.get_collection(STREAM_STATE).update_one(
+            {"_id": self.consumer_name, "owner": self.owner},
+            {"$set": {"resume_token": None,
+                      "start_at_operation_time": Timestamp(start_at.time, start_at.inc + 1) if start_at else None,
+                      "updated_at": time.time()}}
+        )
+        return rollups
+
+    def _load_state(self) -> Tuple[Optional[Dict[str, Any]], Optional[Timestamp]]:
+        """(resume token, точка старта после пересчета); token важнее"""
+        state = self.db_ops.connection.get_collection(STREAM_STATE).find_one({"_id": self.consumer_name}) or {}
+        token = state.get("resume_token")
+        return token, None if token else state.get("start_at_operation_time")
+
+    @staticmethod
+    def event_deltas(event: Dict[str, Any]) -> List[Tuple[Tuple[str, Any, str], int]]:
+        """Изменения счетчиков от одного события"""
+        operation = event["operationType"]
+        before = _category_key(event.get("fullDocumentBeforeChange"))
+        after = _category_key(event.get("fullDocument"))
+
+        if operation == "insert":
+            return [(after, 1)] if after else []
+        if operation == "delete":
+            return [(before, -1)] if before else []
+        if operation in ("update", "replace") and before != after:
+            return [(key, delta) for key, delta in [(before, -1), (after, 1)] if key]
+        return []
+
+    def _apply(self, deltas: Dict[Tuple[str, Any, str], int], resume_token: Dict[str, Any]) -> None:
+        """Применение дельт и сохранение resume token одной транзакцией"""
+        category_ops = []
+        rollup_deltas: Dict[Tuple[str, str], int] = {}
+        for (partner, category_id, full_path), delta in deltas.items():
+            if delta == 0:
+                continue
+            category_ops.append(UpdateOne({"_id": f"{partner}_{category_id}"},
+                                          {"$inc": {"metadata.total_products": delta}}))
+            parts = full_path.split("/")
+            for depth in range(1, len(parts) + 1):
+                key = (partner, "/".join(parts[:depth]))
+                rollup_deltas[key] = rollup_deltas.get(key, 0) + delta
+
+        rollup_ops = [
+            UpdateOne({"_id": f"{partner}:{path}"},
+                      {"$inc": {"total_products": delta},
+                       "$setOnInsert": {"partner": partner, "path": path, "level": path.count("/") + 1}},
+                      upsert=True)
+            for (partner, path), delta in rollup_deltas.items() if delta
+        ]
+
+        client = self.db_ops.connection.client
+        with client.start_session() as session:
+            def transaction(s):
+                db = self.db_ops.connection.db
+                if category_ops:
+                    db["categories"].bulk_write(category_ops, ordered=False, session=s)
+                if rollup_ops:
+                    db[ROLLUPS].bulk_write(rollup_ops, ordered=False, session=s)
+                # Аренда проверяется в той же транзакции: без нее батч откатывается
+                result = db[STREAM_STATE].update_one(
+                    {"_id": self.consumer_name, "owner": self.owner},
+                    {"$set": {"resume_token": resume_token, "updated_at": time.time(),
+                              "lease_until": time.time() + self.lease_sec}},
+                    session=s
+                )
+                if result.matched_count == 0:
+                    raise ConsumerLeaseLost(f"{self.consumer_name}: lease lost")
+            session.with_transaction(transaction)
+
+    def run(self, max_events: Optional[int] = None, idle_timeout_sec: Optional[float] = None) -> int:
+        """Чтение потока до max_events событий или idle_timeout_sec без событий.
+
+        ConsumerLeaseHeld - поток уже читает другой потребитель или идет пересчет.
+        """
+        self._acquire_lease("consumer")
+        try:
+            return self._run(max_events, idle_timeout_sec)
+        finally:
+            self._release_lease()
+
+    def _run(self, max_events: Optional[int], idle_timeout_sec: Optional[float]) -> int:
+        coll = self.db_ops.connection.get_collection("products")
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+
+        resume_after, start_at = self._load_state()
+        renewed_at = time.time()
+        processed = 0
+        last_event_time = time.time()
+        # Post-image на момент события (а не updateLookup), иначе update с
+        # последующим delete посчитался бы дважды
+        with coll.watch(pipeline, full_document="whenAvailable",
+                        full_document_before_change="whenAvailable",
+                        resume_after=resume_after, start_at_operation_time=start_at,
+                        max_await_time_ms=self.max_await_ms) as stream:
+            deltas: Dict[Tuple[str, Any, str], int] = {}
+            pending = 0
+            while stream.alive:
+                event = stream.try_next()
+                if event is not None:
+                    for key, delta in self.event_deltas(event):
+                        deltas[key] = deltas.get(key, 0) + delta
+                    pending += 1
+                    last_event_time = time.time()
+
+                # Батч закрывается по размеру или при паузе в потоке
+                if pending and (pending >= self.batch_size or event is None):
+                    self._apply(deltas, stream.resume_token)
+                    processed += pending
+                    self.events_processed += pending
+                    deltas, pending = {}, 0
+                    renewed_at = time.time()
+                elif time.time() - renewed_at > self.lease_sec / 3:
+                    self._renew_lease()
+                    renewed_at = time.time()
+
+                if max_events is not None and processed >= max_events:
+                    break
+                if idle_timeout_sec is not None and event is None and time.time() - last_event_time > idle_timeout_sec:
+                    break
+
+            # Token сохраняется и без событий: следующий запуск продолжит с этой точки
+            if pending or stream.resume_token is not None:
+                self._apply(deltas, stream.resume_token)
+                processed += pending
+                self.events_processed += pending
+
+        return processed
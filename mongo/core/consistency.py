@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Denormalization Consistency Checker
+"""
+
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+import time
+import pandas as pd
+from pymongo import UpdateOne, UpdateMany
+
+from ..core.database import MongoDBConnection, MongoDBBaseOperations, QueryResult
+
+PRODUCT_FIELDS = {
+    "partner": 1, "category.id": 1, "category.name": 1, "category.full_path": 1,
+    "category.depth": 1, "category.breadcrumbs.name": 1
+}
+
+def _compare_frame(rows: List[tuple], tree: pd.DataFrame) -> pd.DataFrame:
+    """Векторное сравнение пачки товаров с деревом; возвращает расхождения"""
+    frame = pd.DataFrame(rows, columns=["_id", "key", "name", "full_path", "depth", "breadcrumbs"])
+    merged = frame.merge(tree, how="left", left_on="key", right_index=True)
+
+    missing = merged["expected_path"].isna()
+    wrong_path = merged["full_path"] != merged["expected_path"]
+    wrong_crumbs = merged["breadcrumbs"] != merged["expected_path"]
+    wrong_name = merged["name"] != merged["expected_name"]
+    wrong_depth = merged["depth"].fillna(-1).astype("int64") != merged["expected_level"].fillna(-2).astype("int64")
+
+    merged["problem"] = None
+    merged.loc[wrong_depth, "problem"] = "depth"
+    merged.loc[wrong_name, "problem"] = "name"
+    merged.loc[wrong_crumbs, "problem"] = "breadcrumbs"
+    merged.loc[wrong_path, "problem"] = "full_path"
+    merged.loc[missing, "problem"] = "missing_category"
+    return merged.loc[merged["problem"].notna(), ["_id", "key", "problem"]]
+
+def check_range(uri: str, database: str, lo: Any, hi: Any, tree: pd.DataFrame,
+                batch_size: int = 100000) -> Dict[str, Any]:
+    """Проверка одного диапазона _id (в дочернем процессе)"""
+    start_time = time.time()
+    checked = 0
+    counts: Dict[str, int] = {}
+    divergent: List[pd.DataFrame] = []
+
+    with MongoDBConnection(uri, database) as conn:
+        coll = conn.get_collection("products")
+        cursor = coll.find(MongoDBBaseOperations.id_range_query(lo, hi), PRODUCT_FIELDS).batch_size(10000)
+
+        rows = []
+        for doc in cursor:
+            category = doc.get("category") or {}
+            rows.append((
+                doc["_id"],
+                f"{doc.get('partner')}_{category.get('id')}",
+                category.get("name"),
+                category.get("full_path"),
+                category.get("depth"),
+                "/".join(b.get("name", "") for b in category.get("breadcrumbs", []))
+            ))
+            if len(rows) >= batch_size:
+                divergent.append(_compare_frame(rows, tree))
+                checked += len(rows)
+                for key, n in pd.Series([r[1] for r in rows]).value_counts().items():
+                    counts[key] = counts.get(key, 0) + int(n)
+                rows = []
+        if rows:
+            divergent.append(_compare_frame(rows, tree))
+            checked += len(rows)
+            for key, n in pd.Series([r[1] for r in rows]).value_counts().items():
+                counts[key] = counts.get(key, 0) + int(n)
+
+    problems = pd.concat(divergent) if divergent else pd.DataFrame(columns=["_id", "key", "problem"])
+    return {
+        "checked": checked,
+        "counts": counts,
+        "problems": problems.to_dict("records"),
+        "seconds": time.time() - start_time
+    }
+
+class ConsistencyChecker:
+    """Сверка embedded category в products с коллекцией categories.
+
+    Дерево категорий загружается один раз и передается воркерам; товары
+    читаются параллельно по диапазонам _id, сравнение - векторное (pandas).
+    """
+
+    def __init__(self, connection: MongoDBConnection, workers: int = 4):
+        self.connection = connection
+        self.db_ops = MongoDBBaseOperations(connection)
+        self.workers = workers
+
+    def load_tree(self) -> pd.DataFrame:
+        """Ожидаемые значения по ключу partner_category_id"""
+        categories = self.db_ops.find("categories", {}, {
+            "projection": {"partner": 1, "category_id": 1, "name": 1, "path": 1, "level": 1,
+                           "metadata.total_products": 1}
+        }).documents
+        tree = pd.DataFrame({
+            "key": [f"{c['partner']}_{c['category_id']}" for c in categories],
+            "category_doc_id": [c["_id"] for c in categories],
+            "partner": [c["partner"] for c in categories],
+            # object: значения остаются типами Python (int/str), как в документах
+            "category_id": pd.Series([c["category_id"] for c in categories], dtype=object),
+            "expected_name": [c["name"] for c in categories],
+            "expected_path": [c["path"] for c in categories],
+            "expected_level": [c["level"] for c in categories],
+            "stored_total": [c.get("metadata", {}).get("total_products", 0) for c in categories],
+        })
+        return tree.drop_duplicates("key").set_index("key")
+
+    def check(self, ranges_per_worker: int = 2) -> QueryResult:
+        """Полная проверка; documents = расхождения по товарам и счетчикам"""
+        start_time = time.time()
+        tree = self.load_tree()
+        ranges = self.db_ops.split_id_ranges("products", self.workers * ranges_per_worker)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(check_range, self.connection.uri, self.connection.database_name, lo, hi, tree)
+                for lo, hi in ranges
+            ]
+            parts = [future.result() for future in futures]
+
+        problems = [problem for part in parts for problem in part["problems"]]
+        counts = pd.Series(dtype="int64")
+        for part in parts:
+            counts = counts.add(pd.Series(part["counts"], dtype="int64"), fill_value=0)
+
+        # Векторное сравнение счетчиков с metadata.total_products
+        actual = counts.reindex(tree.index, fill_value=0).astype("int64")
+        wrong_totals = tree.index[actual.values != tree["stored_total"].values]
+        for key in wrong_totals:
+            problems.append({"_id": tree.at[key, "category_doc_id"], "key": key, "problem": "total_products",
+                             "stored": int(tree.at[key, "stored_total"]), "actual": int(actual[key])})
+
+        execution_time = time.time() - start_time
+        checked = sum(part["checked"] for part in parts)
+        return QueryResult(problems, execution_time * 1000, count=len(problems),
+                           query_info=f"Checked {checked} products in {len(ranges)} ranges, {len(problems)} problems")
+
+    def repair(self, problems: List[Dict[str, Any]], tree: Optional[pd.DataFrame] = None) -> QueryResult:
+        """Исправление: товары переписываются по категории, счетчики - $set"""
+        start_time = time.time()
+        tree = tree if tree is not None else self.load_tree()
+
+        product_ops, category_ops = [], []
+        for key in {p["key"] for p in problems if p["problem"] not in ("total_products", "missing_category")}:
+            path = tree.at[key, "expected_path"]
+            path_array = path.split("/")
+            product_ops.append(UpdateMany(
+                {"partner": tree.at[key, "partner"], "category.id": tree.at[key, "category_id"]},
+                {"$set": {
+                    "category.name": tree.at[key, "expected_name"],
+                    "category.full_path": path,
+                    "category.depth": len(path_array),
+                    "category.breadcrumbs": [{"level": i, "name": name} for i, name in enumerate(path_array, 1)]
+                }}
+            ))
+        for problem in problems:
+            if problem["problem"] == "total_products":
+                category_ops.append(UpdateOne({"_id": problem["_id"]},
+                                              {"$set": {"metadata.total_products": problem["actual"]}}))
+
+        modified = self.db_ops.bulk_write("products", product_ops).count
+        modified += self.db_ops.bulk_write("categories", category_ops).count
+
+        execution_time = time.time() - start_time
+        return QueryResult([], execution_time * 1000, count=modified,
+                           query_info=f"Repaired {len(product_ops)} categories of products, {len(category_ops)} counters")
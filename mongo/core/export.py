@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Parallel Range Export (Parquet)
+"""
+
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import ObjectId
+
+from ..core.database import MongoDBConnection, MongoDBBaseOperations, QueryResult
+
+DEFAULT_PRODUCT_FIELDS = [
+    "_id", "partner", "offer_id", "name", "type",
+    "category.id", "category.full_path", "category.depth"
+]
+
+# Типы полей по умолчанию; остальные поля (в том числе _id - строка у
+# загрузчика, ObjectId или число в других коллекциях) определяются по
+# первому непустому значению в коллекции
+KNOWN_FIELD_TYPES = {
+    "partner": pa.string(),
+    "name": pa.string(),
+    "type": pa.string(),
+    "category.full_path": pa.string(),
+    "category.depth": pa.int64(),
+}
+
+def _get_path(doc: Dict[str, Any], field: str) -> Any:
+    """Значение по пути с точками ("category.full_path"); ObjectId - строкой"""
+    value = doc
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return str(value) if isinstance(value, ObjectId) else value
+
+def export_schema(coll, fields: List[str]) -> pa.Schema:
+    """Единая схема всех part-файлов.
+
+    Схема по первой пачке зависит от данных: колонка, пустая в первой
+    пачке (category.depth до backfill), получает тип null, и следующие
+    пачки и части не приводятся к ней.
+    """
+    schema_fields = []
+    for field in fields:
+        arrow_type = KNOWN_FIELD_TYPES.get(field)
+        if arrow_type is None:
+            doc = coll.find_one({field: {"$ne": None}}, {field: 1})
+            arrow_type = pa.array([_get_path(doc, field)]).type if doc else pa.string()
+        schema_fields.append(pa.field(field.replace(".", "_"), arrow_type))
+    return pa.schema(schema_fields)
+
+def export_range(uri: str, database: str, collection: str, lo: Any, hi: Any,
+                 fields: List[str], schema: pa.Schema, output_path: str,
+                 batch_size: int = 50000) -> Dict[str, Any]:
+    """Выгрузка одного диапазона _id в part-файл (выполняется в дочернем процессе).
+
+    Каждый процесс открывает собственный MongoClient: клиент нельзя
+    переносить через fork.
+    """
+    start_time = time.time()
+    projection = {field: 1 for field in fields}
+    rows = 0
+
+    def flush(batch: List[Dict[str, Any]]) -> None:
+        table = pa.Table.from_pydict({
+            column.name: [_get_path(doc, field) for doc in batch]
+            for column, field in zip(schema, fields)
+        }, schema=schema)
+        writer.write_table(table)
+
+    writer = pq.ParquetWriter(output_path, schema, compression="zstd")
+    try:
+        with MongoDBConnection(uri, database) as conn:
+            coll = conn.get_collection(collection, route="export")
+            cursor = coll.find(MongoDBBaseOperations.id_range_query(lo, hi), projection).batch_size(10000)
+
+            batch = []
+            for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    rows += len(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+                rows += len(batch)
+    finally:
+        writer.close()
+    return {"path": output_path, "rows": rows, "seconds": time.time() - start_time}
+
+class ParallelCollectionExporter:
+    """Экспорт коллекции в Parquet: диапазоны _id сканируются в пуле процессов"""
+
+    def __init__(self, connection: MongoDBConnection, workers: int = 4):
+        self.connection = connection
+        self.db_ops = MongoDBBaseOperations(connection)
+        self.workers = workers
+
+    def export(self, collection: str, output_dir: str, fields: Optional[List[str]] = None,
+               ranges_per_worker: int = 4, sample_size: int = 0) -> QueryResult:
+        """Выгрузка коллекции в output_dir/part-NNNNN.parquet"""
+        start_time = time.time()
+        fields = fields or DEFAULT_PRODUCT_FIELDS
+        path = Path(output_dir)
+        path.mkdir(parents=True, exist_ok=True)
+
+        schema = export_schema(self.connection.get_collection(collection, route="export"), fields)
+        ranges = self.db_ops.split_id_ranges(collection, self.workers * ranges_per_worker, sample_size)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(export_range, self.connection.uri, self.connection.database_name, collection,
+                            lo, hi, fields, schema, str(path / f"part-{i:05d}.parquet"))
+                for i, (lo, hi) in enumerate(ranges)
+            ]
+            parts = [future.result() for future in futures]
+
+        execution_time = time.time() - start_time
+        rows = sum(part["rows"] for part in parts)
+        return QueryResult(parts, execution_time * 1000, count=rows,
+                           query_info=f"Exported {rows} rows in {len(parts)} parts, {self.workers} workers")
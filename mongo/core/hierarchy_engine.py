@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Hierarchy Analytics Engine (in-memory, NumPy)
+"""
+
+from typing import Dict, Any, List, Iterable, Tuple, Optional
+import time
+import numpy as np
+
+from ..core.database import MongoDBBaseOperations, QueryResult
+
+class HierarchyAnalyticsEngine:
+    """Аналитика по дереву категорий в памяти.
+
+    Дерево хранится массивами индексов родителей, товары - массивом
+    целочисленных индексов категорий. Все подсчеты делаются через
+    np.bincount, результаты возвращаются в тех же формах QueryResult,
+    что и у AnalyticsService/ProductQueryService.
+    """
+
+    def __init__(self, categories: Iterable[Tuple[str, Any, List[str]]],
+                 products: Iterable[Tuple[str, Any]]):
+        self.partners: List[str] = []
+        self.names: List[str] = []
+        self.node_paths: List[Tuple[str, Tuple[str, ...]]] = []
+
+        partner_ids: Dict[str, int] = {}
+        name_ids: Dict[str, int] = {}
+        node_ids: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+        node_parent: List[int] = []
+        node_name: List[int] = []
+        node_partner: List[int] = []
+
+        self._category_index: Dict[Tuple[str, str], int] = {}
+        self.category_ids: List[Any] = []
+        cat_node: List[int] = []
+        cat_partner: List[int] = []
+        cat_chains: List[List[int]] = []
+        # Пропущенные строки: сверка с MongoDB не должна проходить молча при расхождении
+        self.conflicting_categories = 0
+        self.skipped_products = 0
+
+        # Узлы дерева: все префиксы путей категорий
+        for partner, category_id, path_array in categories:
+            key = (partner, str(category_id))
+            if key in self._category_index:
+                # Повтор (partner, category_id) с другим путем: учитывается только первый
+                if self.node_paths[cat_node[self._category_index[key]]][1] != tuple(path_array):
+                    self.conflicting_categories += 1
+                continue
+
+            if partner not in partner_ids:
+                partner_ids[partner] = len(self.partners)
+                self.partners.append(partner)
+
+            parent = -1
+            chain = []
+            for depth in range(1, len(path_array) + 1):
+                name = path_array[depth - 1]
+                if name not in name_ids:
+                    name_ids[name] = len(self.names)
+                    self.names.append(name)
+                chain.append(name_ids[name])
+
+                node_key = (partner, tuple(path_array[:depth]))
+                if node_key not in node_ids:
+                    node_ids[node_key] = len(self.node_paths)
+                    self.node_paths.append(node_key)
+                    node_parent.append(parent)
+                    node_name.append(name_ids[name])
+                    node_partner.append(partner_ids[partner])
+                parent = node_ids[node_key]
+
+            self._category_index[key] = len(self.category_ids)
+            self.category_ids.append(category_id)
+            cat_node.append(parent)
+            cat_partner.append(partner_ids[partner])
+            cat_chains.append(chain)
+
+        self._node_ids = node_ids
+        self.node_parent = np.asarray(node_parent, dtype=np.int32)
+        self.node_name = np.asarray(node_name, dtype=np.int32)
+        self.node_partner = np.asarray(node_partner, dtype=np.int32)
+        self.node_depth = np.asarray([len(path) for _, path in self.node_paths], dtype=np.int8)
+        self.max_depth = int(self.node_depth.max()) if len(self.node_depth) else 0
+        self._nodes_by_depth = [np.flatnonzero(self.node_depth == d) for d in range(self.max_depth + 1)]
+
+        self.cat_node = np.asarray(cat_node, dtype=np.int32)
+        self.cat_partner = np.asarray(cat_partner, dtype=np.int32)
+        self.cat_level = self.node_depth[self.cat_node].astype(np.int64)
+
+        # Матрица id имен по уровням для каждой категории (-1 - нет уровня)
+        self.cat_chain = np.full((len(cat_chains), max(self.max_depth, 1)), -1, dtype=np.int32)
+        for i, chain in enumerate(cat_chains):
+            self.cat_chain[i, :len(chain)] = chain
+
+        # Товары как массив индексов категорий
+        product_cat = []
+        for partner, category_id in products:
+            idx = self._category_index.get((partner, str(category_id)))
+            if idx is None:
+                self.skipped_products += 1
+            else:
+                product_cat.append(idx)
+        self.product_cat = np.asarray(product_cat, dtype=np.int32)
+        self.cat_total = np.bincount(self.product_cat, minlength=len(self.category_ids)).astype(np.int64)
+
+    @classmethod
+    def from_mongo(cls, db_ops: MongoDBBaseOperations) -> "HierarchyAnalyticsEngine":
+        """Построение из коллекций categories и products"""
+        categories_coll = db_ops.connection.get_collection("categories")
+        products_coll = db_ops.connection.get_collection("products")
+
+        categories = [
+            (doc["partner"], doc["category_id"], doc["path_array"])
+            for doc in categories_coll.find({}, {"partner": 1, "category_id": 1, "path_array": 1, "_id": 0})
+        ]
+        products = (
+            (doc["partner"], doc["category"]["id"])
+            for doc in products_coll.find({}, {"partner": 1, "category.id": 1, "_id": 0}).batch_size(10000)
+        )
+        return cls(categories, products)
+
+    @classmethod
+    def from_dataframe(cls, df) -> "HierarchyAnalyticsEngine":
+        """Построение из DataFrame исходного parquet"""
+        categories_df = df[['Partner_Name', 'Category_ID', 'Category_FullPathName']].drop_duplicates()
+        categories = [
+            (partner, category_id, full_path.split('\\'))
+            for partner, category_id, full_path in categories_df.itertuples(index=False)
+        ]
+        products = zip(df['Partner_Name'].tolist(), df['Category_ID'].tolist())
+        return cls(categories, products)
+
+    def _rollup(self, leaf_values: np.ndarray) -> np.ndarray:
+        """Суммирование значений узлов вверх по дереву"""
+        totals = leaf_values.astype(np.int64).copy()
+        for depth in range(self.max_depth, 1, -1):
+            nodes = self._nodes_by_depth[depth]
+            np.add.at(totals, self.node_parent[nodes], totals[nodes])
+        return totals
+
+    def _node_totals(self) -> np.ndarray:
+        """Количество товаров в поддереве каждого узла"""
+        own = np.bincount(self.cat_node, weights=self.cat_total, minlength=len(self.node_paths))
+        return self._rollup(own)
+
+    def get_hierarchy_stats(self, limit: int = 30) -> QueryResult:
+        """Статистика по уровням иерархии (аналог AnalyticsService.get_hierarchy_stats)"""
+        start_time = time.time()
+        n_names = len(self.names)
+
+        # Развертка path_array: (категория, позиция) -> (уровень категории, имя)
+        levels = self.cat_level
+        rows = np.repeat(np.arange(len(levels)), levels)
+        cols = np.arange(rows.size) - np.repeat(np.cumsum(levels) - levels, levels)
+        keys = levels[rows] * n_names + self.cat_chain[rows, cols]
+
+        size = (self.max_depth + 1) * n_names
+        present = np.bincount(keys, minlength=size) > 0
+        products = np.bincount(keys, weights=self.cat_total[rows], minlength=size).astype(np.int64)
+
+        found = np.flatnonzero(present)
+        order = found[np.argsort(-products[found], kind="stable")][:limit]
+
+        documents = [
+            {"_id": {"level": int(key // n_names), "name": self.names[key % n_names]},
+             "products": int(products[key])}
+            for key in order
+        ]
+        execution_time = time.time() - start_time
+        return QueryResult(documents, execution_time * 1000, query_info="NumPy hierarchy stats")
+
+    def get_partner_stats(self) -> QueryResult:
+        """Статистика по партнерам и уровням (аналог AnalyticsService.get_partner_stats)"""
+        start_time = time.time()
+        width = self.max_depth + 1
+        keys = self.cat_partner.astype(np.int64) * width + self.cat_level
+
+        size = len(self.partners) * width
+        categories = np.bincount(keys, minlength=size)
+        products = np.bincount(keys, weights=self.cat_total, minlength=size).astype(np.int64)
+
+        documents = []
+        for partner_id in sorted(range(len(self.partners)), key=lambda i: self.partners[i]):
+            for level in range(width):
+                key = partner_id * width + level
+                if categories[key]:
+                    documents.append({
+                        "_id": {"partner": self.partners[partner_id], "level": level},
+                        "categories": int(categories[key]),
+                        "products": int(products[key])
+                    })
+        execution_time = time.time() - start_time
+        return QueryResult(documents, execution_time * 1000, query_info="NumPy partner stats")
+
+    def aggregate_by_first_level_categories(self, limit: int = 10) -> QueryResult:
+        """Товары по категориям 1-го уровня (аналог ProductQueryService)"""
+        start_time = time.time()
+        root_names = self.cat_chain[:, 0]
+        counts = np.bincount(root_names, weights=self.cat_total, minlength=len(self.names)).astype(np.int64)
+
+        found = np.unique(root_names)
+        order = found[np.argsort(-counts[found], kind="stable")][:limit]
+
+        documents = [
+            {"category_name": self.names[name_id], "product_count": int(counts[name_id])}
+            for name_id in order
+        ]
+        execution_time = time.time() - start_time
+        return QueryResult(documents, execution_time * 1000, query_info="NumPy first level aggregation")
+
+    def get_level_counts(self) -> QueryResult:
+        """Количество категорий и товаров на каждом уровне"""
+        start_time = time.time()
+        width = self.max_depth + 1
+        categories = np.bincount(self.cat_level, minlength=width)
+        products = np.bincount(self.cat_level, weights=self.cat_total, minlength=width).astype(np.int64)
+
+        documents = [
+            {"level": level, "categories": int(categories[level]), "products": int(products[level])}
+            for level in range(1, width) if categories[level]
+        ]
+        execution_time = time.time() - start_time
+        return QueryResult(documents, execution_time * 1000, query_info="NumPy level counts")
+
+    def get_prefix_counts(self, path_prefix: str, partner: str = "_ozon") -> QueryResult:
+        """Количество товаров в поддереве и в каждом дочернем узле префикса"""
+        start_time = time.time()
+        path = tuple(part for part in path_prefix.split('/') if part)
+        node = self._node_ids.get((partner, path))
+
+        documents = []
+        if node is not None:
+            totals = self._node_totals()
+            children = np.flatnonzero(self.node_parent == node)
+            children = children[np.argsort(-totals[children], kind="stable")]
+
+            documents.append({"name": path[-1], "path": "/".join(path), "level": len(path),
+                              "products": int(totals[node])})
+            for child in children:
+                child_path = self.node_paths[child][1]
+                documents.append({"name": child_path[-1], "path": "/".join(child_path),
+                                  "level": len(child_path), "products": int(totals[child])})
+
+        execution_time = time.time() - start_time
+        return QueryResult(documents, execution_time * 1000, query_info=f"NumPy prefix counts: {path_prefix}")
@@ -69,11 +69,17 @@ class CategoryInfo:
     full_path: str
     breadcrumbs: List[BreadcrumbItem]
     
+    @property
+    def depth(self) -> int:
+        """Глубина категории (материализованная для индекса)"""
+        return len(self.breadcrumbs)
+    
     def to_dict(self) -> Dict[str, Any]:
         return {
             "id": self.id,
             "name": self.name,
             "full_path": self.full_path,
+            "depth": self.depth,
             "breadcrumbs": [item.to_dict() for item in self.breadcrumbs]
         }
 
@@ -144,10 +150,43 @@ class IndexSpecification:
     @staticmethod
     def compound_index(*fields: List[tuple]) -> List[tuple]:
         return list(*fields)
+    
+    @staticmethod
+    def path_prefix_index(field: str) -> Dict[str, Any]:
+        # Бинарная collation: порядок кодовых точек, диапазоны по префиксу корректны для кириллицы
+        return {"keys": [(field, 1)], "collation": QueryTemplates.PATH_COLLATION}
 
 class QueryTemplates:
     """Шаблоны запросов MongoDB"""
     
+    # Для диапазонов по пути нужна побайтовая (simple) collation: языковая
+    # collation "ru" сравнивает не кодовые точки, и граница префикса "съезжает"
+    PATH_COLLATION = {"locale": "simple"}
+    PATH_SEPARATOR = "/"
+    # Следующий за "/" символ: [prefix + "/", prefix + "0") - ровно потомки prefix
+    PATH_SENTINEL = chr(ord(PATH_SEPARATOR) + 1)
+    
+    @staticmethod
+    def split_path(path: str) -> List[str]:
+        return [part for part in path.replace('\\', '/').split('/') if part]
+    
+    @staticmethod
+    def by_path_prefix(field: str, path_prefix: str, position_field: str,
+                       include_self: bool = True) -> Dict[str, Any]:
+        """Поддерево по materialized path одним ограниченным диапазоном индекса.
+        
+        Диапазон [prefix, prefix + "0") захватывает сам узел и потомков, а также
+        соседей вида "prefix (...)" (символы меньше "/"); их отсекает проверка
+        имени на позиции уровня prefix (фильтр FETCH, не влияет на границы индекса).
+        """
+        parts = QueryTemplates.split_path(path_prefix)
+        prefix = QueryTemplates.PATH_SEPARATOR.join(parts)
+        lower = prefix if include_self else prefix + QueryTemplates.PATH_SEPARATOR
+        return {
+            field: {"$gte": lower, "$lt": prefix + QueryTemplates.PATH_SENTINEL},
+            position_field.format(index=len(parts) - 1): parts[-1]
+        }
+    
     @staticmethod
     def by_partner_and_level(partner: str, level: int) -> Dict[str, Any]:
         return {"partner": partner, "level": level}
@@ -170,6 +209,13 @@ class QueryTemplates:
     @staticmethod
     def by_breadcrumb_level_exists(level: int) -> Dict[str, Any]:
         return {f"category.breadcrumbs.{level-1}": {"$exists": True}}
+    
+    @staticmethod
+    def by_depth(level: int, product_type: Optional[str] = None) -> Dict[str, Any]:
+        query = {"category.depth": level}
+        if product_type is not None:
+            query["type"] = product_type
+        return query
 
 class StatisticsHelper:
     """Вспомогательные методы для статистики MongoDB"""
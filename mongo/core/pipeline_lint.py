@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Aggregation Pipeline Analyzer
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Set, Tuple
+import copy
+import re
+
+BLOCKING_STAGES = {"$group", "$sort", "$bucket", "$bucketAuto", "$facet", "$setWindowFields", "$sortByCount"}
+SHAPE_CHANGING_STAGES = {"$group", "$project", "$unwind", "$lookup", "$replaceRoot", "$replaceWith",
+                         "$facet", "$bucket", "$bucketAuto", "$sortByCount", "$count"}
+_ARRAY_POSITION_RE = re.compile(r"\.\d+(\.|$)")
+_FIELD_REF_RE = re.compile(r"^\$([A-Za-z_][\w.]*)$")
+
+@dataclass
+class PipelineIssue:
+    """Замечание линтера к стадии pipeline"""
+    stage_index: int
+    code: str
+    message: str
+    severity: str = "warning"
+
+    def __str__(self) -> str:
+        return f"[{self.severity}] stage {self.stage_index} {self.code}: {self.message}"
+
+@dataclass
+class PipelineReport:
+    """Результат анализа: замечания, примененные переписывания, статистика explain"""
+    collection: str
+    issues: List[PipelineIssue] = field(default_factory=list)
+    rewrites: List[str] = field(default_factory=list)
+    options: Dict[str, Any] = field(default_factory=dict)
+    explain_stats: List[Dict[str, Any]] = field(default_factory=list)
+
+def _stage_name(stage: Dict[str, Any]) -> str:
+    return next(iter(stage))
+
+def _query_fields(query: Dict[str, Any]) -> Set[str]:
+    """Поля, на которые ссылается условие $match"""
+    fields = set()
+    for key, value in query.items():
+        if key in ("$and", "$or", "$nor"):
+            for sub in value:
+                fields |= _query_fields(sub)
+        elif key == "$expr":
+            fields |= _expression_fields(value)
+        elif not key.startswith("$"):
+            fields.add(key)
+    return fields
+
+def _expression_fields(expression: Any) -> Set[str]:
+    """Поля "$a.b" внутри выражения агрегации"""
+    if isinstance(expression, str):
+        match = _FIELD_REF_RE.match(expression)
+        return {match.group(1)} if match and not expression.startswith("$$") else set()
+    if isinstance(expression, dict):
+        return set().union(*(_expression_fields(v) for v in expression.values())) if expression else set()
+    if isinstance(expression, list):
+        return set().union(*(_expression_fields(v) for v in expression)) if expression else set()
+    return set()
+
+def _is_prefix(prefix: str, path: str) -> bool:
+    """prefix совпадает с path или является его родителем ("a" для "a.b", но не для "ab")"""
+    return path == prefix or path.startswith(prefix + ".")
+
+def _covered(path: str, kept: Set[str]) -> bool:
+    """Значение path после стадии то же, что до нее: сохранен сам path или его предок"""
+    return any(_is_prefix(k, path) for k in kept)
+
+def _overlaps(path: str, paths: Set[str]) -> bool:
+    """path пересекается с одним из paths (совпадает, предок или потомок)"""
+    return any(_is_prefix(p, path) or _is_prefix(path, p) for p in paths)
+
+def _kept_fields(project: Dict[str, Any]) -> Set[str]:
+    """Полные пути, которые остаются после $project ({_id: 0} исключает _id)"""
+    kept = {k for k, v in project.items() if k != "_id" and v not in (0, False)}
+    return kept | ({"_id"} if project.get("_id", 1) not in (0, False) else set())
+
+class PipelineAnalyzer:
+    """Линтер и безопасные переписывания агрегаций.
+
+    Проверки: $match/$sort после стадий, меняющих форму документа (индекс
+    уже не используется), $exists по позиции в массиве, ссылки на поля,
+    потерянные после $group, и $sort без следующего $limit. Переписывания:
+    $match переносится раньше $sort/$project/$addFields, если не зависит от
+    вычисляемых полей, и включается allowDiskUse для блокирующих стадий.
+    """
+
+    def __init__(self, rewrite: bool = True):
+        self.rewrite = rewrite
+        self.reports: List[PipelineReport] = []
+
+    def lint(self, pipeline: List[Dict[str, Any]]) -> List[PipelineIssue]:
+        issues: List[PipelineIssue] = []
+        available: Optional[Set[str]] = None  # None - исходная форма документа
+        shape_changed = False
+
+        for i, stage in enumerate(pipeline):
+            name = _stage_name(stage)
+            spec = stage[name]
+
+            if name == "$match":
+                if shape_changed:
+                    issues.append(PipelineIssue(i, "match-after-reshape",
+                                                "$match after a shape-changing stage cannot use indexes"))
+                for key, value in spec.items():
+                    if isinstance(value, dict) and "$exists" in value and _ARRAY_POSITION_RE.search(key):
+                        issues.append(PipelineIssue(i, "exists-array-position",
+                                                    f"$exists on array position '{key}' is not indexable; "
+                                                    f"use a materialized field (e.g. category.depth)"))
+                referenced = _query_fields(spec)
+            elif name == "$sort":
+                if shape_changed:
+                    issues.append(PipelineIssue(i, "sort-after-reshape",
+                                                "$sort after a shape-changing stage runs in memory"))
+                next_name = _stage_name(pipeline[i + 1]) if i + 1 < len(pipeline) else None
+                index_backed = all(_stage_name(s) == "$match" for s in pipeline[:i])
+                if next_name != "$limit" and not index_backed:
+                    issues.append(PipelineIssue(i, "sort-without-limit",
+                                                "$sort is not followed by $limit and cannot use an index"))
+                referenced = set(spec)
+            elif name in ("$project", "$addFields", "$set", "$group", "$bucket"):
+                referenced = _expression_fields(spec)
+            else:
+                referenced = set()
+
+            if available is not None:
+                for path in sorted(referenced):
+                    if not _overlaps(path, available):
+                        issues.append(PipelineIssue(i, "field-lost-after-group",
+                                                    f"'{path}' does not exist after $group "
+                                                    f"(available: {', '.join(sorted(available))})",
+                                                    severity="error"))
+
+            if name == "$unwind" and not any(_stage_name(s) == "$match" for s in pipeline[:i]):
+                issues.append(PipelineIssue(i, "unwind-unfiltered",
+                                            "$unwind over the whole collection; filter with $match first",
+                                            severity="info"))
+
+            # Отслеживание доступных полей после $group/$project
+            if name == "$group":
+                available = set(spec)
+            elif name == "$project" and available is not None:
+                available = _kept_fields(spec)
+            elif name in ("$addFields", "$set") and available is not None:
+                available |= set(spec)
+            elif name in ("$replaceRoot", "$replaceWith", "$facet", "$bucketAuto", "$sortByCount", "$count"):
+                available = None
+
+            if name in SHAPE_CHANGING_STAGES:
+                shape_changed = True
+
+        return issues
+
+    @staticmethod
+    def _can_move_before(match: Dict[str, Any], stage: Dict[str, Any]) -> bool:
+        """Можно ли поставить $match перед stage без изменения результата"""
+        name = _stage_name(stage)
+        spec = stage[name]
+        fields = _query_fields(match)
+        if name == "$sort":
+            return True
+        if name in ("$addFields", "$set"):
+            # Вычисляемое поле не должно совпадать с условием, быть его предком или потомком
+            return not any(_overlaps(f, set(spec)) for f in fields)
+        if name == "$project":
+            # Только проекции-включения: каждое поле условия сохранено целиком -
+            # {"category.name": 1} не сохраняет "category.id" и весь "category"
+            kept = _kept_fields(spec)
+            inclusion = all(v in (1, True) for k, v in spec.items() if k != "_id")
+            return inclusion and all(_covered(f, kept) for f in fields)
+        return False
+
+    def optimize(self, pipeline: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Безопасные переписывания; возвращает новый pipeline и их список"""
+        result = copy.deepcopy(pipeline)
+        rewrites: List[str] = []
+
+        moved = True
+        while moved:
+            moved = False
+            for i in range(1, len(result)):
+                stage = result[i]
+                if _stage_name(stage) == "$match" and self._can_move_before(stage["$match"], result[i - 1]):
+                    rewrites.append(f"moved $match before {_stage_name(result[i - 1])} (stage {i} -> {i - 1})")
+                    result[i - 1], result[i] = result[i], result[i - 1]
+                    moved = True
+                    break
+
+        # $sort, $project, $limit: $project между ними мешает склейке $sort+$limit
+        # в top-k - поднимаем его перед $sort, если сохраняются ключи сортировки.
+        # $sort сразу после $match не трогаем: он может идти по индексу
+        for i in range(1, len(result) - 1):
+            stage, previous = result[i], result[i - 1]
+            if (_stage_name(stage) == "$project" and _stage_name(previous) == "$sort"
+                    and _stage_name(result[i + 1]) == "$limit"
+                    and not all(_stage_name(s) == "$match" for s in result[:i - 1])):
+                spec = stage["$project"]
+                inclusion = all(v in (1, True) for k, v in spec.items() if k != "_id")
+                kept = _kept_fields(spec)
+                if inclusion and all(_covered(key, kept) for key in previous["$sort"]):
+                    rewrites.append(f"moved $project before $sort (stage {i} -> {i - 1})")
+                    result[i - 1], result[i] = stage, previous
+
+        return result, rewrites
+
+    def analyze(self, collection: str, pipeline: List[Dict[str, Any]],
+                options: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any], PipelineReport]:
+        """Линт + переписывания + опции выполнения"""
+        options = dict(options or {})
+        report = PipelineReport(collection, issues=self.lint(pipeline))
+
+        if self.rewrite:
+            pipeline, report.rewrites = self.optimize(pipeline)
+            if "allowDiskUse" not in options and any(_stage_name(s) in BLOCKING_STAGES for s in pipeline):
+                options["allowDiskUse"] = True
+                report.rewrites.append("allowDiskUse=True for blocking stages")
+
+        report.options = options
+        self.reports.append(report)
+        return pipeline, options, report
+
+    STAT_KEYS = ("usedDisk", "spills", "spilledDataStorageSize", "totalOutputDataSizeBytes",
+                 "maxAccumulatorMemoryUsageBytes", "peakTrackedMemBytes", "nReturned")
+    PLAN_CHILDREN = ("inputStage", "inputStages", "thenStage", "elseStage", "outerStage", "innerStage")
+
+    @classmethod
+    def _stat_entry(cls, name: str, node: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {"stage": name, "time_ms": node.get("executionTimeMillisEstimate")}
+        entry.update({key: node[key] for key in cls.STAT_KEYS if key in node})
+        return entry
+
+    @classmethod
+    def _plan_stats(cls, plan: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Стадии дерева плана (executionStages/winningPlan) от корня к листьям"""
+        stats: List[Dict[str, Any]] = []
+        nodes = [plan] if plan else []
+        while nodes:
+            node = nodes.pop(0)
+            if "stage" in node:
+                stats.append(cls._stat_entry(node["stage"], node))
+            for key in cls.PLAN_CHILDREN:
+                child = node.get(key)
+                nodes.extend(child if isinstance(child, list) else [child] if child else [])
+        return stats
+
+    @classmethod
+    def _pushed_down_stats(cls, explain: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Стадии, выполненные в движке запросов: executionStats, без них - план queryPlanner"""
+        execution = explain.get("executionStats", {}).get("executionStages")
+        if execution:
+            return cls._plan_stats(execution)
+        winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+        return cls._plan_stats(winning.get("queryPlan", winning))
+
+    @classmethod
+    def explain_stats(cls, explain: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Память и сброс на диск по стадиям из explain("executionStats").
+
+        Стадии, оставшиеся в pipeline, идут из explain["stages"]; часть,
+        вынесенная в движок запросов ($cursor), и pipeline, целиком
+        выполненный в SBE (в ответе нет "stages", MongoDB 7.0+), - из дерева
+        executionStats. Для шардированной коллекции стадии помечены shard.
+        """
+        if "shards" in explain:
+            return [dict(entry, shard=shard)
+                    for shard, shard_explain in explain["shards"].items()
+                    for entry in cls.explain_stats(shard_explain)]
+        if "stages" not in explain:
+            return cls._pushed_down_stats(explain)
+
+        stats = []
+        for stage in explain["stages"]:
+            name = next((k for k in stage if k.startswith("$")), None)
+            if name is None:
+                continue
+            if name == "$cursor":
+                stats.extend(cls._pushed_down_stats(stage["$cursor"]))
+            stats.append(cls._stat_entry(name, stage))
+        return stats
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+    CPU and Memory Profiling (--profile mode)
+"""
+
+from typing import Dict, Any, List, Optional, Callable
+from contextlib import contextmanager
+from pathlib import Path
+import argparse
+import io
+import json
+import sys
+import threading
+import time
+import tracemalloc
+
+from ..core.tracing import tracer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_PROFILE_DIR = "profiles"
+# Собственные выделения профайлера и импорта не показываются в top-N
+_IGNORED_SITES = (tracemalloc.__file__, __file__, "<frozen importlib")
+
+def peak_rss_bytes() -> Optional[int]:
+    """Пиковый RSS процесса (ru_maxrss: КБ в Linux, байты в macOS)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Сэмплирующий профайлер: стеки всех потоков раз в interval_sec -> collapsed stacks"""
+
+    def __init__(self, interval_sec: float = 0.005):
+        self.interval_sec = interval_sec
+        self.counts: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_sec):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def write_collapsed(self, path: str) -> None:
+        """Формат flamegraph.pl / speedscope: "frame;frame;frame count" """
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+class _Phase:
+    __slots__ = ("span_id", "depth", "snapshot", "peak")
+
+    def __init__(self, span_id: str, depth: int, snapshot):
+        self.span_id = span_id
+        self.depth = depth
+        self.snapshot = snapshot
+        self.peak = 0
+
+class Profiler:
+    """cProfile + сэмплер стеков + tracemalloc по фазам.
+
+    Фазы - span'ы трассировки глубиной до phase_depth: для каждой
+    сохраняются длительность, пик памяти Python (tracemalloc) и пиковый RSS
+    процесса. Для фаз глубиной до snapshot_depth дополнительно - top-N мест
+    выделения памяти (file:line), оставшихся после фазы: разница снапшотов
+    tracemalloc стоит секунды на больших кучах, поэтому только верхние фазы.
+    tracemalloc общий для процесса: при параллельных стадиях в разницу
+    снапшотов попадают выделения соседних потоков.
+    """
+
+    _active: Optional["Profiler"] = None
+
+    def __init__(self, name: str, output_dir: str = DEFAULT_PROFILE_DIR, top_n: int = 10,
+                 phase_depth: int = 3, snapshot_depth: int = 1, sample_interval_sec: float = 0.005,
+                 trace_frames: int = 1):
+        self.name = name
+        self.output_dir = Path(output_dir)
+        self.top_n = top_n
+        self.phase_depth = phase_depth
+        self.snapshot_depth = snapshot_depth
+        self.trace_frames = trace_frames
+        self.sampler = StackSampler(sample_interval_sec)
+        self.phases: List[Dict[str, Any]] = []
+        # cProfile/pstats импортируются при старте профилирования - не на старте команды
+        self._profiles: List[Any] = []
+        self._peak = 0
+        self._open: List[_Phase] = []
+        self._lock = threading.Lock()
+        self._tracer_was_enabled = False
+
+    @classmethod
+    def active(cls) -> Optional["Profiler"]:
+        return cls._active
+
+    def start(self) -> None:
+        tracemalloc.start(self.trace_frames)
+        self._tracer_was_enabled = tracer.enabled
+        tracer.enable()
+        tracer.hooks.append(self)
+        Profiler._active = self
+        self.sampler.start()
+        import cProfile
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        profile.enable()
+
+    def stop(self) -> Dict[str, str]:
+        self._profiles[0].disable()
+        self.sampler.stop()
+        Profiler._active = None
+        tracer.hooks.remove(self)
+        if not self._tracer_was_enabled:
+            tracer.disable()
+        self.traced_peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        return self._write()
+
+    @contextmanager
+    def thread_profile(self):
+        """cProfile для рабочего потока (cProfile видит только поток, где включен)"""
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: один активный cProfile на процесс - поток покрывает сэмплер
+            yield
+            return
+        with self._lock:
+            self._profiles.append(profile)
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    # Хуки трассировки: начало и конец span'а
+    def on_span_start(self, span, depth: int) -> None:
+        if depth >= self.phase_depth:
+            return
+        # Время снапшотов видно в CPU-профиле под profiling.py
+        with self._lock:
+            current_peak = tracemalloc.get_traced_memory()[1]
+            self._peak = max(self._peak, current_peak)
+            for phase in self._open:
+                phase.peak = max(phase.peak, current_peak)
+            tracemalloc.reset_peak()
+            snapshot = tracemalloc.take_snapshot() if depth < self.snapshot_depth else None
+            self._open.append(_Phase(span.span_id, depth, snapshot))
+        # Время снапшота не входит в длительность фазы
+        span.start_ns = time.time_ns()
+
+    def on_span_end(self, span, depth: int) -> None:
+        if depth >= self.phase_depth:
+            return
+        with self._lock:
+            phase = next((p for p in self._open if p.span_id == span.span_id), None)
+            if phase is None:
+                return
+            self._open.remove(phase)
+            phase.peak = max(phase.peak, tracemalloc.get_traced_memory()[1])
+            self._peak = max(self._peak, phase.peak)
+            for parent in self._open:
+                parent.peak = max(parent.peak, phase.peak)
+            tracemalloc.reset_peak()
+
+            # Остаток выделений фазы; временный всплеск виден по traced_peak_bytes
+            diff = tracemalloc.take_snapshot().compare_to(phase.snapshot, "lineno") if phase.snapshot else []
+            allocations = [
+                {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in diff
+                if stat.size_diff > 0 and not stat.traceback[0].filename.startswith(_IGNORED_SITES)
+            ][:self.top_n]
+            self.phases.append({
+                "phase": span.name,
+                "depth": depth,
+                "duration_ms": round(span.duration_ms, 1),
+                "traced_peak_bytes": phase.peak,
+                "peak_rss_bytes": peak_rss_bytes(),
+                "top_allocations": allocations,
+            })
+
+    def _write(self) -> Dict[str, str]:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        base = self.output_dir / f"{self.name}_{stamp}"
+
+        import pstats
+        stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(f"{base}.prof")
+        self.sampler.write_collapsed(f"{base}.collapsed")
+
+        memory = {
+            "name": self.name,
+            "traced_peak_bytes": self.traced_peak,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "phases": self.phases,
+        }
+        with open(f"{base}.memory.json", "w", encoding="utf-8") as f:
+            json.dump(memory, f, ensure_ascii=False, indent=2)
+
+        self.stats = stats
+        return {"pstats": f"{base}.prof", "collapsed": f"{base}.collapsed", "memory": f"{base}.memory.json"}
+
+    def print_summary(self, files: Dict[str, str], top_functions: int = 15) -> None:
+        """Сводка рядом с обычным выводом команды"""
+        print(f"\n{'='*60}")
+        print(f" ПРОФИЛЬ: {self.name}")
+        print(f"{'='*60}")
+
+        buffer = io.StringIO()
+        self.stats.stream = buffer
+        self.stats.sort_stats("cumulative").print_stats(top_functions)
+        lines = [line for line in buffer.getvalue().splitlines() if line.strip()]
+        header = next((i for i, line in enumerate(lines) if "ncalls" in line), 0)
+        print("\n CPU (cProfile, cumulative):")
+        for line in lines[header:header + top_functions + 1]:
+            print(f"   {line}")
+
+        rss = peak_rss_bytes()
+        print(f"\n Память: пик tracemalloc {self.traced_peak / 1024**2:.1f} MB"
+              + (f", пиковый RSS {rss / 1024**2:.1f} MB" if rss else ""))
+        for phase in sorted(self.phases, key=lambda p: p["traced_peak_bytes"], reverse=True)[:10]:
+            print(f"\n   {'  ' * phase['depth']}{phase['phase']}: {phase['duration_ms']:.0f} мс, "
+                  f"пик {phase['traced_peak_bytes'] / 1024**2:.1f} MB")
+            for allocation in phase["top_allocations"][:3]:
+                print(f"   {'  ' * phase['depth']}  +{allocation['size_diff_bytes'] / 1024**2:.1f} MB "
+                      f"{allocation['site']}")
+
+        print("\n Файлы:")
+        for kind, path in files.items():
+            print(f"   • {kind}: {path}")
+
+def run_profiled(name: str, func: Callable[[], Any], output_dir: str = DEFAULT_PROFILE_DIR,
+                 top_n: int = 10) -> Any:
+    """Выполнить func под профайлером и напечатать сводку"""
+    profiler = Profiler(name, output_dir, top_n=top_n)
+    profiler.start()
+    try:
+        return func()
+    finally:
+        files = profiler.stop()
+        profiler.print_summary(files)
+
+@contextmanager
+def thread_profile():
+    """cProfile текущего потока, если активен Profiler (для стадий в отдельных потоках)"""
+    profiler = Profiler.active()
+    if profiler is None:
+        yield
+        return
+    with profiler.thread_profile():
+        yield
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """--profile [DIR] и --profile-top N для точек входа"""
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, metavar="DIR",
+                        help=f"cProfile + сэмплер стеков + tracemalloc, результаты в DIR ({DEFAULT_PROFILE_DIR})")
+    parser.add_argument("--profile-top", type=int, default=10, help="Мест выделения памяти на фазу")
+    return parser
+
+def main_with_profile(name: str, main: Callable[..., Any], description: str,
+                      configure: Optional[Callable[[argparse.ArgumentParser], Any]] = None) -> Any:
+    """Точка входа скрипта: обычный запуск или под --profile.
+
+    configure добавляет аргументы скрипта - тогда main получает args.
+    """
+    parser = add_profile_arguments(argparse.ArgumentParser(description=description))
+    if configure is not None:
+        configure(parser)
+    args = parser.parse_args()
+    run = (lambda: main(args)) if configure is not None else main
+    if args.profile:
+        return run_profiled(name, run, args.profile, args.profile_top)
+    return run()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+    Read-Preference Routing (analytics/export -> secondaries, point/batch/scan reads -> nearest)
+"""
+
+from typing import Dict, Any, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+import threading
+from pymongo.read_preferences import Nearest, Primary, SecondaryPreferred
+
+# Минимально допустимый maxStalenessSeconds в MongoDB
+MAX_STALENESS_SEC = 90
+
+def default_routes(max_staleness_sec: int = MAX_STALENESS_SEC) -> Dict[str, Any]:
+    """Маршрут -> read preference. Все, что без маршрута (записи, миграции,
+    проверки согласованности), читает с primary."""
+    return {
+        "primary": Primary(),
+        "point": Nearest(),
+        "batch": Nearest(),
+        "scan": Nearest(),
+        "analytics": SecondaryPreferred(max_staleness=max_staleness_sec),
+        "export": SecondaryPreferred(max_staleness=max_staleness_sec),
+    }
+
+_route: ContextVar[Optional[str]] = ContextVar("read_route", default=None)
+
+def current_route() -> Optional[str]:
+    return _route.get()
+
+@contextmanager
+def read_route(name: Optional[str]):
+    """Маршрут чтений внутри блока: with read_route("analytics"): ..."""
+    token = _route.set(name)
+    try:
+        yield
+    finally:
+        _route.reset(token)
+
+class RouteMetrics:
+    """Задержки по маршрутам и узлы, которые обслужили запросы"""
+
+    def __init__(self, max_samples: int = 10000):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._servers: Dict[str, Dict[str, int]] = {}
+
+    def observe(self, route: str, duration_ms: float, address: Optional[tuple] = None) -> None:
+        with self._lock:
+            samples = self._latencies.setdefault(route, [])
+            count = self._counts.get(route, 0)
+            # Кольцевой буфер последних max_samples значений
+            if len(samples) < self.max_samples:
+                samples.append(duration_ms)
+            else:
+                samples[count % self.max_samples] = duration_ms
+            self._counts[route] = count + 1
+            if address is not None:
+                server = f"{address[0]}:{address[1]}"
+                servers = self._servers.setdefault(route, {})
+                servers[server] = servers.get(server, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latencies.clear()
+            self._counts.clear()
+            self._servers.clear()
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for route, samples in self._latencies.items():
+                ordered = sorted(samples)
+                result[route] = {
+                    "count": self._counts[route],
+                    "p50_ms": round(ordered[len(ordered) // 2], 3),
+                    "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                    "max_ms": round(ordered[-1], 3),
+                    "servers": dict(self._servers.get(route, {})),
+                }
+            return result
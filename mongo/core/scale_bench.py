@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+    Scale-Curve Benchmark Matrix (dataset sizes x index sets)
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from pathlib import Path
+import json
+import math
+import random
+import statistics
+import time
+
+from ..core.database import MongoDBConnection, MongoDBBaseOperations
+from ..core.services import (
+    DataLoaderService, IndexingService, CategoryQueryService, ProductQueryService, AnalyticsService
+)
+from ..core.slow_queries import SlowQueryRecorder
+from ..core.synthetic import CatalogSpec, SyntheticCatalogGenerator, OFFER_ID_BASE
+from ..core.tracing import tracer
+
+# Набор индексов -> {коллекция: спецификации}; _id есть всегда
+INDEX_SETS: Dict[str, Dict[str, List[Any]]] = {
+    "none": {},
+    "minimal": {
+        "categories": [("path_array", 1), ("partner", 1, "level", 1)],
+        "products": [("partner", 1, "category.id", 1), ("offer_id", 1)],
+    },
+    "full": {
+        "categories": IndexingService.CATEGORIES_INDEXES,
+        "products": IndexingService.PRODUCTS_INDEXES,
+    },
+}
+
+# Фазы загрузчика - имена span'ов трассировки DataLoaderService
+LOAD_PHASES = ("read_parquet", "build_category_documents", "build_product_documents", "mongo.insert_many")
+
+class QueryContext:
+    """Сервисы и параметры запросов, подобранные по загруженным данным"""
+
+    def __init__(self, db_ops: MongoDBBaseOperations, rows: int, seed: int):
+        self.categories = CategoryQueryService(db_ops)
+        # facet_ttl_sec=0: без кэша фасетов, каждый вызов идет в MongoDB
+        self.products = ProductQueryService(db_ops, facet_ttl_sec=0)
+        self.analytics = AnalyticsService(db_ops)
+
+        top = db_ops.connection.get_collection("categories").find_one(
+            {"level": {"$gte": 2}}, sort=[("metadata.total_products", -1)]
+        )
+        sample = db_ops.connection.get_collection("products").find_one({"category.id": top["category_id"]})
+        self.partner = top["partner"]
+        self.root = top["path_array"][0]
+        self.subtree = "/".join(top["path_array"][:2])
+        self.product_type = sample["type"]
+        rng = random.Random(seed)
+        self.offer_ids = [str(OFFER_ID_BASE + rng.randrange(rows)) for _ in range(1000)]
+
+# Запрос матрицы -> вызов сервиса (все публичные запросы services.py)
+QUERIES: List[Tuple[str, Callable[[QueryContext], Any]]] = [
+    ("find_root_categories", lambda q: q.categories.find_root_categories(q.partner)),
+    ("find_subcategories", lambda q: q.categories.find_subcategories(q.root)),
+    ("find_subtree", lambda q: q.categories.find_subtree(q.root)),
+    ("get_top_categories", lambda q: q.categories.get_top_categories()),
+    ("find_products_by_type_and_category", lambda q: q.products.find_products_by_type_and_category(q.product_type, q.root)),
+    ("get_products_by_level", lambda q: q.products.get_products_by_level(4, q.product_type)),
+    ("get_by_ids", lambda q: q.products.get_by_ids(q.offer_ids)),
+    ("find_products_in_subtree", lambda q: q.products.find_products_in_subtree(q.subtree, limit=100)),
+    ("get_category_facets", lambda q: q.products.get_category_facets(q.subtree)),
+    ("aggregate_by_first_level_categories", lambda q: q.products.aggregate_by_first_level_categories()),
+    ("get_hierarchy_stats", lambda q: q.analytics.get_hierarchy_stats()),
+    ("find_leaf_categories", lambda q: q.analytics.find_leaf_categories()),
+    ("get_partner_stats", lambda q: q.analytics.get_partner_stats()),
+]
+
+def scaling_exponent(sizes: List[int], values: List[Optional[float]]) -> Dict[str, Any]:
+    """Наклон кривой в логарифмических осях: 1 - линейный рост, >1 - сверхлинейный.
+
+    slope - МНК по всем точкам, max_segment_slope - наибольший наклон
+    между соседними размерами (изгиб кривой). Нулевые и пустые значения
+    пропускаются.
+    """
+    points = [(math.log(n), math.log(v)) for n, v in zip(sizes, values) if v is not None and v > 0]
+    if len(points) < 2:
+        return {"slope": None, "max_segment_slope": None}
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator if denominator else None
+    segments = [(y2 - y1) / (x2 - x1) for (x1, y1), (x2, y2) in zip(points, points[1:]) if x2 > x1]
+    return {
+        "slope": round(slope, 3) if slope is not None else None,
+        "max_segment_slope": round(max(segments), 3) if segments else None,
+    }
+
+class ScaleBenchmark:
+    """Матрица: для каждого размера каталога загрузка синтетических данных,
+    затем для каждого набора индексов - размеры коллекций, задержки
+    запросов (p50 по repeats) и просмотренные документы/ключи из explain.
+
+    Данные загружаются в отдельную базу (по умолчанию ecommerce_scale),
+    лабораторная база ecommerce не затрагивается.
+    """
+
+    def __init__(self, connection: MongoDBConnection, data_dir: str, output_dir: str,
+                 seed: int = 42, categories: int = 5000, workers: int = 4, repeats: int = 5,
+                 superlinear_threshold: float = 1.2, min_latency_ms: float = 1.0):
+        self.connection = connection
+        self.data_dir = Path(data_dir)
+        self.output_dir = Path(output_dir)
+        self.seed = seed
+        self.categories = categories
+        self.workers = workers
+        self.repeats = repeats
+        self.superlinear_threshold = superlinear_threshold
+        self.min_latency_ms = min_latency_ms
+        self.db_ops = MongoDBBaseOperations(connection)
+
+    def dataset(self, rows: int) -> str:
+        """Каталог parquet для размера rows (генерируется один раз, детерминированно)"""
+        path = self.data_dir / f"rows_{rows}_seed_{self.seed}_cat_{self.categories}"
+        if not (path / "_spec.json").exists():
+            spec = CatalogSpec(rows=rows, seed=self.seed, categories=self.categories)
+            SyntheticCatalogGenerator(spec, workers=self.workers).generate(str(path))
+        return str(path)
+
+    def load(self, parquet_path: str) -> Dict[str, Any]:
+        """Загрузка categories/products; длительности фаз берутся из span'ов"""
+        db = self.connection.db
+        for collection in ("categories", "products"):
+            db.drop_collection(collection)
+
+        was_enabled = tracer.enabled
+        tracer.enable()
+        tracer.reset()
+        loader = DataLoaderService(self.db_ops)
+        start_time = time.time()
+        try:
+            categories_result, _ = loader.load_categories(parquet_path)
+            products_result, _ = loader.load_products(parquet_path)
+        finally:
+            spans = tracer.spans()
+            tracer.reset()
+            if not was_enabled:
+                tracer.disable()
+
+        phases: Dict[str, float] = {}
+        for span in spans:
+            if span.name in LOAD_PHASES:
+                phases[span.name] = phases.get(span.name, 0.0) + span.duration_ms
+        total_sec = time.time() - start_time
+        return {
+            "seconds": round(total_sec, 3),
+            "categories": categories_result.count,
+            "products": products_result.count,
+            "docs_per_sec": round(products_result.count / max(total_sec, 1e-6)),
+            "insert_docs_per_sec": round(products_result.count / max(products_result.execution_time_sec, 1e-6)),
+            "phases_ms": {name: round(ms, 1) for name, ms in phases.items()},
+        }
+
+    def apply_index_set(self, name: str) -> Dict[str, Any]:
+        """Удаление вторичных индексов и построение набора name"""
+        build_ms = 0.0
+        for collection in ("categories", "products"):
+            self.connection.get_collection(collection).drop_indexes()
+            specs = INDEX_SETS[name].get(collection)
+            if specs:
+                build_ms += self.db_ops.create_indexes(collection, specs).execution_time_ms
+        return {"index_build_ms": round(build_ms, 1)}
+
+    def sizes(self) -> Dict[str, Any]:
+        """Данные/индексы по collStats (после checkpoint)"""
+        self.db_ops.checkpoint()
+        result = {}
+        for collection in ("categories", "products"):
+            stats = self.db_ops.get_collection_stats(collection)
+            result[collection] = {
+                "data_bytes": stats.get("size", 0),
+                "storage_bytes": stats.get("storageSize", 0),
+                "index_bytes": stats.get("totalIndexSize", 0),
+            }
+        return result
+
+    def run_queries(self, rows: int, explain_path: Path) -> Dict[str, Dict[str, Any]]:
+        """p50/max задержки по repeats + проход с explain (журнал в explain_path)"""
+        context = QueryContext(self.db_ops, rows, self.seed)
+        # Записи explain сопоставляются запросам по порядку - журнал каждый раз новый
+        explain_path.unlink(missing_ok=True)
+        recorder = SlowQueryRecorder(threshold_ms=0.0, jsonl_path=str(explain_path),
+                                     explain_interval_sec=0.0, background=False)
+        explain_context = QueryContext(MongoDBBaseOperations(self.connection, slow_queries=recorder), rows, self.seed)
+
+        results = {}
+        for name, query in QUERIES:
+            query(context)  # прогрев кэша WiredTiger
+            timings = []
+            for _ in range(self.repeats):
+                start = time.perf_counter()
+                query(context)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            # explain выполняется отдельным проходом: он удваивает работу сервера
+            first = recorder.recorded
+            query(explain_context)
+            results[name] = {
+                "p50_ms": round(statistics.median(timings), 3),
+                "max_ms": round(max(timings), 3),
+                "explain_entries": (first, recorder.recorded),
+            }
+
+        entries = SlowQueryRecorder.load(jsonl_path=str(explain_path)) if explain_path.exists() else []
+        for result in results.values():
+            first, last = result.pop("explain_entries")
+            summaries = [entry.get("explain", {}) for entry in entries[first:last]]
+            result["docs_examined"] = sum(s.get("docs_examined") or 0 for s in summaries)
+            result["keys_examined"] = sum(s.get("keys_examined") or 0 for s in summaries)
+            result["index_used"] = all(s.get("index_used") for s in summaries) if summaries else None
+        return results
+
+    def run(self, sizes: List[int], index_sets: List[str]) -> Dict[str, Any]:
+        """Полная матрица; отчет пишется в output_dir/scale_report.json"""
+        unknown = [name for name in index_sets if name not in INDEX_SETS]
+        if unknown:
+            raise ValueError(f"Unknown index sets: {unknown}")
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        matrix = []
+        for rows in sorted(sizes):
+            parquet_path = self.dataset(rows)
+            load = self.load(parquet_path)
+            for index_set in index_sets:
+                cell = {"rows": rows, "index_set": index_set, "load": load}
+                cell.update(self.apply_index_set(index_set))
+                cell["sizes"] = self.sizes()
+                cell["queries"] = self.run_queries(rows, self.output_dir / f"explain_{rows}_{index_set}.jsonl")
+                matrix.append(cell)
+
+        report = {
+            "seed": self.seed,
+            "categories": self.categories,
+            "repeats": self.repeats,
+            "sizes": sorted(sizes),
+            "index_sets": index_sets,
+            "matrix": matrix,
+            "curves": self.curves(matrix, sorted(sizes), index_sets),
+        }
+        with open(self.output_dir / "scale_report.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+    def curves(self, matrix: List[Dict[str, Any]], sizes: List[int],
+               index_sets: List[str]) -> List[Dict[str, Any]]:
+        """Кривые метрика(N) по наборам индексов с флагом сверхлинейного роста"""
+        cells = {(cell["rows"], cell["index_set"]): cell for cell in matrix}
+        metrics: List[Tuple[str, Callable[[Dict[str, Any]], Optional[float]]]] = []
+        for name, _ in QUERIES:
+            # Задержки ниже min_latency_ms - шум измерения, а не рост
+            metrics.append((f"latency_ms.{name}",
+                            lambda c, n=name: max(c["queries"][n]["p50_ms"], self.min_latency_ms)))
+            metrics.append((f"docs_examined.{name}", lambda c, n=name: c["queries"][n]["docs_examined"]))
+        for collection in ("categories", "products"):
+            metrics.append((f"data_bytes.{collection}", lambda c, k=collection: c["sizes"][k]["data_bytes"]))
+            metrics.append((f"index_bytes.{collection}", lambda c, k=collection: c["sizes"][k]["index_bytes"]))
+        metrics.append(("index_build_ms", lambda c: c["index_build_ms"]))
+        metrics.append(("load_seconds", lambda c: c["load"]["seconds"]))
+
+        curves = []
+        for index_set in index_sets:
+            for metric, value_of in metrics:
+                values = [value_of(cells[(rows, index_set)]) for rows in sizes]
+                exponent = scaling_exponent(sizes, values)
+                worst = exponent["max_segment_slope"]
+                curves.append({
+                    "metric": metric,
+                    "index_set": index_set,
+                    "values": values,
+                    **exponent,
+                    "superlinear": worst is not None and worst > self.superlinear_threshold,
+                })
+        return curves
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Compact Breadcrumbs Schema (v2)
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import threading
+import time
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+from ..core.database import MongoDBBaseOperations, QueryResult
+from ..core.tracing import ContextThreadPoolExecutor
+
+PRODUCTS_V2 = "products_v2"
+CATEGORY_NODES = "category_nodes"
+
+class UnknownCategoryPath(KeyError):
+    """Путь категории товара, для которого нет узла в category_nodes"""
+
+class CategoryTreeCache:
+    """Кэш узлов дерева категорий: целочисленный id <-> имя/путь.
+
+    Каждый префикс пути (в том числе промежуточные уровни, которых нет
+    в categories) получает id. id узла не меняется между перестроениями:
+    на них ссылаются category.path_ids в products_v2.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]]):
+        self.nodes: Dict[int, Dict[str, Any]] = {node["_id"]: node for node in nodes}
+        self._by_path: Dict[Tuple[str, str], int] = {
+            (node["partner"], node["path"]): node["_id"] for node in nodes
+        }
+        self._by_name: Dict[str, List[int]] = {}
+        for node in nodes:
+            self._by_name.setdefault(node["name"], []).append(node["_id"])
+
+    @staticmethod
+    def build_nodes(categories: List[Dict[str, Any]],
+                    existing: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Документы category_nodes из документов categories.
+
+        existing - текущие узлы: их (partner, path) сохраняют свои id, новые
+        пути получают id больше максимального (по порядку (partner, path)).
+        Узлы исчезнувших путей остаются - на них могут ссылаться товары.
+        """
+        existing = existing or []
+        ids = {(node["partner"], tuple(node["path"].split("/"))): node["_id"] for node in existing}
+
+        paths = set()
+        for cat in categories:
+            path_array = cat["path_array"]
+            for depth in range(1, len(path_array) + 1):
+                paths.add((cat["partner"], tuple(path_array[:depth])))
+
+        next_id = max(ids.values(), default=0) + 1
+        for key in sorted(paths - ids.keys()):
+            ids[key] = next_id
+            next_id += 1
+
+        return [
+            {
+                "_id": node_id,
+                "partner": partner,
+                "name": path[-1],
+                "path": "/".join(path),
+                "level": len(path),
+                "parent_id": ids.get((partner, path[:-1]))
+            }
+            for (partner, path), node_id in sorted(ids.items(), key=lambda item: item[1])
+        ]
+
+    @classmethod
+    def from_mongo(cls, db_ops: MongoDBBaseOperations) -> "CategoryTreeCache":
+        """Загрузка узлов из коллекции category_nodes"""
+        return cls(db_ops.find(CATEGORY_NODES, {}).documents)
+
+    def path_ids(self, partner: str, path_array: List[str]) -> List[int]:
+        """id всех узлов пути от корня до листа (UnknownCategoryPath, если узла нет)"""
+        try:
+            return [
+                self._by_path[(partner, "/".join(path_array[:depth]))]
+                for depth in range(1, len(path_array) + 1)
+            ]
+        except KeyError:
+            raise UnknownCategoryPath(f"{partner}: {'/'.join(path_array)}") from None
+
+    def ids_by_name(self, name: str) -> List[int]:
+        """id узлов с данным именем (имя может встречаться в разных ветках)"""
+        return self._by_name.get(name, [])
+
+    def breadcrumbs(self, path_ids: List[int]) -> List[Dict[str, Any]]:
+        """Восстановление breadcrumbs v1 по id узлов"""
+        return [{"level": i, "name": self.nodes[node_id]["name"]} for i, node_id in enumerate(path_ids, 1)]
+
+    def expand(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Документ товара v2 -> вид v1 (full_path и breadcrumbs) для отображения"""
+        category = doc.get("category", {})
+        path_ids = category.get("path_ids")
+        if path_ids:
+            category["breadcrumbs"] = self.breadcrumbs(path_ids)
+            category["full_path"] = self.nodes[path_ids[-1]]["path"]
+        return doc
+
+def upsert_category_nodes(db_ops: MongoDBBaseOperations,
+                          categories: List[Dict[str, Any]]) -> Tuple[QueryResult, CategoryTreeCache]:
+    """Узлы путей categories в category_nodes: upsert по (partner, path), id существующих узлов сохраняются"""
+    existing = db_ops.find(CATEGORY_NODES, {}).documents
+    nodes = CategoryTreeCache.build_nodes(categories, existing)
+    operations = [
+        UpdateOne({"partner": node["partner"], "path": node["path"]},
+                  {"$set": {"name": node["name"], "level": node["level"], "parent_id": node["parent_id"]},
+                   "$setOnInsert": {"_id": node["_id"]}},
+                  upsert=True)
+        for node in nodes
+    ]
+    result = db_ops.bulk_write(CATEGORY_NODES, operations)
+    result.query_info = f"{len(nodes) - len(existing)} new nodes, {len(existing)} kept"
+    return result, CategoryTreeCache(nodes)
+
+def product_to_v2(doc: Dict[str, Any], cache: CategoryTreeCache) -> Dict[str, Any]:
+    """Конвертация документа товара v1 в v2"""
+    category = doc["category"]
+    path_array = [item["name"] for item in category["breadcrumbs"]]
+
+    converted = {key: value for key, value in doc.items() if key != "category"}
+    converted["category"] = {
+        "id": category["id"],
+        "name": category["name"],
+        "depth": len(path_array),
+        "path_ids": cache.path_ids(doc["partner"], path_array)
+    }
+    converted["schema_version"] = 2
+    return converted
+
+class BreadcrumbMigrationService:
+    """Онлайн-миграция products -> products_v2 по диапазонам _id
+
+    Перед копированием запоминается operationTime кластера; после него
+    change stream products с этой точки догоняет изменения, сделанные во
+    время копирования. Изменения после миграции применяются повторными
+    catch_up(resume_after=resume_token) до переключения записи на v2.
+    Без replica set change stream недоступен: миграция только копирует,
+    записи в products на это время нужно остановить.
+
+    Товары, для пути категории которых нет узла (UnknownCategoryPath),
+    пропускаются: их _id собираются в skipped и попадают в отчет.
+    """
+
+    def __init__(self, db_ops: MongoDBBaseOperations, workers: int = 4, batch_size: int = 1000):
+        self.db_ops = db_ops
+        self.workers = workers
+        self.batch_size = batch_size
+        self.skipped: List[Any] = []
+        self.resume_token: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def build_category_nodes(self) -> Tuple[QueryResult, CategoryTreeCache]:
+        """Построение category_nodes по всем categories"""
+        return upsert_category_nodes(self.db_ops, self.db_ops.find("categories", {}).documents)
+
+    def _migrate_range(self, cache: CategoryTreeCache, lo: Any, hi: Any) -> int:
+        """Миграция одного диапазона _id"""
+        source = self.db_ops.connection.get_collection("products")
+        cursor = source.find(self.db_ops.id_range_query(lo, hi)).batch_size(self.batch_size)
+
+        migrated = 0
+        batch = []
+        for doc in cursor:
+            try:
+                converted = product_to_v2(doc, cache)
+            except UnknownCategoryPath:
+                with self._lock:
+                    self.skipped.append(doc["_id"])
+                continue
+            batch.append(ReplaceOne({"_id": converted["_id"]}, converted, upsert=True))
+            if len(batch) >= self.batch_size:
+                migrated += self.db_ops.bulk_write(PRODUCTS_V2, batch).count
+                batch = []
+        migrated += self.db_ops.bulk_write(PRODUCTS_V2, batch).count
+        return migrated
+
+    def _change_operation(self, event: Dict[str, Any], cache: CategoryTreeCache) -> Optional[Any]:
+        """Операция над products_v2 по событию products"""
+        doc_id = event["documentKey"]["_id"]
+        doc = event.get("fullDocument")
+        if doc is None:
+            # delete или документ удален до updateLookup
+            return DeleteOne({"_id": doc_id})
+        try:
+            return ReplaceOne({"_id": doc_id}, product_to_v2(doc, cache), upsert=True)
+        except UnknownCategoryPath:
+            with self._lock:
+                self.skipped.append(doc_id)
+            return None
+
+    def catch_up(self, cache: CategoryTreeCache, start_at: Optional[Any] = None,
+                 resume_after: Optional[Dict[str, Any]] = None, idle_timeout_sec: float = 2.0) -> int:
+        """Применение изменений products из change stream до паузы idle_timeout_sec.
+
+        Документ v2 переписывается текущим состоянием (updateLookup), поэтому
+        повторное применение события идемпотентно. Позиция потока сохраняется
+        в resume_token. Возвращает число событий.
+        """
+        coll = self.db_ops.connection.get_collection("products")
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+
+        applied = 0
+        operations = []
+        last_event_time = time.time()
+        with coll.watch(pipeline, full_document="updateLookup", start_at_operation_time=start_at,
+                        resume_after=resume_after, max_await_time_ms=500) as stream:
+            while stream.alive:
+                event = stream.try_next()
+                if event is not None:
+                    operation = self._change_operation(event, cache)
+                    if operation is not None:
+                        operations.append(operation)
+                    applied += 1
+                    last_event_time = time.time()
+                # Порядок важен: события одного документа применяются по очереди
+                if operations and (len(operations) >= self.batch_size or event is None):
+                    self.db_ops.bulk_write(PRODUCTS_V2, operations, ordered=True)
+                    operations = []
+                if event is None and time.time() - last_event_time > idle_timeout_sec:
+                    break
+            self.db_ops.bulk_write(PRODUCTS_V2, operations, ordered=True)
+            self.resume_token = stream.resume_token
+        return applied
+
+    def migrate(self, cache: Optional[CategoryTreeCache] = None, catch_up: bool = True,
+                idle_timeout_sec: float = 2.0) -> QueryResult:
+        """Параллельная миграция; повторный запуск идемпотентен (upsert по _id)"""
+        start_time = time.time()
+        if cache is None:
+            cache = CategoryTreeCache.from_mongo(self.db_ops)
+        self.skipped = []
+        start_at = self.db_ops.operation_time() if catch_up else None
+
+        ranges = self.db_ops.split_id_ranges("products", self.workers * 4)
+        with ContextThreadPoolExecutor(max_workers=self.workers) as pool:
+            migrated = sum(pool.map(lambda r: self._migrate_range(cache, *r), ranges))
+
+        if start_at is not None:
+            events = self.catch_up(cache, start_at=start_at, idle_timeout_sec=idle_timeout_sec)
+            catch_up_info = f"{events} change events applied"
+        else:
+            catch_up_info = "no change stream catch-up (not a replica set)"
+
+        execution_time = time.time() - start_time
+        return QueryResult([], execution_time * 1000, count=migrated,
+                           query_info=f"Migrated {migrated} docs in {len(ranges)} ranges, {catch_up_info}, "
+                                      f"{len(self.skipped)} skipped (unknown category path)")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+    Product Name Search (in-process inverted index, BM25)
+"""
+
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+from pathlib import Path
+import json
+import math
+import re
+import time
+import numpy as np
+
+from ..core.database import MongoDBBaseOperations, QueryResult
+
+_TOKEN_RE = re.compile(r"[0-9a-zа-я]+")
+
+# Окончания для легкого стемминга (от длинных к коротким)
+_RU_ENDINGS = sorted([
+    "ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими", "ией", "иям", "иях",
+    "ах", "ях", "ам", "ям", "ов", "ев", "ой", "ей", "ий", "ый", "ая", "яя", "ое", "ее",
+    "ые", "ие", "ую", "юю", "ом", "ем", "ым", "им", "их", "ых",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й"
+], key=len, reverse=True)
+
+def _stem(token: str) -> str:
+    """Отсечение окончания у кириллических слов длиннее 4 символов"""
+    if len(token) <= 4 or not ("а" <= token[0] <= "я"):
+        return token
+    for ending in _RU_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= 3:
+            return token[:-len(ending)]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Токенизация с учетом русского: нижний регистр, ё -> е, легкий стемминг"""
+    return [_stem(token) for token in _TOKEN_RE.findall(text.lower().replace("ё", "е"))]
+
+class ProductSearchIndex:
+    """Инвертированный индекс по Offer_Name.
+
+    Posting-листы всех терминов лежат в двух общих массивах NumPy
+    (номера документов и частоты), словарь хранит (offset, length).
+    На диске - .npy файлы, при загрузке открываются через mmap.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, vocabulary: Dict[str, Tuple[int, int]], postings_doc: np.ndarray,
+                 postings_tf: np.ndarray, doc_len: np.ndarray, doc_cat: np.ndarray,
+                 doc_keys: List[str], categories: List[List[str]]):
+        self.vocabulary = vocabulary
+        self.postings_doc = postings_doc
+        self.postings_tf = postings_tf
+        self.doc_len = doc_len
+        self.doc_cat = doc_cat
+        self.doc_keys = doc_keys
+        self.categories = categories
+        self.avg_doc_len = float(doc_len.mean()) if len(doc_len) else 0.0
+        self._categories_by_name: Dict[str, List[int]] = {}
+        for cat_idx, path_array in enumerate(categories):
+            for name in set(path_array):
+                self._categories_by_name.setdefault(name, []).append(cat_idx)
+
+    @classmethod
+    def build(cls, records: Iterable[Tuple[str, str, List[str]]]) -> "ProductSearchIndex":
+        """Построение из (ключ товара, название, path_array категории)"""
+        term_postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        doc_len: List[int] = []
+        doc_cat: List[int] = []
+        doc_keys: List[str] = []
+        category_ids: Dict[Tuple[str, ...], int] = {}
+
+        for doc_id, (key, name, path_array) in enumerate(records):
+            tokens = tokenize(name or "")
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                docs, tfs = term_postings.setdefault(token, ([], []))
+                docs.append(doc_id)
+                tfs.append(tf)
+
+            doc_keys.append(key)
+            doc_len.append(len(tokens))
+            doc_cat.append(category_ids.setdefault(tuple(path_array), len(category_ids)))
+
+        vocabulary: Dict[str, Tuple[int, int]] = {}
+        offset = 0
+        for term, (docs, _) in term_postings.items():
+            vocabulary[term] = (offset, len(docs))
+            offset += len(docs)
+
+        postings_doc = np.empty(offset, dtype=np.uint32)
+        postings_tf = np.empty(offset, dtype=np.uint16)
+        for term, (docs, tfs) in term_postings.items():
+            start, length = vocabulary[term]
+            postings_doc[start:start + length] = docs
+            postings_tf[start:start + length] = np.minimum(tfs, np.iinfo(np.uint16).max)
+
+        categories = [list(path) for path, _ in sorted(category_ids.items(), key=lambda item: item[1])]
+        return cls(vocabulary, postings_doc, postings_tf,
+                   np.asarray(doc_len, dtype=np.uint16), np.asarray(doc_cat, dtype=np.uint32),
+                   doc_keys, categories)
+
+    @classmethod
+    def from_mongo(cls, db_ops: MongoDBBaseOperations) -> "ProductSearchIndex":
+        """Построение по коллекции products"""
+        coll = db_ops.connection.get_collection("products")
+        cursor = coll.find({}, {"name": 1, "category.breadcrumbs.name": 1}).batch_size(10000)
+        return cls.build(
+            (doc["_id"], doc.get("name", ""), [b["name"] for b in doc["category"]["breadcrumbs"]])
+            for doc in cursor
+        )
+
+    @classmethod
+    def from_dataframe(cls, df) -> "ProductSearchIndex":
+        """Построение из DataFrame исходного parquet"""
+        return cls.build(
+            (f"{partner}_{offer_id}", name, full_path.split('\\'))
+            for partner, offer_id, name, full_path in df[
+                ['Partner_Name', 'Offer_ID', 'Offer_Name', 'Category_FullPathName']
+            ].itertuples(index=False)
+        )
+
+    def save(self, directory: str) -> None:
+        """Сохранение: массивы в .npy, словарь и ключи в meta.json"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "postings_doc.npy", self.postings_doc)
+        np.save(path / "postings_tf.npy", self.postings_tf)
+        np.save(path / "doc_len.npy", self.doc_len)
+        np.save(path / "doc_cat.npy", self.doc_cat)
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "vocabulary": self.vocabulary,
+                "doc_keys": self.doc_keys,
+                "categories": self.categories
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str) -> "ProductSearchIndex":
+        """Загрузка с mmap: posting-листы не копируются в память процесса"""
+        path = Path(directory)
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            {term: tuple(span) for term, span in meta["vocabulary"].items()},
+            np.load(path / "postings_doc.npy", mmap_mode="r"),
+            np.load(path / "postings_tf.npy", mmap_mode="r"),
+            np.load(path / "doc_len.npy", mmap_mode="r"),
+            np.load(path / "doc_cat.npy", mmap_mode="r"),
+            meta["doc_keys"],
+            meta["categories"]
+        )
+
+    def search(self, text: str, limit: int = 10, category: Optional[str] = None) -> QueryResult:
+        """BM25-поиск; category - имя любого уровня breadcrumbs"""
+        start_time = time.perf_counter()
+        n_docs = len(self.doc_len)
+
+        docs_parts, score_parts = [], []
+        for term in set(tokenize(text)):
+            span = self.vocabulary.get(term)
+            if not span:
+                continue
+            start, length = span
+            docs = np.asarray(self.postings_doc[start:start + length])
+            tf = np.asarray(self.postings_tf[start:start + length], dtype=np.float32)
+            dl = np.asarray(self.doc_len[docs], dtype=np.float32)
+
+            idf = math.log(1 + (n_docs - length + 0.5) / (length + 0.5))
+            norm = self.K1 * (1 - self.B + self.B * dl / max(self.avg_doc_len, 1e-9))
+            docs_parts.append(docs)
+            score_parts.append(idf * tf * (self.K1 + 1) / (tf + norm))
+
+        documents: List[Dict[str, Any]] = []
+        if docs_parts:
+            all_docs = np.concatenate(docs_parts)
+            candidates, inverse = np.unique(all_docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+
+            if category is not None:
+                allowed = np.zeros(len(self.categories), dtype=bool)
+                allowed[self._categories_by_name.get(category, [])] = True
+                mask = allowed[np.asarray(self.doc_cat[candidates])]
+                candidates, scores = candidates[mask], scores[mask]
+
+            if len(candidates) > limit:
+                top = np.argpartition(-scores, limit)[:limit]
+            else:
+                top = np.arange(len(candidates))
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            documents = [
+                {"_id": self.doc_keys[candidates[i]], "score": float(scores[i]),
+                 "category_path": "/".join(self.categories[self.doc_cat[candidates[i]]])}
+                for i in top
+            ]
+
+        execution_time = time.perf_counter() - start_time
+        return QueryResult(documents, execution_time * 1000, query_info=f"BM25: {text}")
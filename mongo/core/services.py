@@ -3,14 +3,35 @@
     MongoDB Services Module
 """
 
-from typing import Dict, Any, List, Tuple
-import pandas as pd
+from typing import Dict, Any, List, Tuple, Optional, Callable, TYPE_CHECKING
+from collections import OrderedDict
+import copy
+import os
+import threading
+import time
+from pymongo import UpdateOne, UpdateMany
 
 from ..core.database import MongoDBBaseOperations, QueryResult
 from ..core.models import (
     CategoryModel, ProductModel, QueryTemplates, 
     StatisticsHelper, IndexSpecification
 )
+from ..core.autocomplete import PrefixIndex
+from ..core.schema_v2 import CategoryTreeCache, PRODUCTS_V2, CATEGORY_NODES, upsert_category_nodes
+from ..core.tracing import ContextThreadPoolExecutor, tracer, traced
+from ..core.single_flight import SingleFlight, coalesced
+from ..core.admission import admitted
+from ..core.stage_dag import check_cancelled
+
+RESTRUCTURE_LOG = "_restructure_log"
+# Построение документов проверяет отмену стадии раз в столько строк
+CANCEL_CHECK_ROWS = 10000
+
+# pandas и pyarrow нужны только загрузчику: импортируются внутри методов,
+# чтобы запросные команды не тратили на них время старта
+if TYPE_CHECKING:
+    import pandas as pd
+    from ..core.snapshot import CatalogSnapshot
 
 class DataLoaderService:
     """Сервис загрузки данных MongoDB"""
@@ -18,9 +39,51 @@ class DataLoaderService:
     def __init__(self, db_ops: MongoDBBaseOperations):
         self.db_ops = db_ops
     
+    @traced()
     def load_categories(self, parquet_path: str) -> Tuple[QueryResult, Dict[str, Any]]:
         """Загрузка категорий с materialized path"""
-        df = pd.read_parquet(parquet_path)
+        df = self._read_parquet(parquet_path)
+        
+        with tracer.span("build_category_documents") as span:
+            documents, categories_df = self._category_documents(df)
+            span.set_attribute("rows", len(documents))
+        
+        result = self.db_ops.insert_many("categories", documents)
+        
+        stats = {
+            'total_categories': len(documents),
+            'max_depth': categories_df['level'].max(),
+            'avg_depth': categories_df['level'].mean()
+        }
+        
+        return result, stats
+    
+    @staticmethod
+    def _read_parquet(parquet_path: str, columns: Optional[List[str]] = None) -> "pd.DataFrame":
+        """Чтение parquet в span read_parquet (строки и байты файла/в памяти)"""
+        import pandas as pd
+        
+        with tracer.span("read_parquet", path=parquet_path) as span:
+            df = pd.read_parquet(parquet_path, columns=columns)
+            check_cancelled()
+            if tracer.enabled:
+                span.set_attribute("rows", len(df))
+                span.set_attribute("bytes", DataLoaderService._parquet_size(parquet_path))
+                span.set_attribute("memory_bytes", int(df.memory_usage(deep=True).sum()))
+        return df
+    
+    @staticmethod
+    def _parquet_size(parquet_path: str) -> int:
+        """Размер parquet-файла или каталога part-файлов"""
+        if os.path.isdir(parquet_path):
+            return sum(entry.stat().st_size for entry in os.scandir(parquet_path)
+                       if entry.is_file() and entry.name.endswith(".parquet"))
+        return os.path.getsize(parquet_path)
+    
+    @staticmethod
+    def _category_documents(df: "pd.DataFrame") -> Tuple[List[Dict[str, Any]], "pd.DataFrame"]:
+        """Документы categories из исходного DataFrame"""
+        import pandas as pd
         
         # Извлечение уникальных категорий из DataFrame
         categories_df = df[['Partner_Name', 'Category_ID', 'Category_FullPathName']].drop_duplicates()
@@ -42,7 +105,9 @@ class DataLoaderService:
         
         # Создание документов MongoDB
         documents = []
-        for _, row in categories_df.iterrows():
+        for i, (_, row) in enumerate(categories_df.iterrows()):
+            if i % CANCEL_CHECK_ROWS == 0:
+                check_cancelled()
             doc = {
                 "_id": f"{row['Partner_Name']}_{row['Category_ID']}",
                 "partner": row['Partner_Name'],
@@ -51,7 +116,7 @@ class DataLoaderService:
                 "path": row['Category_FullPathName'].replace('\\', '/'),
                 "path_array": row['path_array'],
                 "level": row['level'],
-                "parent_path": row['parent_path'].replace('\\', '/') if row['parent_path'] else None,
+                "parent_path": row['parent_path'].replace('\\', '/') if isinstance(row['parent_path'], str) else None,
                 "metadata": {
                     "total_products": int(row['total_products']),
                     "last_updated": pd.Timestamp.utcnow().isoformat()
@@ -59,27 +124,38 @@ class DataLoaderService:
             }
             documents.append(doc)
         
-        result = self.db_ops.insert_many("categories", documents)
+        return documents, categories_df
+    
+    @traced()
+    def load_products(self, parquet_path: str) -> Tuple[QueryResult, Dict[str, Any]]:
+        """Загрузка товаров с embedded documents"""
+        df = self._read_parquet(parquet_path)
+        
+        with tracer.span("build_product_documents") as span:
+            documents = self._product_documents(df)
+            span.set_attribute("rows", len(documents))
+        
+        result = self.db_ops.insert_many("products", documents)
         
         stats = {
-            'total_categories': len(documents),
-            'max_depth': categories_df['level'].max(),
-            'avg_depth': categories_df['level'].mean()
+            'total_products': len(documents),
+            'unique_types': df['Offer_Type'].nunique(),
+            'partners': df['Partner_Name'].nunique()
         }
         
         return result, stats
     
-    def load_products(self, parquet_path: str) -> Tuple[QueryResult, Dict[str, Any]]:
-        """Загрузка товаров с embedded documents"""
-        df = pd.read_parquet(parquet_path)
-        
-        # Создание документов с хлебными крошками
+    @staticmethod
+    def _product_documents(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+        """Документы products с хлебными крошками"""
         documents = []
-        for _, row in df.iterrows():
-            path_array = row['Category_FullPathName'].str.split('\\').tolist()
+        for i, (_, row) in enumerate(df.iterrows()):
+            if i % CANCEL_CHECK_ROWS == 0:
+                check_cancelled()
+            path_array = row['Category_FullPathName'].split('\\')
             
             breadcrumbs = [
-                {"level": i+1, "name": name}
+                {"level": i, "name": name}
                 for i, name in enumerate(path_array, 1)
             ]
             
@@ -93,76 +169,156 @@ class DataLoaderService:
                     "id": row['Category_ID'],
                     "name": path_array[-1],
                     "full_path": row['Category_FullPathName'].replace('\\', '/'),
+                    "depth": len(path_array),
                     "breadcrumbs": breadcrumbs
                 }
             }
             documents.append(doc)
         
-        result = self.db_ops.insert_many("products", documents)
+        return documents
+    
+    @traced()
+    def build_autocomplete_index(self, parquet_path: str, output_path: str) -> Tuple[PrefixIndex, Dict[str, Any]]:
+        """Построение префиксного индекса автодополнения из исходного parquet"""
+        df = self._read_parquet(parquet_path, columns=['Category_FullPathName', 'Offer_Type'])
+        index = PrefixIndex.from_dataframe(df)
+        index.save(output_path)
         
         stats = {
-            'total_products': len(documents),
-            'unique_types': df['Offer_Type'].nunique(),
-            'partners': df['Partner_Name'].nunique()
+            'entries': len(index),
+            'output': output_path
         }
+        return index, stats
+    
+    @traced()
+    def write_snapshot(self, parquet_path: str, output_dir: str) -> Dict[str, Any]:
+        """Колоночный снапшот каталога (Arrow IPC) для офлайн-чтения"""
+        from ..core.snapshot import write_snapshot
         
-        return result, stats
+        df = self._read_parquet(parquet_path)
+        return write_snapshot(df, output_dir)
+    
+    @traced()
+    def backfill_category_depth(self) -> QueryResult:
+        """Заполнение category.depth для уже загруженных товаров"""
+        return self.db_ops.update_many(
+            "products",
+            {"category.depth": {"$exists": False}},
+            [{"$set": {"category.depth": {"$size": "$category.breadcrumbs"}}}]
+        )
 
 class IndexingService:
     """Сервис управления индексами MongoDB"""
     
+    # Индексы для categories
+    CATEGORIES_INDEXES = [
+        ("path", "text"),  # текстовый индекс
+        ("path_array", 1),  # восходящий
+        ("partner", 1, "level", 1),  # составной
+        ("metadata.total_products", -1),  # нисходящий
+        IndexSpecification.path_prefix_index("path")  # поддеревья по префиксу пути
+    ]
+    
+    # Индексы для products
+    PRODUCTS_INDEXES = [
+        ("partner", 1, "category.id", 1),
+        ("category.breadcrumbs.name", 1),
+        ("type", 1, "partner", 1),
+        ("offer_id", 1),
+        ("category.depth", 1, "type", 1),  # запросы по уровню иерархии
+        IndexSpecification.path_prefix_index("category.full_path")
+    ]
+    
+    # Индексы компактной схемы v2
+    PRODUCTS_V2_INDEXES = [
+        ("partner", 1, "category.id", 1),
+        ("category.path_ids", 1),  # вместо category.breadcrumbs.name
+        ("type", 1, "partner", 1),
+        ("offer_id", 1),
+        ("category.depth", 1, "type", 1)
+    ]
+    
+    CATEGORY_NODES_INDEXES = [
+        ("name", 1),
+        ("partner", 1, "path", 1)
+    ]
+    
     def __init__(self, db_ops: MongoDBBaseOperations):
         self.db_ops = db_ops
     
+    @traced()
     def create_all_indexes(self) -> Dict[str, QueryResult]:
         """Создание всех индексов для обеих коллекций MongoDB"""
-        
-        # Индексы для categories
-        categories_indexes = [
-            ("path", "text"),  # текстовый индекс
-            ("path_array", 1),  # восходящий
-            ("partner", 1, "level", 1),  # составной
-            ("metadata.total_products", -1)  # нисходящий
-        ]
-        
-        # Индексы для products  
-        products_indexes = [
-            ("partner", 1, "category.id", 1),
-            ("category.breadcrumbs.name", 1),
-            ("type", 1, "partner", 1),
-            ("offer_id", 1)
-        ]
-        
         results = {}
         
         # Индексы для categories
-        cats_result = self.db_ops.create_indexes("categories", categories_indexes)
+        cats_result = self.db_ops.create_indexes("categories", self.CATEGORIES_INDEXES)
         results['categories'] = cats_result
         
         # Индексы для products
-        prods_result = self.db_ops.create_indexes("products", products_indexes)
+        prods_result = self.db_ops.create_indexes("products", self.PRODUCTS_INDEXES)
         results['products'] = prods_result
         
         return results
+    
+    @traced()
+    def create_v2_indexes(self) -> Dict[str, QueryResult]:
+        """Индексы для компактной схемы v2 (products_v2, category_nodes)"""
+        return {
+            PRODUCTS_V2: self.db_ops.create_indexes(PRODUCTS_V2, self.PRODUCTS_V2_INDEXES),
+            CATEGORY_NODES: self.db_ops.create_indexes(CATEGORY_NODES, self.CATEGORY_NODES_INDEXES)
+        }
 
 class CategoryQueryService:
-    """Сервис запросов к категориям MongoDB"""
+    """Сервис запросов к категориям MongoDB
     
-    def __init__(self, db_ops: MongoDBBaseOperations):
+    При переданном snapshot чтения обслуживаются из mmap-снапшота без MongoDB.
+    single_flight - одинаковые одновременные запросы выполняются один раз.
+    """
+    
+    def __init__(self, db_ops: MongoDBBaseOperations, snapshot: Optional["CatalogSnapshot"] = None,
+                 single_flight: Optional[SingleFlight] = None):
         self.db_ops = db_ops
+        self.snapshot = snapshot
+        self.single_flight = single_flight
     
+    @traced()
+    @coalesced
+    @admitted("point")
     def find_root_categories(self, partner: str = "_ozon") -> QueryResult:
         """Найти корневые категории партнера MongoDB"""
+        if self.snapshot is not None:
+            return self.snapshot.find_root_categories(partner)
         query = {"partner": partner, "level": 1}
         return self.db_ops.find("categories", query)
     
+    @traced()
+    @coalesced
+    @admitted("point")
     def find_subcategories(self, parent_name: str) -> QueryResult:
         """Найти подкатегории (используя path_array) MongoDB"""
+        if self.snapshot is not None:
+            return self.snapshot.find_subcategories(parent_name)
         query = {"path_array": parent_name}
         return self.db_ops.find("categories", query)
     
+    @traced()
+    @coalesced
+    @admitted("scan")
+    def find_subtree(self, path_prefix: str, include_self: bool = True) -> QueryResult:
+        """Поддерево категории по префиксу path (диапазон по индексу path_1)"""
+        if not QueryTemplates.split_path(path_prefix):
+            raise ValueError("path_prefix must not be empty")
+        query = QueryTemplates.by_path_prefix("path", path_prefix, "path_array.{index}", include_self)
+        return self.db_ops.find("categories", query, {"collation": QueryTemplates.PATH_COLLATION})
+    
+    @traced()
+    @coalesced
+    @admitted("point")
     def get_top_categories(self, limit: int = 10) -> QueryResult:
         """Топ категорий по количеству товаров"""
+        if self.snapshot is not None:
+            return self.snapshot.get_top_categories(limit)
         pipeline = [
             {"$sort": {"metadata.total_products": -1}},
             {"$limit": limit},
@@ -171,30 +327,242 @@ class CategoryQueryService:
         return self.db_ops.aggregate("categories", pipeline)
 
 class ProductQueryService:
-    """Сервис запросов к товарам (SRP)"""
+    """Сервис запросов к товарам (SRP)
     
-    def __init__(self, db_ops: MongoDBBaseOperations):
+    schema_version=2 включает компактную схему products_v2: breadcrumbs
+    хранятся как category.path_ids и разворачиваются через CategoryTreeCache.
+    collection - другая коллекция той же схемы (например, вариант хранения).
+    single_flight - одинаковые одновременные запросы выполняются один раз.
+    """
+    
+    def __init__(self, db_ops: MongoDBBaseOperations, schema_version: int = 1,
+                 category_cache: Optional[CategoryTreeCache] = None, facet_ttl_sec: float = 300.0,
+                 snapshot: Optional["CatalogSnapshot"] = None, collection: Optional[str] = None,
+                 single_flight: Optional[SingleFlight] = None, facet_cache_size: int = 1024):
         self.db_ops = db_ops
+        self.snapshot = snapshot
+        self.single_flight = single_flight
+        self.facet_ttl_sec = facet_ttl_sec
+        self.facet_cache_size = facet_cache_size
+        self._facet_cache: "OrderedDict[Tuple[str, int, int, int], Tuple[float, QueryResult]]" = OrderedDict()
+        self._facet_lock = threading.Lock()
+        self.schema_version = schema_version
+        self.collection = collection or (PRODUCTS_V2 if schema_version == 2 else "products")
+        self.category_cache = category_cache
+        if schema_version == 2 and category_cache is None:
+            self.category_cache = CategoryTreeCache.from_mongo(db_ops)
+    
+    def _expand(self, result: QueryResult) -> QueryResult:
+        """Восстановление breadcrumbs для документов v2"""
+        if self.schema_version == 2:
+            for doc in result.documents:
+                self.category_cache.expand(doc)
+        return result
     
+    @traced()
+    @coalesced
+    @admitted("scan")
     def find_products_by_type_and_category(self, product_type: str, 
                                           breadcrumb_name: str) -> QueryResult:
         """Поиск товаров по типу и хлебными крошками"""
+        if self.schema_version == 2:
+            query = {
+                "type": product_type,
+                "category.path_ids": {"$in": self.category_cache.ids_by_name(breadcrumb_name)}
+            }
+            return self._expand(self.db_ops.find(self.collection, query))
+        
         query = {
             "type": product_type,
             "category.breadcrumbs.name": breadcrumb_name
         }
-        return self.db_ops.find("products", query)
+        return self.db_ops.find(self.collection, query)
     
-    def get_products_by_level(self, level: int) -> QueryResult:
-        """Товары определенного уровня иерархии MongoDB"""
-        query = {
-            f"category.breadcrumbs.{level-1}": {"$exists": True},
-            f"category.breadcrumbs.{level}": {"$exists": False}
-        }
-        return self.db_ops.find("products", query)
+    @traced()
+    @coalesced
+    @admitted("scan")
+    def get_products_by_level(self, level: int, product_type: str = None) -> QueryResult:
+        """Товары определенного уровня иерархии MongoDB (индекс category.depth_1_type_1)"""
+        query = QueryTemplates.by_depth(level, product_type)
+        return self._expand(self.db_ops.find(self.collection, query))
+    
+    @traced()
+    @coalesced
+    @admitted("batch")
+    def get_by_ids(self, ids: List[Any], fields: Optional[List[str]] = None, key: str = "offer_id",
+                   chunk_size: int = 1000, workers: int = 4) -> Tuple[QueryResult, List[Any]]:
+        """Пакетный поиск товаров по offer_id/_id.
+        
+        id дедуплицируются и разбиваются на ограниченные $in-чанки, которые
+        выполняются параллельно на пуле соединений. Документы возвращаются
+        в порядке первого появления id во входном списке, плюс список
+        ненайденных id. offer_id уникален только в пределах партнера:
+        возвращаются все товары с этим offer_id (по порядку _id).
+        
+        Класс batch: свои слоты и срок на всю пачку (чанки делят его,
+        а не point-бюджет 500 мс).
+        """
+        if self.snapshot is not None:
+            return self.snapshot.get_by_ids(ids, key, fields)
+        
+        start_time = time.time()
+        unique_ids = list(dict.fromkeys(ids))
+        
+        options = {}
+        if fields is not None:
+            options["projection"] = {field: 1 for field in set(fields) | {key}}
+        
+        chunks = [unique_ids[i:i + chunk_size] for i in range(0, len(unique_ids), chunk_size)]
+        
+        def fetch(chunk: List[Any]) -> List[Dict[str, Any]]:
+            return self.db_ops.find(self.collection, {key: {"$in": chunk}}, options).documents
+        
+        # Срок, маршрут и span-родитель переходят в потоки вместе с контекстом
+        found: Dict[Any, List[Dict[str, Any]]] = {}
+        if chunks:
+            with ContextThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+                for documents in pool.map(fetch, chunks):
+                    for doc in documents:
+                        found.setdefault(doc[key], []).append(doc)
+        
+        documents = [doc for i in unique_ids for doc in sorted(found.get(i, []), key=lambda d: d["_id"])]
+        missing = [i for i in unique_ids if i not in found]
+        self._expand(QueryResult(documents, 0))
+        
+        execution_time = time.time() - start_time
+        result = QueryResult(documents, execution_time * 1000,
+                             query_info=f"Batch lookup by {key}: {len(chunks)} chunks, {len(missing)} missing")
+        return result, missing
+    
+    @traced()
+    @coalesced
+    @admitted("scan")
+    def find_products_in_subtree(self, path_prefix: str, limit: int = 0) -> QueryResult:
+        """Товары поддерева категории по префиксу category.full_path"""
+        if not QueryTemplates.split_path(path_prefix):
+            raise ValueError("path_prefix must not be empty")
+        
+        options = {"collation": QueryTemplates.PATH_COLLATION}
+        if limit:
+            options["limit"] = limit
+        
+        if self.schema_version == 2:
+            # В v2 поддерево - это одно значение в multikey-индексе category.path_ids
+            parts = QueryTemplates.split_path(path_prefix)
+            node_ids = [
+                node_id for node_id in self.category_cache.ids_by_name(parts[-1])
+                if self.category_cache.nodes[node_id]["path"] == "/".join(parts)
+            ]
+            query = {"category.path_ids": {"$in": node_ids}}
+            return self._expand(self.db_ops.find(self.collection, query, options))
+        
+        query = QueryTemplates.by_path_prefix(
+            "category.full_path", path_prefix, "category.breadcrumbs.{index}.name"
+        )
+        return self.db_ops.find(self.collection, query, options)
     
+    @traced()
+    @coalesced
+    @admitted("point")
+    def get_category_facets(self, path_prefix: str, page: int = 1, page_size: int = 20,
+                            facet_limit: int = 20) -> QueryResult:
+        """Страница категории за один запрос: товары, типы, подкатегории, партнеры.
+        
+        Поддерево выбирается индексным диапазоном по пути, страница товаров
+        и счетчики считаются одной $facet-агрегацией. Страница - $sort по _id
+        с $limit на skip + page_size и затем $skip: сортировка с лимитом
+        (top-k) держит в памяти только skip + page_size документов, а не все
+        поддерево. Результат кэшируется по узлу, странице и facet_limit на
+        facet_ttl_sec (LRU, не больше facet_cache_size записей); вызывающий
+        получает свою копию документов.
+        documents[0] = {"products", "total", "types", "children", "partners"}.
+        """
+        parts = QueryTemplates.split_path(path_prefix)
+        if not parts:
+            raise ValueError("path_prefix must not be empty")
+        
+        cache_key = ("/".join(parts), page, page_size, facet_limit)
+        with self._facet_lock:
+            cached = self._facet_cache.get(cache_key)
+            if cached and time.time() - cached[0] < self.facet_ttl_sec:
+                self._facet_cache.move_to_end(cache_key)
+                return QueryResult(copy.deepcopy(cached[1].documents), 0.0,
+                                   query_info=f"Facets (cached): {cache_key[0]}")
+        
+        if self.schema_version == 2:
+            node_ids = [
+                node_id for node_id in self.category_cache.ids_by_name(parts[-1])
+                if self.category_cache.nodes[node_id]["path"] == cache_key[0]
+            ]
+            match = {"category.path_ids": {"$in": node_ids}}
+            child_field = "$category.path_ids"
+        else:
+            match = QueryTemplates.by_path_prefix("category.full_path", path_prefix, "category.breadcrumbs.{index}.name")
+            child_field = "$category.breadcrumbs.name"
+        
+        skip = (page - 1) * page_size
+        pipeline = [
+            {"$match": match},
+            {"$facet": {
+                "products": [
+                    {"$sort": {"_id": 1}},
+                    {"$limit": skip + page_size},
+                    {"$skip": skip},
+                    {"$project": {"name": 1, "type": 1, "partner": 1, "offer_id": 1, "category": 1}}
+                ],
+                "total": [{"$count": "count"}],
+                "types": [{"$sortByCount": "$type"}, {"$limit": facet_limit}],
+                "children": [
+                    {"$group": {"_id": {"$arrayElemAt": [child_field, len(parts)]}, "count": {"$sum": 1}}},
+                    {"$match": {"_id": {"$ne": None}}},
+                    {"$sort": {"count": -1}}
+                ],
+                "partners": [{"$sortByCount": "$partner"}]
+            }}
+        ]
+        result = self.db_ops.aggregate(self.collection, pipeline,
+                                       {"collation": QueryTemplates.PATH_COLLATION, "allowDiskUse": True})
+        
+        facets = result.documents[0] if result.documents else {}
+        if self.schema_version == 2:
+            for doc in facets.get("products", []):
+                self.category_cache.expand(doc)
+            for child in facets.get("children", []):
+                child["_id"] = self.category_cache.nodes[child["_id"]]["name"]
+        total = facets.get("total", [])
+        facets["total"] = total[0]["count"] if total else 0
+        
+        result = QueryResult([facets], result.execution_time_ms, query_info=f"Facets: {cache_key[0]}")
+        if self.facet_ttl_sec > 0:
+            with self._facet_lock:
+                self._facet_cache[cache_key] = (time.time(), QueryResult(copy.deepcopy(result.documents), 0.0))
+                self._facet_cache.move_to_end(cache_key)
+                while len(self._facet_cache) > self.facet_cache_size:
+                    self._facet_cache.popitem(last=False)
+        return result
+    
+    @traced()
+    @coalesced
+    @admitted("analytics")
     def aggregate_by_first_level_categories(self) -> QueryResult:
         """Агрегация по категориям 1-го уровня MongoDB"""
+        if self.schema_version == 2:
+            pipeline = [
+                {"$match": {"category.path_ids.0": {"$exists": True}}},
+                {"$group": {"_id": {"$arrayElemAt": ["$category.path_ids", 0]}, "count": {"$sum": 1}}}
+            ]
+            result = self.db_ops.aggregate(self.collection, pipeline)
+            
+            # Корни разных партнеров с одинаковым именем объединяются, как в v1
+            counts: Dict[str, int] = {}
+            for doc in result.documents:
+                name = self.category_cache.nodes[doc["_id"]]["name"]
+                counts[name] = counts.get(name, 0) + doc["count"]
+            top = sorted(counts.items(), key=lambda item: -item[1])[:10]
+            result.documents = [{"category_name": name, "product_count": count} for name, count in top]
+            result.count = len(result.documents)
+            return result
+        
         pipeline = [
             {"$match": {"category.breadcrumbs.0": {"$exists": True}}},
             {"$project": {"first_level": {"$arrayElemAt": ["$category.breadcrumbs.name", 0]}}},
@@ -203,14 +571,18 @@ class ProductQueryService:
             {"$limit": 10},
             {"$project": {"category_name": "$_id", "product_count": "$count", "_id": 0}}
         ]
-        return self.db_ops.aggregate("products", pipeline)
+        return self.db_ops.aggregate(self.collection, pipeline)
 
 class AnalyticsService:
     """Сервис аналитики MongoDB"""
     
-    def __init__(self, db_ops: MongoDBBaseOperations):
+    def __init__(self, db_ops: MongoDBBaseOperations, single_flight: Optional[SingleFlight] = None):
         self.db_ops = db_ops
+        self.single_flight = single_flight
     
+    @traced()
+    @coalesced
+    @admitted("analytics")
     def get_hierarchy_stats(self) -> QueryResult:
         """Статистика по уровням иерархии MongoDB"""
         pipeline = [
@@ -221,6 +593,9 @@ class AnalyticsService:
         ]
         return self.db_ops.aggregate("categories", pipeline)
     
+    @traced()
+    @coalesced
+    @admitted("analytics")
     def find_leaf_categories(self, limit: int = 10) -> QueryResult:
         """Поиск категорий-листьев (без подкатегорий) MongoDB"""
         pipeline = [
@@ -232,6 +607,9 @@ class AnalyticsService:
         ]
         return self.db_ops.aggregate("categories", pipeline)
     
+    @traced()
+    @coalesced
+    @admitted("analytics")
     def get_partner_stats(self) -> QueryResult:
         """Статистика по партнерам и уровням MongoDB"""
         pipeline = [
@@ -239,3 +617,200 @@ class AnalyticsService:
             {"$sort": {"_id.partner": 1, "_id.level": 1}}
         ]
         return self.db_ops.aggregate("categories", pipeline)
+
+class CategoryRestructureService:
+    """Переименование/перенос категории с распространением на товары
+    
+    Поддерево находится диапазоном по path, товары обновляются
+    параллельными чанками UpdateMany по индексу partner_1_category.id_1
+    (по одному UpdateMany на категорию поддерева).
+    
+    План и пройденный этап сохраняются в журнале _restructure_log, этапы
+    идут в порядке products -> products_v2 -> rollups -> categories и
+    каждый идемпотентен: повторный вызов после сбоя продолжает с
+    прерванного этапа по сохраненному плану. categories обновляются
+    последними - до конца операции дерево указывает на старый путь.
+    """
+    
+    STAGES = ("products", "products_v2", "rollups", "categories", "done")
+    
+    def __init__(self, db_ops: MongoDBBaseOperations, workers: int = 8, chunk_size: int = 50):
+        self.db_ops = db_ops
+        self.workers = workers
+        self.chunk_size = chunk_size
+    
+    @staticmethod
+    def operation_id(old_path: str, new_path: str, partner: str) -> str:
+        """_id записи журнала"""
+        return f"{partner}:{'/'.join(QueryTemplates.split_path(old_path))}->{'/'.join(QueryTemplates.split_path(new_path))}"
+    
+    def pending(self, old_path: str, new_path: str, partner: str = "_ozon") -> Optional[Dict[str, Any]]:
+        """Незавершенная операция из журнала или None"""
+        journal = self.db_ops.connection.get_collection(RESTRUCTURE_LOG)
+        entry = journal.find_one({"_id": self.operation_id(old_path, new_path, partner)})
+        return entry if entry and entry["stage"] != "done" else None
+    
+    @traced()
+    def plan(self, old_path: str, new_path: str, partner: str = "_ozon") -> List[Dict[str, Any]]:
+        """Категории поддерева old_path с их новыми путями"""
+        old_parts = QueryTemplates.split_path(old_path)
+        new_parts = QueryTemplates.split_path(new_path)
+        if not old_parts or not new_parts:
+            raise ValueError("old_path and new_path must not be empty")
+        if new_parts[:len(old_parts)] == old_parts:
+            raise ValueError("Cannot move a category into its own subtree")
+        
+        options = {"collation": QueryTemplates.PATH_COLLATION}
+        query = QueryTemplates.by_path_prefix("path", old_path, "path_array.{index}")
+        query["partner"] = partner
+        subtree = self.db_ops.find("categories", query, options).documents
+        
+        conflict = QueryTemplates.by_path_prefix("path", new_path, "path_array.{index}")
+        conflict["partner"] = partner
+        if self.db_ops.find("categories", conflict, dict(options, limit=1)).documents:
+            raise ValueError(f"Categories already exist under {new_path}")
+        
+        changes = []
+        for category in subtree:
+            path_array = new_parts + category["path_array"][len(old_parts):]
+            changes.append({
+                "category": category,
+                "path_array": path_array,
+                "path": "/".join(path_array),
+                "parent_path": "/".join(path_array[:-1]) or None,
+                "renamed_only": len(old_parts) == len(new_parts) and old_parts[:-1] == new_parts[:-1]
+            })
+        return changes
+    
+    def _product_update(self, change: Dict[str, Any], old_parts: List[str]) -> UpdateMany:
+        """UpdateMany для товаров одной категории"""
+        category = change["category"]
+        path_array = change["path_array"]
+        query = {"partner": category["partner"], "category.id": category["category_id"]}
+        
+        if change["renamed_only"]:
+            # Переименование одного уровня: меняется одна крошка, массив не переписывается
+            level = len(old_parts)
+            update = {"$set": {
+                "category.name": path_array[-1],
+                "category.full_path": change["path"],
+                "category.breadcrumbs.$[crumb].name": path_array[level - 1]
+            }}
+            return UpdateMany(query, update, array_filters=[{"crumb.level": level}])
+        
+        update = {"$set": {
+            "category.name": path_array[-1],
+            "category.full_path": change["path"],
+            "category.depth": len(path_array),
+            "category.breadcrumbs": [{"level": i, "name": name} for i, name in enumerate(path_array, 1)]
+        }}
+        return UpdateMany(query, update)
+    
+    def _set_stage(self, operation_id: str, stage: str, **fields: Any) -> None:
+        self.db_ops.connection.get_collection(RESTRUCTURE_LOG).update_one(
+            {"_id": operation_id}, {"$set": dict(fields, stage=stage, updated_at=time.time())}
+        )
+    
+    def _update_products(self, changes: List[Dict[str, Any]], old_parts: List[str], start_time: float,
+                         progress: Optional[Callable[[int, int, int, float], None]]) -> int:
+        """products: параллельные чанки UpdateMany"""
+        chunks = [changes[i:i + self.chunk_size] for i in range(0, len(changes), self.chunk_size)]
+        lock = threading.Lock()
+        done = {"categories": 0, "products": 0}
+        
+        def apply_chunk(chunk: List[Dict[str, Any]]) -> int:
+            result = self.db_ops.bulk_write("products", [self._product_update(c, old_parts) for c in chunk])
+            with lock:
+                done["categories"] += len(chunk)
+                done["products"] += result.count
+                if progress:
+                    progress(done["categories"], len(changes), done["products"], time.time() - start_time)
+            return result.count
+        
+        with ContextThreadPoolExecutor(max_workers=self.workers) as pool:
+            return sum(pool.map(apply_chunk, chunks))
+    
+    def _update_products_v2(self, changes: List[Dict[str, Any]]) -> int:
+        """products_v2: узлы новых путей в category_nodes и новые category.path_ids"""
+        if self.db_ops.connection.get_collection(CATEGORY_NODES).estimated_document_count() == 0:
+            return 0
+        partner = changes[0]["category"]["partner"]
+        _, cache = upsert_category_nodes(
+            self.db_ops, [{"partner": partner, "path_array": change["path_array"]} for change in changes]
+        )
+        operations = [
+            UpdateMany({"partner": partner, "category.id": change["category"]["category_id"]},
+                       {"$set": {"category.name": change["path_array"][-1],
+                                 "category.depth": len(change["path_array"]),
+                                 "category.path_ids": cache.path_ids(partner, change["path_array"])}})
+            for change in changes
+        ]
+        return self.db_ops.bulk_write(PRODUCTS_V2, operations).count
+    
+    def _update_rollups(self) -> str:
+        """category_rollups ведет потребитель change stream (в состоянии есть
+        resume token или аренда потребителя): события изменения товаров
+        переносят счетчики сами. Без потребителя - полный пересчет."""
+        from ..core.change_streams import CategoryCountMaintainer, ROLLUPS, STREAM_STATE
+        connection = self.db_ops.connection
+        maintainer = CategoryCountMaintainer(self.db_ops)
+        state = connection.get_collection(STREAM_STATE).find_one({"_id": maintainer.consumer_name}) or {}
+        if state.get("resume_token") or state.get("role") == "consumer":
+            return "via change stream"
+        if connection.get_collection(ROLLUPS).estimated_document_count() == 0:
+            return "not used"
+        maintainer.rebuild_rollups()
+        return "rebuilt"
+    
+    @traced()
+    def restructure(self, old_path: str, new_path: str, partner: str = "_ozon",
+                    progress: Optional[Callable[[int, int, int, float], None]] = None) -> QueryResult:
+        """Перенос/переименование поддерева; progress(готово, всего, товаров, сек)"""
+        start_time = time.time()
+        old_parts = QueryTemplates.split_path(old_path)
+        operation_id = self.operation_id(old_path, new_path, partner)
+        journal = self.db_ops.connection.get_collection(RESTRUCTURE_LOG)
+        
+        entry = self.pending(old_path, new_path, partner)
+        if entry is None:
+            changes = [
+                dict(change, category={key: change["category"][key] for key in ("_id", "partner", "category_id")})
+                for change in self.plan(old_path, new_path, partner)
+            ]
+            entry = {"_id": operation_id, "partner": partner, "old_path": old_path, "new_path": new_path,
+                     "changes": changes, "stage": self.STAGES[0], "started_at": time.time()}
+            journal.replace_one({"_id": operation_id}, entry, upsert=True)
+        changes = entry["changes"]
+        stages = self.STAGES[self.STAGES.index(entry["stage"]):]
+        
+        modified = entry.get("products_modified", 0)
+        rollups = "skipped"
+        if changes and "products" in stages:
+            modified = self._update_products(changes, old_parts, start_time, progress)
+            self._set_stage(operation_id, "products_v2", products_modified=modified)
+        if changes and "products_v2" in stages:
+            self._update_products_v2(changes)
+            self._set_stage(operation_id, "rollups")
+        if changes and "rollups" in stages:
+            rollups = self._update_rollups()
+            self._set_stage(operation_id, "categories")
+        if changes and "categories" in stages:
+            category_ops = [
+                UpdateOne({"_id": change["category"]["_id"]}, {"$set": {
+                    "name": change["path_array"][-1],
+                    "path": change["path"],
+                    "path_array": change["path_array"],
+                    "level": len(change["path_array"]),
+                    "parent_path": change["parent_path"]
+                }})
+                for change in changes
+            ]
+            self.db_ops.bulk_write("categories", category_ops)
+        self._set_stage(operation_id, "done")
+        
+        execution_time = time.time() - start_time
+        rate = modified / max(execution_time, 1e-6)
+        resumed = f", resumed at {stages[0]}" if stages[0] != self.STAGES[0] else ""
+        return QueryResult([], execution_time * 1000, count=modified,
+                           query_info=f"Restructured {len(changes)} categories, {modified} products "
+                                      f"({rate:,.0f}/sec), rollups {rollups}{resumed}")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+    Request Coalescing (single-flight) for identical concurrent queries
+"""
+
+from typing import Dict, Any, Optional, Callable, Awaitable
+import asyncio
+import functools
+import inspect
+import json
+import threading
+
+from ..core.admission import DeadlineExceeded, remaining_ms
+
+def canonical_key(name: str, *args, **kwargs) -> str:
+    """Каноническая форма запроса: порядок ключей словарей и kwargs не важен"""
+    return json.dumps([name, args, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Single-flight для потоков: одновременные вызовы с одним ключом
+    ждут одно выполнение и получают один и тот же результат (или исключение).
+
+    Результат общий для всех ожидающих - его нельзя изменять на месте.
+    Кэша нет: вызов после завершения выполнения снова идет в базу.
+    Ожидающий вызов ждет не дольше своего срока (admission.deadline) и
+    получает DeadlineExceeded, выполнение при этом продолжается.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            remaining = remaining_ms()
+            if not call.event.wait(None if remaining is None else max(remaining, 0) / 1000):
+                raise DeadlineExceeded(f"deadline exceeded waiting for {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "executions": self.executions,
+                    "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+class AsyncSingleFlight:
+    """Single-flight для asyncio: общая задача на ключ.
+
+    Ожидающие получают задачу через asyncio.shield: отмена одного
+    вызывающего (или истечение его срока) не отменяет выполнение для
+    остальных.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = self._tasks[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        remaining = remaining_ms()
+        if remaining is None:
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), max(remaining, 0) / 1000)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"deadline exceeded waiting for {key}") from None
+
+    async def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Синхронный метод сервиса в пуле потоков.
+
+        Ключ - имя метода, коллекция сервиса (как у coalesced) и аргументы.
+        asyncio.to_thread переносит в поток контекст вызывающего: срок,
+        маршрут чтений и родительский span.
+        """
+        owner = getattr(func, "__self__", None)
+        key = canonical_key(getattr(func, "__qualname__", repr(func)), getattr(owner, "collection", None),
+                            *args, **kwargs)
+        return await self.do(key, lambda: asyncio.to_thread(func, *args, **kwargs))
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "executions": self.executions,
+                "coalesced": self.coalesced, "in_flight": len(self._tasks)}
+
+def coalesced(func: Callable) -> Callable:
+    """Декоратор метода сервиса: через self.single_flight, если он задан.
+
+    Ключ - имя метода, коллекция сервиса и аргументы, приведенные по
+    сигнатуре: get_top_categories(), (10) и (limit=10) - один запрос.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        flight = getattr(self, "single_flight", None)
+        if flight is None:
+            return func(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(list(bound.arguments.items())[1:])
+        key = canonical_key(func.__qualname__, getattr(self, "collection", None), **arguments)
+        return flight.do(key, lambda: func(self, *args, **kwargs))
+    return wrapper
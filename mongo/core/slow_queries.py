@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Slow Query Recorder
+"""
+
+from typing import Dict, Any, List, Optional, Callable
+from pathlib import Path
+import json
+import queue
+import random
+import threading
+import time
+
+SLOW_QUERIES = "_slow_queries"
+
+SORT_KEYS = ("sort", "$sort")
+
+def _sort_shape(value: Any) -> Any:
+    """Сортировка сохраняется целиком: направление полей определяет нужный индекс"""
+    if isinstance(value, (list, tuple)):
+        return {field: direction for field, direction in value}
+    return value
+
+def query_shape(value: Any) -> Any:
+    """Форма запроса: литералы заменяются на "?", поля/операторы/ссылки "$field"
+    и направления сортировки сохраняются"""
+    if isinstance(value, dict):
+        return {key: _sort_shape(item) if key in SORT_KEYS else query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, (dict, list, tuple)) for item in value):
+            return [query_shape(item) for item in value]
+        return ["?"] if value else []
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+def plan_stages(explain: Dict[str, Any]) -> List[str]:
+    """Список стадий выигравшего плана (сверху вниз)"""
+    stages = []
+    plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)
+    while plan:
+        stages.append(plan.get("stage"))
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    """Краткая сводка explain("executionStats"): план, просмотренные ключи/документы, сортировка"""
+    pipeline_stages = None
+    base = explain
+    if "stages" in explain:
+        # Агрегация, не целиком ушедшая в движок запросов: план - в стадии $cursor
+        pipeline_stages = [next(iter(stage)) for stage in explain["stages"]]
+        base = explain["stages"][0].get("$cursor", {})
+
+    stats = base.get("executionStats", {})
+    stages = plan_stages(base)
+    summary = {
+        "plan": stages,
+        "index_used": any(stage in ("IXSCAN", "DISTINCT_SCAN", "COUNT_SCAN", "EXPRESS_IXSCAN") for stage in stages),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "n_returned": stats.get("nReturned"),
+        "explain_time_ms": stats.get("executionTimeMillis"),
+        "in_memory_sort": "SORT" in stages or (pipeline_stages is not None and "$sort" in pipeline_stages),
+    }
+    if pipeline_stages is not None:
+        summary["pipeline"] = pipeline_stages
+    return summary
+
+class SlowQueryRecorder:
+    """Журнал медленных запросов MongoDBBaseOperations.
+
+    Запросы дольше threshold_ms (с вероятностью sample_rate) сохраняются
+    вместе с формой запроса и сводкой explain("executionStats") в capped
+    коллекцию _slow_queries или, если задан jsonl_path, в JSONL файл.
+    explain повторно выполняет запрос со своим maxTimeMS
+    (explain_time_limit_ms), не связанным со сроком исходного запроса.
+
+    explain выполняется в фоновом потоке, а не в потоке запроса: не чаще
+    раза в explain_interval_sec на форму и не больше max_pending в очереди.
+    Остальные медленные запросы записываются без explain - при перегрузке
+    журнал не удваивает работу сервера. background=False - explain сразу
+    в вызывающем потоке (бенчмарки, сопоставляющие записи запросам).
+    """
+
+    def __init__(self, threshold_ms: float = 100.0, sample_rate: float = 1.0, connection=None,
+                 jsonl_path: Optional[str] = None, capped_size_mb: int = 64,
+                 explain_time_limit_ms: int = 5000, explain_interval_sec: float = 60.0,
+                 max_pending: int = 100, background: bool = True):
+        if connection is None and jsonl_path is None:
+            raise ValueError("connection or jsonl_path is required")
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.connection = connection
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.capped_size_mb = capped_size_mb
+        self.explain_time_limit_ms = explain_time_limit_ms
+        self.explain_interval_sec = explain_interval_sec
+        self.background = background
+        self.recorded = 0
+        self.explains_skipped = 0
+        self._lock = threading.Lock()
+        self._collection_ready = False
+        self._last_explain: Dict[str, float] = {}
+        self._pending: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._worker: Optional[threading.Thread] = None
+
+    def observe(self, operation: str, collection: str, query: Any, duration_ms: float,
+                explain: Callable[[], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Проверка порога и запись; explain вызывается только для медленных запросов"""
+        if duration_ms < self.threshold_ms or random.random() >= self.sample_rate:
+            return None
+
+        shape = query_shape(query)
+        entry = {
+            "ts": time.time(),
+            "operation": operation,
+            "collection": collection,
+            "shape_key": f"{operation} {collection} {json.dumps(shape, ensure_ascii=False, default=str)}",
+            "shape": shape,
+            "duration_ms": round(duration_ms, 3),
+        }
+        if not self._explain_due(entry["shape_key"]):
+            self._write(entry)
+        elif not self.background:
+            self._explain_and_write(entry, explain)
+        else:
+            try:
+                self._pending.put_nowait((entry, explain))
+                self._ensure_worker()
+            except queue.Full:
+                with self._lock:
+                    self.explains_skipped += 1
+                self._write(entry)
+        return entry
+
+    def _explain_due(self, shape_key: str) -> bool:
+        """Пора ли снова делать explain для формы"""
+        now = time.time()
+        with self._lock:
+            last = self._last_explain.get(shape_key)
+            if last is not None and now - last < self.explain_interval_sec:
+                self.explains_skipped += 1
+                return False
+            self._last_explain[shape_key] = now
+            return True
+
+    def _explain_and_write(self, entry: Dict[str, Any], explain: Callable[[], Dict[str, Any]]) -> None:
+        try:
+            entry["explain"] = summarize_explain(explain())
+        except Exception as e:
+            entry["explain_error"] = str(e)
+        self._write(entry)
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, name="slow-query-explain", daemon=True)
+                self._worker.start()
+
+    def _run_worker(self) -> None:
+        while True:
+            entry, explain = self._pending.get()
+            try:
+                self._explain_and_write(entry, explain)
+            except Exception:
+                pass  # ошибка записи журнала не должна останавливать поток
+            finally:
+                self._pending.task_done()
+
+    def flush(self) -> None:
+        """Дождаться выполнения explain из очереди"""
+        self._pending.join()
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            if self.jsonl_path is not None:
+                self.jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+            else:
+                self._ensure_collection()
+                # Форма запроса хранится строкой: ключи вида "$match" недопустимы в документах
+                document = {k: v for k, v in entry.items() if k != "shape"}
+                self.connection.get_collection(SLOW_QUERIES).insert_one(document)
+            self.recorded += 1
+
+    def _ensure_collection(self) -> None:
+        if self._collection_ready:
+            return
+        db = self.connection.db
+        if SLOW_QUERIES not in db.list_collection_names():
+            db.create_collection(SLOW_QUERIES, capped=True, size=self.capped_size_mb * 1024 * 1024)
+        self._collection_ready = True
+
+    @staticmethod
+    def load(connection=None, jsonl_path: Optional[str] = None,
+             since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Чтение журнала из коллекции или JSONL файла"""
+        if jsonl_path is not None:
+            with open(jsonl_path, encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = list(connection.get_collection(SLOW_QUERIES).find({}, {"_id": 0}))
+        if since is not None:
+            entries = [entry for entry in entries if entry["ts"] >= since]
+        return entries
+
+    @staticmethod
+    def group_by_shape(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Группировка по форме запроса, сортировка по суммарному времени"""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            groups.setdefault(entry["shape_key"], []).append(entry)
+
+        report = []
+        for shape_key, items in groups.items():
+            durations = sorted(item["duration_ms"] for item in items)
+            last = max(items, key=lambda item: item["ts"])
+            # explain делается не для каждой записи - берется последний выполненный
+            explained = [item for item in items if "explain" in item]
+            explain = max(explained, key=lambda item: item["ts"])["explain"] if explained else {}
+            report.append({
+                "shape_key": shape_key,
+                "operation": last["operation"],
+                "collection": last["collection"],
+                "count": len(items),
+                "total_ms": sum(durations),
+                "p50_ms": durations[len(durations) // 2],
+                "max_ms": durations[-1],
+                "plan": explain.get("plan"),
+                "index_used": explain.get("index_used"),
+                "keys_examined": explain.get("keys_examined"),
+                "docs_examined": explain.get("docs_examined"),
+                "n_returned": explain.get("n_returned"),
+                "in_memory_sort": explain.get("in_memory_sort"),
+            })
+        report.sort(key=lambda group: group["total_ms"], reverse=True)
+        return report
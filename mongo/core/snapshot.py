@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+    Read-only Catalog Snapshot (Arrow IPC, memory-mapped)
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from bisect import bisect_left
+from pathlib import Path
+import time
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from ..core.database import QueryResult
+from ..core.stage_dag import check_cancelled
+
+CATEGORIES_FILE = "categories.arrow"
+PRODUCTS_FILE = "products.arrow"
+PRODUCTS_BY_ID_FILE = "products_by_id.arrow"
+
+def write_snapshot(df, output_dir: str) -> Dict[str, Any]:
+    """Запись снапшота каталога из DataFrame исходного parquet.
+
+    Файлы пишутся без сжатия одним record batch: так их можно открыть
+    через mmap и читать без копирования. products отсортированы по
+    offer_id, для поиска по _id пишется отдельная перестановка.
+    """
+    path = Path(output_dir)
+    path.mkdir(parents=True, exist_ok=True)
+
+    categories_df = df.groupby(['Partner_Name', 'Category_ID', 'Category_FullPathName']).size().reset_index(name='total_products')
+    path_arrays = categories_df['Category_FullPathName'].str.split('\\')
+    categories = pa.table({
+        "_id": categories_df['Partner_Name'] + "_" + categories_df['Category_ID'].astype(str),
+        "partner": categories_df['Partner_Name'],
+        "category_id": categories_df['Category_ID'].astype(str),
+        "name": path_arrays.str[-1],
+        "path": categories_df['Category_FullPathName'].str.replace('\\', '/', regex=False),
+        "path_array": pa.array(path_arrays.tolist(), type=pa.list_(pa.string())),
+        "level": path_arrays.str.len().astype("int8"),
+        "parent_path": path_arrays.apply(lambda p: "/".join(p[:-1]) if len(p) > 1 else None),
+        "total_products": categories_df['total_products'].astype("int64"),
+    })
+    categories = categories.sort_by([("total_products", "descending")])
+
+    offer_ids = df['Offer_ID'].astype(str)
+    products = pa.table({
+        "_id": df['Partner_Name'] + "_" + offer_ids,
+        "partner": df['Partner_Name'],
+        "offer_id": offer_ids,
+        "name": df['Offer_Name'],
+        "type": df['Offer_Type'],
+        "category_id": df['Category_ID'].astype(str),
+        "full_path": df['Category_FullPathName'].str.replace('\\', '/', regex=False),
+    }).sort_by("offer_id")
+    by_id = pa.table({"row": pc.sort_indices(products, [("_id", "ascending")]).cast(pa.int32())})
+
+    for table, file_name in [(categories, CATEGORIES_FILE), (products, PRODUCTS_FILE), (by_id, PRODUCTS_BY_ID_FILE)]:
+        check_cancelled()
+        table = table.combine_chunks()
+        with pa.OSFile(str(path / file_name), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=max(table.num_rows, 1))
+
+    return {
+        'categories': categories.num_rows,
+        'products': products.num_rows,
+        'output': str(path)
+    }
+
+class _SortedColumn:
+    """Последовательность значений колонки (через перестановку) для bisect"""
+
+    def __init__(self, column: pa.Array, order: pa.Array = None):
+        self.column = column
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.column)
+
+    def __getitem__(self, i: int):
+        row = i if self.order is None else self.order[i].as_py()
+        return self.column[row].as_py()
+
+class CatalogSnapshot:
+    """Офлайн-бэкенд каталога поверх mmap Arrow IPC.
+
+    Страницы файлов разделяются всеми процессами-воркерами через page
+    cache; в процессе хранятся только маленькие производные индексы.
+    """
+
+    def __init__(self, snapshot_dir: str):
+        path = Path(snapshot_dir)
+        self.categories = self._open(path / CATEGORIES_FILE)
+        self.products = self._open(path / PRODUCTS_FILE)
+        self._by_id = self._open(path / PRODUCTS_BY_ID_FILE).column("row").chunk(0)
+        self._offer_ids = _SortedColumn(self.products.column("offer_id").chunk(0))
+        self._ids = _SortedColumn(self.products.column("_id").chunk(0), self._by_id)
+
+    @staticmethod
+    def _open(file_path: Path) -> pa.Table:
+        source = pa.memory_map(str(file_path), "r")
+        return pa.ipc.open_file(source).read_all()
+
+    @staticmethod
+    def _category_docs(table: pa.Table) -> List[Dict[str, Any]]:
+        documents = []
+        for row in table.to_pylist():
+            row["metadata"] = {"total_products": row.pop("total_products")}
+            documents.append(row)
+        return documents
+
+    @staticmethod
+    def _product_doc(row: Dict[str, Any]) -> Dict[str, Any]:
+        path_array = row["full_path"].split("/")
+        return {
+            "_id": row["_id"],
+            "partner": row["partner"],
+            "offer_id": row["offer_id"],
+            "name": row["name"],
+            "type": row["type"],
+            "category": {
+                "id": row["category_id"],
+                "name": path_array[-1],
+                "full_path": row["full_path"],
+                "depth": len(path_array),
+                "breadcrumbs": [{"level": i, "name": name} for i, name in enumerate(path_array, 1)]
+            }
+        }
+
+    def find_root_categories(self, partner: str = "_ozon") -> QueryResult:
+        """Корневые категории партнера"""
+        start_time = time.time()
+        mask = pc.and_(pc.equal(self.categories["partner"], partner), pc.equal(self.categories["level"], 1))
+        documents = self._category_docs(self.categories.filter(mask))
+        return QueryResult(documents, (time.time() - start_time) * 1000, query_info="snapshot: root categories")
+
+    def find_subcategories(self, parent_name: str) -> QueryResult:
+        """Категории, в path_array которых есть parent_name"""
+        start_time = time.time()
+        path_array = self.categories["path_array"].combine_chunks()
+        matches = pc.equal(pc.list_flatten(path_array), parent_name)
+        rows = pc.unique(pc.filter(pc.list_parent_indices(path_array), matches))
+        documents = self._category_docs(self.categories.take(rows))
+        return QueryResult(documents, (time.time() - start_time) * 1000, query_info="snapshot: subcategories")
+
+    def get_top_categories(self, limit: int = 10) -> QueryResult:
+        """Топ категорий по количеству товаров (файл уже отсортирован)"""
+        start_time = time.time()
+        top = self.categories.slice(0, limit).select(["_id", "name", "level", "partner", "total_products"])
+        documents = self._category_docs(top)
+        return QueryResult(documents, (time.time() - start_time) * 1000, query_info="snapshot: top categories")
+
+    @staticmethod
+    def _project(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+        """Проекция {field: 1} как в MongoDB: выбранные поля (пути с точками) и _id"""
+        projected: Dict[str, Any] = {"_id": doc["_id"]}
+        for field in fields:
+            source, target = doc, projected
+            parts = field.split(".")
+            for part in parts[:-1]:
+                source = source.get(part) if isinstance(source, dict) else None
+                if not isinstance(source, dict):
+                    break
+                target = target.setdefault(part, {})
+            else:
+                if parts[-1] in source:
+                    target[parts[-1]] = source[parts[-1]]
+        return projected
+
+    def get_by_ids(self, ids: List[Any], key: str = "offer_id",
+                   fields: Optional[List[str]] = None) -> Tuple[QueryResult, List[Any]]:
+        """Поиск товаров по offer_id/_id бинарным поиском по отсортированным колонкам.
+
+        Как и в MongoDB, на один offer_id возвращаются товары всех партнеров.
+        """
+        start_time = time.time()
+        keys = self._offer_ids if key == "offer_id" else self._ids
+
+        rows, missing = [], []
+        for value in dict.fromkeys(ids):
+            i = bisect_left(keys, str(value))
+            matched = []
+            while i < len(keys) and keys[i] == str(value):
+                matched.append(i if keys.order is None else keys.order[i].as_py())
+                i += 1
+            if matched:
+                rows.extend(sorted(matched, key=lambda row: self.products["_id"][row].as_py()))
+            else:
+                missing.append(value)
+
+        documents = [self._product_doc(row) for row in self.products.take(rows).to_pylist()]
+        if fields is not None:
+            documents = [self._project(doc, list(set(fields) | {key})) for doc in documents]
+        result = QueryResult(documents, (time.time() - start_time) * 1000,
+                             query_info=f"snapshot: batch lookup by {key}, {len(missing)} missing")
+        return result, missing
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+    Stage Dependency Graph Runner
+"""
+
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Any, List, Optional, Callable, Iterable
+from contextvars import ContextVar
+import contextvars
+import io
+import json
+import queue
+import sys
+import threading
+import time
+
+from ..core.admission import deadline as run_deadline
+from ..core.tracing import tracer
+from ..core.profiling import thread_profile
+
+class StageCancelled(RuntimeError):
+    """Стадия отменена раннером (превышен timeout_sec)"""
+
+_cancel_event: ContextVar[Optional[threading.Event]] = ContextVar("stage_cancel", default=None)
+
+def cancelled() -> bool:
+    """Отменена ли текущая стадия"""
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
+
+def check_cancelled() -> None:
+    """Точка отмены для циклов стадии: StageCancelled, если стадия отменена"""
+    if cancelled():
+        raise StageCancelled("stage cancelled")
+
+@dataclass
+class Stage:
+    """Стадия пайплайна: функция без аргументов, возвращающая код выхода"""
+    name: str
+    func: Callable[[], Optional[int]]
+    deps: List[str] = field(default_factory=list)
+    timeout_sec: Optional[float] = None
+    description: str = ""
+
+@dataclass
+class StageResult:
+    """Итог стадии: ok / failed / timeout / skipped"""
+    name: str
+    status: str
+    exit_code: Optional[int] = None
+    start_offset_sec: float = 0.0
+    duration_sec: float = 0.0
+    error: Optional[str] = None
+    output: str = ""
+
+class _ThreadRoutedStdout(io.TextIOBase):
+    """stdout, который пишет вывод стадии в ее буфер (по потоку), остальное - как обычно"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffers: Dict[int, io.StringIO] = {}
+
+    def write(self, text: str) -> int:
+        buffer = self.buffers.get(threading.get_ident())
+        return (buffer or self.stream).write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+class StageGraphRunner:
+    """Выполнение стадий по графу зависимостей.
+
+    Готовые стадии (все зависимости завершились успешно) запускаются
+    параллельно в потоках, до max_parallel одновременно. Вывод каждой
+    стадии буферизуется и печатается целиком по ее завершении. Стадия,
+    превысившая timeout_sec, помечается timeout, зависящие от неудачной
+    стадии - skipped.
+
+    Поток стадии нельзя прервать, поэтому отмена кооперативная: по
+    таймауту выставляется Event стадии - загрузчик (чтение parquet,
+    построение документов, снапшот, разделы load_data) проверяет его через
+    check_cancelled(). Сама стадия выполняется под deadline() со сроком
+    таймаута: запросы и пачки записи в MongoDB после срока не
+    отправляются, текущие обрываются по maxTimeMS.
+    """
+
+    STATUSES = ("ok", "failed", "timeout", "skipped")
+
+    def __init__(self, stages: List[Stage], max_parallel: int = 3):
+        self.stages = {stage.name: stage for stage in stages}
+        self.max_parallel = max(max_parallel, 1)
+        for stage in stages:
+            unknown = [dep for dep in stage.deps if dep not in self.stages]
+            if unknown:
+                raise ValueError(f"stage {stage.name}: unknown dependencies {unknown}")
+
+    def select(self, only: Optional[Iterable[str]] = None, skip: Optional[Iterable[str]] = None) -> List[str]:
+        """Выбор стадий; зависимости от невыбранных стадий считаются выполненными"""
+        names = list(self.stages)
+        for requested in (only or []), (skip or []):
+            unknown = [name for name in requested if name not in self.stages]
+            if unknown:
+                raise ValueError(f"unknown stages: {unknown} (available: {', '.join(names)})")
+        if only:
+            names = [name for name in names if name in set(only)]
+        if skip:
+            names = [name for name in names if name not in set(skip)]
+        return names
+
+    def run(self, only: Optional[Iterable[str]] = None, skip: Optional[Iterable[str]] = None,
+            default_timeout_sec: Optional[float] = None) -> List[StageResult]:
+        selected = self.select(only, skip)
+        results: Dict[str, StageResult] = {}
+        running: Dict[str, tuple] = {}  # name -> (started, deadline)
+        cancel_events: Dict[str, threading.Event] = {}
+        finished: "queue.Queue[tuple]" = queue.Queue()
+        run_start = time.time()
+
+        stdout = _ThreadRoutedStdout(sys.stdout)
+        original_stdout, sys.stdout = sys.stdout, stdout
+
+        def execute(stage: Stage, context: contextvars.Context, cancel: threading.Event,
+                    deadline_at: Optional[float]) -> None:
+            buffer = io.StringIO()
+            stdout.buffers[threading.get_ident()] = buffer
+            exit_code, error = None, None
+            try:
+                def call():
+                    _cancel_event.set(cancel)
+                    with run_deadline(at=deadline_at), thread_profile(), tracer.span(f"stage {stage.name}") as span:
+                        code = stage.func()
+                        span.set_attribute("exit_code", code or 0)
+                        return code
+                exit_code = context.run(call)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                stdout.buffers.pop(threading.get_ident(), None)
+                finished.put((stage.name, exit_code, error, buffer.getvalue(), time.time()))
+
+        def report(result: StageResult) -> None:
+            results[result.name] = result
+            original_stdout.write(result.output)
+            line = f" [{result.status.upper():>7}] {result.name} ({result.duration_sec:.1f} с)"
+            if result.error:
+                line += f": {result.error}"
+            original_stdout.write(line + "\n")
+            original_stdout.flush()
+
+        try:
+            while len(results) < len(selected):
+                # Запуск готовых стадий и пропуск стадий с неудачными зависимостями
+                progressed = False
+                for name in selected:
+                    if name in results or name in running:
+                        continue
+                    deps = [dep for dep in self.stages[name].deps if dep in selected]
+                    failed = [dep for dep in deps if dep in results and results[dep].status != "ok"]
+                    if failed:
+                        report(StageResult(name, "skipped", start_offset_sec=time.time() - run_start,
+                                           error=f"dependency {failed[0]} {results[failed[0]].status}"))
+                        progressed = True
+                        continue
+                    if all(dep in results for dep in deps) and len(running) < self.max_parallel:
+                        stage = self.stages[name]
+                        timeout = stage.timeout_sec if stage.timeout_sec is not None else default_timeout_sec
+                        started = time.time()
+                        running[name] = (started, started + timeout if timeout else None)
+                        cancel_events[name] = threading.Event()
+                        original_stdout.write(f" [  START] {name}\n")
+                        threading.Thread(target=execute,
+                                         args=(stage, contextvars.copy_context(), cancel_events[name],
+                                               time.monotonic() + timeout if timeout else None),
+                                         name=f"stage-{name}", daemon=True).start()
+                        progressed = True
+
+                if not running:
+                    if not progressed:
+                        raise ValueError(f"dependency cycle among stages: {[n for n in selected if n not in results]}")
+                    continue
+
+                deadlines = [deadline for _, deadline in running.values() if deadline is not None]
+                wait = max(min(deadlines) - time.time(), 0.0) if deadlines else None
+                try:
+                    name, exit_code, error, output, ended = finished.get(timeout=wait)
+                except queue.Empty:
+                    now = time.time()
+                    for name, (started, deadline) in list(running.items()):
+                        if deadline is not None and now >= deadline:
+                            del running[name]
+                            cancel_events[name].set()
+                            report(StageResult(name, "timeout", start_offset_sec=started - run_start,
+                                               duration_sec=now - started,
+                                               error=f"exceeded {deadline - started:g} s"))
+                    continue
+
+                if name not in running:
+                    continue  # стадия уже помечена timeout
+                started, _ = running.pop(name)
+                code = exit_code or 0
+                status = "ok" if error is None and code == 0 else "failed"
+                report(StageResult(name, status, exit_code=None if error else code,
+                                   start_offset_sec=started - run_start, duration_sec=ended - started,
+                                   error=error, output=output))
+        finally:
+            sys.stdout = original_stdout
+            # Незавершенные стадии (прерванный run) тоже отменяются
+            for event in cancel_events.values():
+                event.set()
+
+        return [results[name] for name in selected]
+
+    def describe(self) -> List[str]:
+        """Граф стадий в текстовом виде"""
+        lines = []
+        for stage in self.stages.values():
+            deps = f" <- {', '.join(stage.deps)}" if stage.deps else ""
+            lines.append(f"{stage.name:<10}{deps:<20} {stage.description}")
+        return lines
+
+def timing_report(results: List[StageResult], total_sec: float) -> Dict[str, Any]:
+    """Машиночитаемый отчет по стадиям"""
+    busy = sum(result.duration_sec for result in results)
+    return {
+        "total_sec": round(total_sec, 3),
+        "stages_sec": round(busy, 3),
+        "parallelism": round(busy / total_sec, 2) if total_sec > 0 else None,
+        "ok": all(result.status == "ok" for result in results),
+        "stages": [
+            {k: (round(v, 3) if isinstance(v, float) else v) for k, v in asdict(result).items() if k != "output"}
+            for result in results
+        ],
+    }
+
+def write_timing_report(report: Dict[str, Any], path: str) -> None:
+    """JSON отчет в файл или stdout ("-")"""
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if path == "-":
+        print(text)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
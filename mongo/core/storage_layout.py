@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+    Storage Layout Experiment (block compressor x index prefix compression x schema)
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from dataclasses import dataclass
+from itertools import product
+import statistics
+import time
+
+from ..core.database import MongoDBConnection, MongoDBBaseOperations
+from ..core.services import IndexingService, ProductQueryService
+from ..core.schema_v2 import CategoryTreeCache, product_to_v2
+
+BLOCK_COMPRESSORS = ("snappy", "zstd", "none")
+SCHEMAS = (1, 2)
+LAYOUT_PREFIX = "layout_"
+
+@dataclass
+class LayoutVariant:
+    """Вариант хранения products: сжатие блоков, префиксное сжатие индексов, схема"""
+    block_compressor: str = "snappy"
+    prefix_compression: bool = True
+    schema_version: int = 1
+
+    @property
+    def collection(self) -> str:
+        prefix = "pfx" if self.prefix_compression else "nopfx"
+        return f"{LAYOUT_PREFIX}v{self.schema_version}_{self.block_compressor}_{prefix}"
+
+    @property
+    def collection_options(self) -> Dict[str, Any]:
+        return {"storageEngine": {"wiredTiger": {"configString": f"block_compressor={self.block_compressor}"}}}
+
+    def index_specs(self) -> List[Dict[str, Any]]:
+        """Индексы схемы с prefix_compression в configString каждого индекса"""
+        base = IndexingService.PRODUCTS_V2_INDEXES if self.schema_version == 2 else IndexingService.PRODUCTS_INDEXES
+        engine = {"wiredTiger": {"configString": f"prefix_compression={str(self.prefix_compression).lower()}"}}
+        return [
+            {**spec, "storageEngine": engine} if isinstance(spec, dict) else {"keys": spec, "storageEngine": engine}
+            for spec in base
+        ]
+
+def all_variants(compressors: List[str], prefix_options: List[bool], schemas: List[int]) -> List[LayoutVariant]:
+    """Полный перебор вариантов"""
+    return [LayoutVariant(c, p, s) for s, c, p in product(schemas, compressors, prefix_options)]
+
+# Запросы сравнения: (имя, вызов сервиса, параметры из QueryParameters)
+QUERIES: List[Tuple[str, Callable[[ProductQueryService, "QueryParameters"], Any]]] = [
+    ("type + breadcrumb", lambda s, q: s.find_products_by_type_and_category(q.product_type, q.root)),
+    ("уровень 4 + type", lambda s, q: s.get_products_by_level(4, q.product_type)),
+    ("поддерево, limit 100", lambda s, q: s.find_products_in_subtree(q.subtree, limit=100)),
+    ("фасеты поддерева", lambda s, q: s.get_category_facets(q.subtree)),
+    ("пакет по offer_id", lambda s, q: s.get_by_ids(q.offer_ids)),
+    ("агрегация 1-го уровня", lambda s, q: s.aggregate_by_first_level_categories()),
+]
+
+class QueryParameters:
+    """Параметры запросов по исходной коллекции (одинаковые для всех вариантов)"""
+
+    def __init__(self, db_ops: MongoDBBaseOperations, source: str, sample_ids: int = 1000):
+        top = db_ops.connection.get_collection("categories").find_one(
+            {"level": {"$gte": 2}}, sort=[("metadata.total_products", -1)]
+        )
+        coll = db_ops.connection.get_collection(source)
+        sample = coll.find_one({"category.id": top["category_id"]})
+        self.root = top["path_array"][0]
+        self.subtree = "/".join(top["path_array"][:2])
+        self.product_type = sample["type"]
+        self.offer_ids = [doc["offer_id"] for doc in coll.aggregate([
+            {"$sample": {"size": sample_ids}}, {"$project": {"offer_id": 1}}
+        ])]
+
+class StorageLayoutExperiment:
+    """Один и тот же каталог в коллекциях layout_* рядом друг с другом.
+
+    Исходная коллекция читается один раз: каждая пачка документов
+    (v2 - после конвертации через CategoryTreeCache) вставляется во все
+    варианты, время вставки считается по каждому варианту отдельно.
+    Затем строятся индексы и для каждого варианта снимаются размер на
+    диске (storageSize), размер индексов и p50 задержки запросов.
+    """
+
+    def __init__(self, connection: MongoDBConnection, variants: List[LayoutVariant],
+                 source: str = "products", batch_size: int = 5000, repeats: int = 5):
+        self.connection = connection
+        self.db_ops = MongoDBBaseOperations(connection)
+        self.variants = variants
+        self.source = source
+        self.batch_size = batch_size
+        self.repeats = repeats
+        self.cache: Optional[CategoryTreeCache] = None
+
+    def prepare(self) -> None:
+        """Пересоздание коллекций вариантов с нужным block_compressor"""
+        db = self.connection.db
+        for variant in self.variants:
+            db.drop_collection(variant.collection)
+            db.create_collection(variant.collection, **variant.collection_options)
+        if any(variant.schema_version == 2 for variant in self.variants):
+            categories = self.db_ops.find("categories", {}).documents
+            self.cache = CategoryTreeCache(CategoryTreeCache.build_nodes(categories))
+
+    def load(self, limit: int = 0) -> Dict[str, Dict[str, Any]]:
+        """Копирование каталога во все варианты; документов/сек по варианту"""
+        insert_sec = {variant.collection: 0.0 for variant in self.variants}
+        cursor = self.connection.get_collection(self.source).find({}).batch_size(self.batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        loaded = 0
+        batch: List[Dict[str, Any]] = []
+
+        def flush() -> None:
+            converted = {1: batch}
+            if self.cache is not None:
+                start = time.time()
+                converted[2] = [product_to_v2(doc, self.cache) for doc in batch]
+                # Конвертация - часть стоимости загрузки v2
+                for variant in self.variants:
+                    if variant.schema_version == 2:
+                        insert_sec[variant.collection] += time.time() - start
+            for variant in self.variants:
+                start = time.time()
+                self.connection.get_collection(variant.collection).insert_many(
+                    converted[variant.schema_version], ordered=False
+                )
+                insert_sec[variant.collection] += time.time() - start
+
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                flush()
+                loaded += len(batch)
+                batch = []
+        if batch:
+            flush()
+            loaded += len(batch)
+
+        return {
+            collection: {"docs": loaded, "load_sec": round(seconds, 3),
+                         "docs_per_sec": round(loaded / max(seconds, 1e-6))}
+            for collection, seconds in insert_sec.items()
+        }
+
+    def build_indexes(self) -> Dict[str, float]:
+        """Индексы схемы варианта; время построения, мс"""
+        return {
+            variant.collection: self.db_ops.create_indexes(variant.collection, variant.index_specs()).execution_time_ms
+            for variant in self.variants
+        }
+
+    def sizes(self, variant: LayoutVariant) -> Dict[str, Any]:
+        """Размеры по collStats: size - несжатые данные, storageSize - на диске"""
+        self.db_ops.checkpoint()
+        stats = self.db_ops.get_collection_stats(variant.collection)
+        creation = stats.get("wiredTiger", {}).get("creationString", "")
+        return {
+            "data_bytes": stats.get("size", 0),
+            "storage_bytes": stats.get("storageSize", 0),
+            "index_bytes": stats.get("totalIndexSize", 0),
+            "index_sizes": stats.get("indexSizes", {}),
+            "avg_doc_bytes": stats.get("avgObjSize", 0),
+            "compressor_applied": f"block_compressor={variant.block_compressor}" in creation,
+        }
+
+    def measure_queries(self, variant: LayoutVariant, params: QueryParameters) -> Dict[str, float]:
+        """p50 задержки запросов (мс) после прогрева"""
+        service = ProductQueryService(self.db_ops, schema_version=variant.schema_version,
+                                      category_cache=self.cache, facet_ttl_sec=0,
+                                      collection=variant.collection)
+        latencies = {}
+        for name, query in QUERIES:
+            query(service, params)
+            timings = []
+            for _ in range(self.repeats):
+                start = time.perf_counter()
+                query(service, params)
+                timings.append((time.perf_counter() - start) * 1000)
+            latencies[name] = round(statistics.median(timings), 3)
+        return latencies
+
+    def run(self, limit: int = 0, latency_weight: float = 0.5) -> List[Dict[str, Any]]:
+        """Эксперимент целиком; результаты с оценкой и флагом Парето-оптимальности"""
+        params = QueryParameters(self.db_ops, self.source)
+        self.prepare()
+        loads = self.load(limit)
+        index_ms = self.build_indexes()
+
+        results = []
+        for variant in self.variants:
+            results.append({
+                "collection": variant.collection,
+                "block_compressor": variant.block_compressor,
+                "prefix_compression": variant.prefix_compression,
+                "schema_version": variant.schema_version,
+                **loads[variant.collection],
+                "index_build_ms": round(index_ms[variant.collection], 1),
+                **self.sizes(variant),
+                "latency_ms": self.measure_queries(variant, params),
+            })
+        return self.score(results, latency_weight)
+
+    @staticmethod
+    def score(results: List[Dict[str, Any]], latency_weight: float = 0.5) -> List[Dict[str, Any]]:
+        """Стоимость = диск + индексы, задержка = сумма p50.
+
+        score - взвешенная сумма отношений к лучшему варианту (1.0 - лучший
+        по обоим); pareto - нет варианта, который не хуже по обоим и лучше
+        хотя бы по одному.
+        """
+        for result in results:
+            result["total_bytes"] = result["storage_bytes"] + result["index_bytes"]
+            result["total_latency_ms"] = round(sum(result["latency_ms"].values()), 3)
+
+        min_bytes = min((r["total_bytes"] for r in results), default=0) or 1
+        min_latency = min((r["total_latency_ms"] for r in results), default=0) or 1e-3
+        for result in results:
+            result["score"] = round(latency_weight * result["total_latency_ms"] / min_latency
+                                    + (1 - latency_weight) * result["total_bytes"] / min_bytes, 3)
+            result["pareto"] = not any(
+                other is not result
+                and other["total_bytes"] <= result["total_bytes"]
+                and other["total_latency_ms"] <= result["total_latency_ms"]
+                and (other["total_bytes"] < result["total_bytes"] or other["total_latency_ms"] < result["total_latency_ms"])
+                for other in results
+            )
+        return sorted(results, key=lambda r: r["score"])
+
+    def cleanup(self) -> None:
+        """Удаление коллекций вариантов"""
+        for variant in self.variants:
+            self.connection.db.drop_collection(variant.collection)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+    Synthetic Catalog Generator (Parquet, same schema as the Ozon offers dataset)
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from functools import lru_cache
+from pathlib import Path
+import json
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from ..core.database import QueryResult
+
+MAX_DEPTH = 8
+# Доли по уровням 1..8 (как в исходном датасете: 64% товаров на 4-м уровне)
+CATEGORY_DEPTH_SHARES = (0.004, 0.03, 0.17, 0.55, 0.16, 0.06, 0.02, 0.006)
+PRODUCT_DEPTH_SHARES = (0.002, 0.02, 0.16, 0.64, 0.12, 0.04, 0.013, 0.005)
+
+ROOT_NAMES = [
+    "Электроника", "Одежда", "Обувь", "Дом и сад", "Детские товары", "Красота и здоровье",
+    "Бытовая техника", "Спорт и отдых", "Строительство и ремонт", "Продукты питания", "Аптека",
+    "Товары для животных", "Книги", "Хобби и творчество", "Автотовары", "Мебель",
+    "Канцелярские товары", "Ювелирные украшения", "Аксессуары", "Туризм, рыбалка, охота",
+]
+GROUP_NAMES = [
+    "Инструменты", "Аксессуары", "Комплектующие", "Насосы", "Светильники", "Кабели и переходники",
+    "Посуда", "Текстиль", "Игрушки", "Витамины", "Удобрения", "Семена", "Краски", "Клеи и герметики",
+    "Крепеж", "Смесители", "Фильтры", "Запчасти", "Шины и диски", "Масла и жидкости", "Ноутбуки",
+    "Смартфоны", "Наушники", "Часы", "Сумки", "Рюкзаки", "Куртки", "Платья", "Брюки", "Кроссовки",
+    "Ботинки", "Кремы", "Шампуни", "Парфюмерия", "Тренажеры", "Велосипеды", "Палатки", "Удочки",
+    "Корма", "Лежанки", "Ручки", "Тетради", "Наборы для творчества", "Пазлы", "Конструкторы",
+    "Кровати", "Стулья", "Шкафы", "Полки", "Ковры", "Шторы", "Подушки", "Чайники", "Пылесосы",
+    "Холодильники", "Микроволновки", "Кофемашины", "Электроинструменты", "Пневмоинструменты",
+    "Садовая техника", "Системы полива", "Сантехника", "Обои", "Плитка", "Двери", "Окна",
+]
+GROUP_QUALIFIERS = [
+    "для дома", "для дачи", "для детей", "для авто", "для кухни", "для спорта", "для офиса",
+    "для ванной", "для сада", "и аксессуары", "и комплектующие", "профессиональные", "бытовые",
+]
+TYPE_NOUNS = [
+    "Степлер", "Насос", "Кабель", "Фонарь", "Светильник", "Чайник", "Пылесос", "Рюкзак", "Набор",
+    "Шампунь", "Крем", "Конструктор", "Пазл", "Ковер", "Стул", "Шкаф", "Фильтр", "Смеситель",
+    "Клей", "Герметик", "Держатель", "Чехол", "Адаптер", "Коврик", "Контейнер", "Органайзер",
+    "Молоток", "Перфоратор", "Шуруповерт", "Лобзик", "Секатор", "Шланг", "Термос", "Фен",
+]
+TYPE_QUALIFIERS = [
+    "", "строительный", "электрический", "ручной", "садовый", "компактный", "профессиональный",
+    "детский", "беспроводной", "автомобильный", "универсальный", "складной", "металлический",
+]
+BRANDS = [
+    "Зубр", "Интерскол", "Калибр", "Вихрь", "Сибртех", "Бирюса", "Patriot", "Stayer", "Bosch",
+    "Makita", "Redmond", "Polaris", "Xiaomi", "Samsung", "Tefal", "Scarlett", "Gorenje", "Deko",
+    "Лесная сказка", "Мир детства", "Домовенок", "Уют", "Гамма", "Эра", "Navigator", "Gardena",
+]
+SERIES = ["", "Pro ", "Mini ", "Max ", "Lite ", "Эко ", "Плюс "]
+PARTNER_NAMES = ["_ozon", "_wildberries", "_yandex_market", "_megamarket", "_lamoda",
+                 "_dns", "_citilink", "_leroy_merlin"]
+
+OFFER_ID_BASE = 1_000_000_000
+CATEGORY_ID_BASE = 10_000
+
+@dataclass
+class CatalogSpec:
+    """Параметры генерации: один seed -> один и тот же каталог.
+
+    Таблица делится на чанки по chunk_rows строк, у каждого чанка свой
+    генератор np.random.default_rng([seed, chunk]) - результат не зависит
+    от числа процессов.
+    """
+    rows: int = 1_000_000
+    seed: int = 42
+    categories: int = 5000
+    partners: int = 3
+    category_skew: float = 1.1  # показатель Zipf для товаров на категорию
+    partner_skew: float = 1.5
+    chunk_rows: int = 1_000_000
+    category_depth_shares: Tuple[float, ...] = field(default=CATEGORY_DEPTH_SHARES)
+    product_depth_shares: Tuple[float, ...] = field(default=PRODUCT_DEPTH_SHARES)
+
+    @property
+    def chunks(self) -> int:
+        return max(1, -(-self.rows // self.chunk_rows))
+
+    def chunk_bounds(self, chunk: int) -> Tuple[int, int]:
+        start = chunk * self.chunk_rows
+        return start, min(start + self.chunk_rows, self.rows)
+
+def _zipf_weights(n: int, skew: float, rng: np.random.Generator) -> np.ndarray:
+    """Веса Zipf 1/rank^skew в случайном порядке рангов"""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return rng.permutation(weights)
+
+def _depth_counts(total: int, shares: Tuple[float, ...]) -> List[int]:
+    """Число категорий на каждом уровне (не меньше одной на уровень)"""
+    shares = np.asarray(shares, dtype=float) / sum(shares)
+    counts = np.maximum(np.floor(shares * total).astype(int), 1)
+    counts[int(np.argmax(shares))] += total - counts.sum()
+    return [int(c) for c in counts]
+
+def _group_name(rng: np.random.Generator) -> str:
+    name = GROUP_NAMES[rng.integers(len(GROUP_NAMES))]
+    if rng.random() < 0.5:
+        qualifier = GROUP_QUALIFIERS[rng.integers(len(GROUP_QUALIFIERS))]
+        if not (qualifier.startswith("и ") and " и " in name):
+            name = f"{name} {qualifier}"
+    elif rng.random() < 0.1:
+        name = f"Прочие {name.lower()}"
+    return name
+
+class CatalogTaxonomy:
+    """Дерево категорий: пути через '\\', глубина 1..8, веса товаров по категориям"""
+
+    def __init__(self, spec: CatalogSpec):
+        rng = np.random.default_rng([spec.seed, 0xCA7])
+        targets = _depth_counts(spec.categories, spec.category_depth_shares)
+
+        # Размер уровня: категории уровня + предки для более глубоких уровней
+        sizes = [0] * MAX_DEPTH
+        for depth in reversed(range(1, MAX_DEPTH)):
+            below = sizes[depth + 1] if depth + 1 < MAX_DEPTH else 0
+            sizes[depth] = max(targets[depth], -(-below // 3))
+        # Корней немного, как в исходном каталоге: широкое ветвление сверху
+        sizes[0] = max(targets[0], min(len(ROOT_NAMES), sizes[1]))
+
+        levels: List[List[str]] = [[]]
+        used = set()
+        for i in range(sizes[0]):
+            root = ROOT_NAMES[i % len(ROOT_NAMES)]
+            levels[0].append(root if i < len(ROOT_NAMES) else f"{root} {i // len(ROOT_NAMES) + 1}")
+        used.update(levels[0])
+        for depth in range(1, MAX_DEPTH):
+            parents = levels[depth - 1]
+            level = []
+            for i in range(sizes[depth]):
+                # Сначала по одному потомку на родителя по порядку, остальные - случайно
+                parent = parents[i] if i < len(parents) else parents[rng.integers(len(parents))]
+                path = f"{parent}\\{_group_name(rng)}"
+                suffix = 2
+                while path in used:
+                    path = f"{parent}\\{_group_name(rng)} {suffix}"
+                    suffix += 1
+                used.add(path)
+                level.append(path)
+            levels.append(level)
+
+        paths, depths = [], []
+        for depth, level in enumerate(levels, 1):
+            chosen = rng.choice(len(level), size=targets[depth - 1], replace=False)
+            paths.extend(level[i] for i in sorted(chosen))
+            depths.extend([depth] * len(chosen))
+
+        self.paths = paths
+        self.depths = np.asarray(depths, dtype=np.int8)
+        ids = CATEGORY_ID_BASE + rng.permutation(len(paths) * 10)[:len(paths)]
+        self.ids = [str(i) for i in ids]
+
+        # Вероятность товара в категории: доля уровня x Zipf внутри уровня
+        probabilities = np.zeros(len(paths))
+        shares = np.asarray(spec.product_depth_shares, dtype=float) / sum(spec.product_depth_shares)
+        for depth in range(1, MAX_DEPTH + 1):
+            mask = self.depths == depth
+            weights = _zipf_weights(int(mask.sum()), spec.category_skew, rng)
+            probabilities[mask] = shares[depth - 1] * weights / weights.sum()
+        self.probabilities = probabilities / probabilities.sum()
+
+        # 1..6 типов товаров на категорию
+        type_counts = rng.integers(1, 7, size=len(paths))
+        self.type_offsets = np.concatenate([[0], np.cumsum(type_counts)[:-1]])
+        self.type_counts = type_counts
+        self.type_names = [
+            f"{TYPE_NOUNS[rng.integers(len(TYPE_NOUNS))]} {TYPE_QUALIFIERS[rng.integers(len(TYPE_QUALIFIERS))]}".strip()
+            for _ in range(int(type_counts.sum()))
+        ]
+
+        partners = [PARTNER_NAMES[i] if i < len(PARTNER_NAMES) else f"_partner_{i}"
+                    for i in range(max(spec.partners, 1))]
+        partner_weights = 1.0 / np.arange(1, len(partners) + 1) ** spec.partner_skew
+        self.partners = partners
+        self.partner_probabilities = partner_weights / partner_weights.sum()
+
+@lru_cache(maxsize=4)
+def _taxonomy(spec_json: str) -> CatalogTaxonomy:
+    """Дерево строится заново в каждом процессе (детерминированно) - не передается через pickle"""
+    spec = json.loads(spec_json)
+    spec["category_depth_shares"] = tuple(spec["category_depth_shares"])
+    spec["product_depth_shares"] = tuple(spec["product_depth_shares"])
+    return CatalogTaxonomy(CatalogSpec(**spec))
+
+def generate_chunk(spec: CatalogSpec, chunk: int) -> pa.Table:
+    """Строки чанка [chunk * chunk_rows, ...) в схеме исходного parquet"""
+    taxonomy = _taxonomy(json.dumps(asdict(spec)))
+    start, end = spec.chunk_bounds(chunk)
+    size = end - start
+    rng = np.random.default_rng([spec.seed, chunk])
+
+    categories = rng.choice(len(taxonomy.paths), size=size, p=taxonomy.probabilities)
+    partners = rng.choice(len(taxonomy.partners), size=size, p=taxonomy.partner_probabilities)
+    types = taxonomy.type_offsets[categories] + (rng.random(size) * taxonomy.type_counts[categories]).astype(np.int64)
+    brands = rng.integers(len(BRANDS), size=size)
+    series = rng.integers(len(SERIES), size=size)
+    models = rng.integers(100, 10000, size=size)
+
+    offer_types = pa.array(taxonomy.type_names).take(pa.array(types))
+    model_names = pc.binary_join_element_wise(
+        pa.array(SERIES).take(pa.array(series)), pc.cast(pa.array(models), pa.string()), "")
+    return pa.table({
+        "Partner_Name": pa.array(taxonomy.partners).take(pa.array(partners)),
+        "Category_ID": pa.array(taxonomy.ids).take(pa.array(categories)),
+        "Category_FullPathName": pa.array(taxonomy.paths).take(pa.array(categories)),
+        "Offer_ID": pc.cast(pa.array(np.arange(start, end, dtype=np.int64) + OFFER_ID_BASE), pa.string()),
+        "Offer_Name": pc.binary_join_element_wise(
+            offer_types, pa.array(BRANDS).take(pa.array(brands)), model_names, " "),
+        "Offer_Type": offer_types,
+    })
+
+def write_chunk(spec: CatalogSpec, chunk: int, output_path: str) -> Dict[str, Any]:
+    """Генерация и запись одного part-файла (выполняется в дочернем процессе)"""
+    start_time = time.time()
+    table = generate_chunk(spec, chunk)
+    pq.write_table(table, output_path, compression="zstd")
+    taxonomy = _taxonomy(json.dumps(asdict(spec)))
+    depths = pc.list_value_length(pc.split_pattern(table["Category_FullPathName"], "\\")).to_numpy()
+    return {
+        "path": output_path,
+        "rows": table.num_rows,
+        "bytes": Path(output_path).stat().st_size,
+        "seconds": time.time() - start_time,
+        "depth_counts": np.bincount(depths, minlength=MAX_DEPTH + 1)[1:].tolist(),
+        "categories": len(taxonomy.paths),
+    }
+
+class SyntheticCatalogGenerator:
+    """Генерация parquet-каталога part-файлами в пуле процессов"""
+
+    def __init__(self, spec: CatalogSpec, workers: int = 4):
+        self.spec = spec
+        self.workers = workers
+
+    def generate(self, output_dir: str, single_file: Optional[str] = None) -> QueryResult:
+        """output_dir/part-NNNNN.parquet; single_file - дополнительно склеить в один файл"""
+        start_time = time.time()
+        path = Path(output_dir)
+        path.mkdir(parents=True, exist_ok=True)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(write_chunk, self.spec, chunk, str(path / f"part-{chunk:05d}.parquet"))
+                for chunk in range(self.spec.chunks)
+            ]
+            parts = [future.result() for future in futures]
+
+        with open(path / "_spec.json", "w", encoding="utf-8") as f:
+            json.dump(asdict(self.spec), f, indent=2)
+
+        if single_file:
+            self.merge_parts([part["path"] for part in parts], single_file)
+
+        execution_time = time.time() - start_time
+        rows = sum(part["rows"] for part in parts)
+        return QueryResult(parts, execution_time * 1000, count=rows,
+                           query_info=f"Generated {rows} rows in {len(parts)} parts, {self.workers} workers")
+
+    @staticmethod
+    def merge_parts(part_paths: List[str], output_path: str) -> str:
+        """Потоковая склейка part-файлов по row group (память - один row group)"""
+        writer: Optional[pq.ParquetWriter] = None
+        for part_path in part_paths:
+            part = pq.ParquetFile(part_path)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, part.schema_arrow, compression="zstd")
+            for i in range(part.num_row_groups):
+                writer.write_table(part.read_row_group(i))
+        if writer is not None:
+            writer.close()
+        return output_path
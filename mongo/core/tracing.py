@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+    Tracing Spans (OpenTelemetry-compatible JSON export)
+"""
+
+from typing import Dict, Any, List, Optional, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+import contextvars
+from pathlib import Path
+import functools
+import json
+import os
+import threading
+import time
+
+class Span:
+    """Интервал выполнения: имя, родитель, длительность и атрибуты (rows, bytes, ...)"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns",
+                 "attributes", "status", "children", "depth")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None, depth: int = 0):
+        self.name = name
+        self.depth = depth
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "OK"
+        self.children: List["Span"] = []
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add(self, key: str, value: int) -> None:
+        """Накопление счетчика (rows, bytes) по нескольким вызовам"""
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def record_result(self, result: Any) -> None:
+        """rows из QueryResult, кортежа (QueryResult, stats) или словаря QueryResult"""
+        if isinstance(result, tuple) and result:
+            result = result[0]
+        if isinstance(result, dict):
+            counts = [r.count for r in result.values() if hasattr(r, "execution_time_ms")]
+            if counts:
+                self.set_attribute("rows", sum(counts))
+        elif hasattr(result, "execution_time_ms"):
+            self.set_attribute("rows", result.count)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Span в формате OTLP/JSON"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 1 if self.status == "OK" else 2},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+class _NoopSpan:
+    """Span при выключенной трассировке"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add(self, key: str, value: int) -> None:
+        pass
+
+    def record_result(self, result: Any) -> None:
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class Tracer:
+    """Трассировщик с вложенными span'ами.
+
+    Текущий span хранится в contextvars: вложенность сохраняется в пределах
+    потока/задачи. По умолчанию выключен - span() ничего не записывает.
+    hooks - объекты с on_span_start(span, depth)/on_span_end(span, depth)
+    (например, профайлер памяти по фазам).
+    """
+
+    def __init__(self, service_name: str = "mongodb-lab"):
+        self.service_name = service_name
+        self.enabled = False
+        self.roots: List[Span] = []
+        self.hooks: List[Any] = []
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.roots = []
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Вложенный span: with tracer.span("read_parquet", path=...) as span"""
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = self._current.get()
+        span = Span(name, parent.trace_id if parent else os.urandom(16).hex(),
+                    parent.span_id if parent else None, attributes,
+                    depth=parent.depth + 1 if parent else 0)
+        with self._lock:
+            (parent.children if parent else self.roots).append(span)
+
+        for hook in self.hooks:
+            hook.on_span_start(span, span.depth)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "ERROR"
+            span.set_attribute("exception.type", type(e).__name__)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            self._current.reset(token)
+            for hook in self.hooks:
+                hook.on_span_end(span, span.depth)
+
+    def spans(self) -> List[Span]:
+        """Все span'ы (обход в глубину)"""
+        result, stack = [], list(reversed(self.roots))
+        while stack:
+            span = stack.pop()
+            result.append(span)
+            stack.extend(reversed(span.children))
+        return result
+
+    def export_json(self, path: str) -> str:
+        """Экспорт в OTLP/JSON (resourceSpans) - читается OpenTelemetry Collector и Jaeger"""
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in self.spans() if span.end_ns is not None]
+                }]
+            }]
+        }
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        return str(output)
+
+    def format_tree(self, min_ms: float = 0.0) -> List[str]:
+        """Дерево span'ов; одноименные соседние span'ы сворачиваются (xN)"""
+        lines: List[str] = []
+
+        def walk(spans: List[Span], depth: int) -> None:
+            groups: Dict[str, List[Span]] = {}
+            for span in spans:
+                groups.setdefault(span.name, []).append(span)
+            for name, group in groups.items():
+                total_ms = sum(span.duration_ms for span in group)
+                if total_ms < min_ms:
+                    continue
+                label = f"{name} x{len(group)}" if len(group) > 1 else name
+                details = []
+                for key in ("rows", "bytes"):
+                    values = [span.attributes[key] for span in group if key in span.attributes]
+                    if values:
+                        details.append(f"{key}={sum(values):,}")
+                if any(span.status != "OK" for span in group):
+                    details.append("ERROR")
+                suffix = f"  ({', '.join(details)})" if details else ""
+                lines.append(f"{'  ' * depth}{label:<{max(50 - 2 * depth, 10)}} {total_ms:>10.1f} ms{suffix}")
+                walk([child for span in group for child in span.children], depth + 1)
+
+        walk(self.roots, 0)
+        return lines
+
+tracer = Tracer()
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Декоратор: span вокруг вызова, rows берется из возвращенного QueryResult"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(span_name) as span:
+                result = func(*args, **kwargs)
+                span.record_result(result)
+                return result
+        return wrapper
+    return decorator
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor, задачи которого выполняются в копии контекста
+    вызывающего потока: span-родитель, срок (admission) и маршрут чтений
+    переходят в рабочие потоки"""
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
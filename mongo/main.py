@@ -5,11 +5,12 @@
 
 import sys
 import time
+import argparse
 from pathlib import Path
 
-# Добавляем core в Python path
+from .core.profiling import add_profile_arguments, run_profiled
+
 current_dir = Path(__file__).parent
-sys.path.append(str(current_dir / "core"))
 
 def print_banner(title: str) -> None:
     """Печать баннера MongoDB"""
@@ -40,24 +41,34 @@ def print_menu() -> None:
     
     print("\n" + "="*80)
 
-def load_data_part_1() -> None:
+def load_data_part_1(create_indexes: bool = True) -> None:
     """Загрузка данных MongoDB"""
     print_banner("Часть 1: ЗАГРУЗКА ДАННЫХ")
     
     try:
-        from scripts.load_data import main as load_main
-        result = load_main()
-        return result
+        from .scripts.load_data import main as load_main
+        return load_main(create_indexes=create_indexes) or 0
     except Exception as e:
         print(f" Ошибка загрузки данных: {e}")
         return 1
 
+def create_indexes_part_1() -> None:
+    """Создание индексов MongoDB"""
+    print_banner("Часть 1.4: СОЗДАНИЕ ИНДЕКСОВ")
+    
+    try:
+        from .scripts.create_indexes import main as indexes_main
+        return indexes_main()
+    except Exception as e:
+        print(f" Ошибка создания индексов: {e}")
+        return 1
+
 def run_queries_part_2_1() -> None:
     """Навигация по категориям MongoDB"""
     print_banner("Часть 2.1: НАВИГАЦИЯ ПО ИЕРАРХИИ КАТЕГОРИЙ")
     
     try:
-        from scripts.category_navigation import main as queries_2_1_main
+        from .scripts.category_navigation import main as queries_2_1_main
         return queries_2_1_main()
     except Exception as e:
         print(f" Ошибка выполнения запросов 2.1: {e}")
@@ -68,7 +79,7 @@ def run_queries_part_2_2() -> None:
     print_banner("Часть 2.2: РАБОТА С ТОВАРАМИ И ВЛОЖЕННЫМИ ДОКУМЕНТАМИ")
     
     try:
-        from scripts.product_queries import main as queries_2_2_main
+        from .scripts.product_queries import main as queries_2_2_main
         return queries_2_2_main()
     except Exception as e:
         print(f" Ошибка выполнения запросов 2.2: {e}")
@@ -79,7 +90,7 @@ def run_queries_part_3() -> None:
     print_banner("Часть 3: АГРЕГАЦИОННЫЙ ФРЕЙМВОРК")
     
     try:
-        from scripts.analytics_aggregations import main as queries_3_main
+        from .scripts.analytics_aggregations import main as queries_3_main
         return queries_3_main()
     except Exception as e:
         print(f" Ошибка выполнения агрегаций: {e}")
@@ -90,56 +101,64 @@ def show_indexes_info() -> None:
     print_banner("СТАТИСТИКА ИНДЕКСОВ")
     
     try:
-        from utils.show_indexes import main as indexes_main
+        from .utils.show_indexes import main as indexes_main
         return indexes_main()
     except Exception as e:
         print(f" Ошибка получения статистики индексов: {e}")
         return 1
 
-def run_full_sequence() -> None:
-    """Пейплайн джоб MongoDB"""
-    
-    start_time = time.time()
+def pipeline_stages(stage_timeouts: dict = None) -> list:
+    """Граф стадий: load -> indexes -> {2.1, 2.2, 3}"""
+    from .core.stage_dag import Stage
     
-    parts = [
-        ("Загрузка данных", load_data_part_1),
-        ("Запросы 2.1", run_queries_part_2_1),
-        ("Запросы 2.2", run_queries_part_2_2),
-        ("Агрегации", run_queries_part_3)
+    timeouts = stage_timeouts or {}
+    stages = [
+        Stage("load", lambda: load_data_part_1(create_indexes=False), [],
+              description="Загрузка categories и products"),
+        Stage("indexes", create_indexes_part_1, ["load"], description="Создание индексов"),
+        Stage("2.1", run_queries_part_2_1, ["indexes"], description="Навигация по категориям"),
+        Stage("2.2", run_queries_part_2_2, ["indexes"], description="Товары и embedded documents"),
+        Stage("3", run_queries_part_3, ["indexes"], description="Агрегации"),
     ]
+    for stage in stages:
+        stage.timeout_sec = timeouts.get(stage.name)
+    return stages
+
+def run_full_sequence(only: list = None, skip: list = None, timeout_sec: float = None,
+                      stage_timeouts: dict = None, report_path: str = None, max_parallel: int = 3) -> None:
+    """Пейплайн джоб MongoDB: стадии по графу зависимостей, запросы - параллельно"""
+    from .core.stage_dag import StageGraphRunner, timing_report, write_timing_report
+    from .core.tracing import tracer
     
-    results = []
+    start_time = time.time()
+    tracer.reset()
+    tracer.enable()
     
-    for part_name, part_func in parts:
-        print(f"\n Выполнение: {part_name}")
-        print("-" * 60)
-        
-        try:
-            result = part_func()
-            results.append((part_name, result))
-            
-            if result == 0:
-                print(f" {part_name} - успешно")
-            else:
-                print(f" {part_name} - ошибка (код: {result})")
-                
-        except Exception as e:
-            print(f" {part_name} - исключение: {e}")
-            results.append((part_name, 1))
-        
-        print(f"Время: {time.strftime('%H:%M:%S')}")
+    runner = StageGraphRunner(pipeline_stages(stage_timeouts), max_parallel=max_parallel)
+    results = runner.run(only=only, skip=skip, default_timeout_sec=timeout_sec)
     
     # Итоги MongoDB
     total_time = time.time() - start_time
-    successful = sum(1 for _, result in results if result == 0)
+    tracer.disable()
+    successful = sum(1 for result in results if result.status == "ok")
     
     print_banner("ИТОГИ ПЕЙПЛАЙНА")
     print(f"Общее время: {total_time/60:.1f} минут")
-    print(f"Выполнено успешно: {successful}/{len(results)} частей")
+    print(f"Выполнено успешно: {successful}/{len(results)} стадий")
+    
+    for result in results:
+        status = " Успешно" if result.status == "ok" else f" {result.status}"
+        detail = f": {result.error}" if result.error else ""
+        print(f"   {result.name:<8} {result.duration_sec:>8.1f} с (старт +{result.start_offset_sec:.1f} с){status}{detail}")
+    
+    print_banner("ДЕРЕВО SPAN'ОВ")
+    for line in tracer.format_tree(min_ms=1.0):
+        print(line)
+    trace_path = tracer.export_json(str(current_dir / "traces" / f"run_{time.strftime('%Y%m%d_%H%M%S')}.json"))
+    print(f"\nТрасса (OTLP JSON): {trace_path}")
     
-    for part_name, result in results:
-        status = " Успешно" if result == 0 else " Ошибка"
-        print(f"   {part_name}: {status}")
+    if report_path:
+        write_timing_report(timing_report(results, total_time), report_path)
     
     if successful == len(results):
         print("\n Пейплайн джоб MongoDB успешно завершен!")
@@ -189,7 +208,7 @@ def main() -> None:
             elif choice == "2":
                 load_data_part_1()
             elif choice == "3":
-                show_indexes_info()
+                create_indexes_part_1()
             elif choice == "4":
                 run_queries_part_2_1()
             elif choice == "5":
@@ -210,5 +229,59 @@ def main() -> None:
             print(f" Произошла ошибка: {e}")
             continue
 
+def _split_names(values: list) -> list:
+    """--only 2.1,2.2 --only 3 -> ["2.1", "2.2", "3"]"""
+    return [name.strip() for value in values or [] for name in value.split(",") if name.strip()]
+
+def _stage_timeout(value: str) -> tuple:
+    """type для --stage-timeout: 2.2=120 -> ("2.2", 120.0)"""
+    name, _, seconds = value.partition("=")
+    try:
+        return name.strip(), float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается СТАДИЯ=СЕКУНДЫ: {value}")
+
+def build_parser() -> argparse.ArgumentParser:
+    """CLI: без команды - интерактивное меню"""
+    parser = argparse.ArgumentParser(description="Лабораторная работа №3: Работа с MongoDB")
+    commands = parser.add_subparsers(dest="command")
+    
+    commands.add_parser("menu", help="Интерактивное меню (по умолчанию)")
+    commands.add_parser("list", help="Показать граф стадий")
+    commands.add_parser("show-indexes", help="Статистика индексов")
+    
+    run = commands.add_parser("run", help="Пайплайн по графу load -> indexes -> {2.1, 2.2, 3}")
+    run.add_argument("--only", action="append", help="Только эти стадии (через запятую)")
+    run.add_argument("--skip", action="append", help="Пропустить стадии (через запятую)")
+    run.add_argument("--timeout", type=float, help="Таймаут стадии по умолчанию, сек")
+    run.add_argument("--stage-timeout", action="append", type=_stage_timeout, metavar="STAGE=SEC", help="Таймаут отдельной стадии")
+    run.add_argument("--max-parallel", type=int, default=3, help="Одновременно выполняемых стадий (1 - последовательно)")
+    run.add_argument("--report", help="JSON отчет по времени стадий (\"-\" - в stdout)")
+    add_profile_arguments(run)
+    return parser
+
+def cli(argv: list = None) -> int:
+    """Точка входа командной строки"""
+    args = build_parser().parse_args(argv)
+    
+    if args.command == "run":
+        def run():
+            return run_full_sequence(
+                only=_split_names(args.only), skip=_split_names(args.skip),
+                timeout_sec=args.timeout, stage_timeouts=dict(args.stage_timeout or []),
+                report_path=args.report, max_parallel=args.max_parallel
+            )
+        if args.profile:
+            return run_profiled("run_full_sequence", run, args.profile, args.profile_top)
+        return run()
+    if args.command == "list":
+        from .core.stage_dag import StageGraphRunner
+        for line in StageGraphRunner(pipeline_stages()).describe():
+            print(line)
+        return 0
+    if args.command == "show-indexes":
+        return show_indexes_info()
+    return main()
+
 if __name__ == "__main__":
-    main()
+    sys.exit(cli())
@@ -4,16 +4,13 @@
 """
 
 import sys
-from pathlib import Path
 
-# Добавляем core в Python path
-current_dir = Path(__file__).parent.parent
-sys.path.append(str(current_dir / "core"))
-
-from core.database import MongoDBConnection
-from core.database import MongoDBBaseOperations
-from core.services import AnalyticsService
-from core.models import StatisticsHelper
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import AnalyticsService
+from ..core.routing import read_route
+from ..core.profiling import main_with_profile
+from ..core.models import StatisticsHelper
 
 def print_section(title: str) -> None:
     """Печать заголовка раздела MongoDB"""
@@ -63,7 +60,7 @@ def format_categories_by_level(documents) -> str:
     if not documents:
         return "Нет данных"
     
-    table = f"{"Название категории":^45} | {"Товаров":>10}\n"
+    table = f"{'Название категории':^45} | {'Товаров':>10}\n"
     table += f"{'-'*45} | {'-'*10}\n"
     
     for doc in documents[:15]:  # Показываем первые 15
@@ -107,7 +104,8 @@ def execute_aggregations_part_3_1():
         ]
         
         # Выполняем напрямую через db_ops для демонстрации pipeline
-        result1 = db_ops.aggregate("categories", pipeline1)
+        with read_route("analytics"):
+            result1 = db_ops.aggregate("categories", pipeline1)
         
         print_aggregation_result("Топ-10 категорий по количеству товаров", result1, 4)
         
@@ -200,4 +198,4 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(main_with_profile("analytics_aggregations", main, "Часть 3: агрегации"))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Category Counts Change Stream Consumer
+"""
+
+import sys
+import argparse
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.change_streams import CategoryCountMaintainer, ConsumerLeaseHeld
+from ..core.models import StatisticsHelper
+
+# Локальный single-node replica set: docker compose --profile replset up mongodb-rs
+REPLSET_URI = "mongodb://localhost:27018/?replicaSet=rs0&directConnection=true"
+
+def print_section(title: str) -> None:
+    """Печать заголовка раздела MongoDB"""
+    print(f"\n{'='*60}")
+    print(f" {title}")
+    print(f"{'='*60}")
+
+def main():
+    """Запуск потребителя change stream"""
+    parser = argparse.ArgumentParser(description="Инкрементальные счетчики товаров по категориям")
+    parser.add_argument("--uri", default=REPLSET_URI, help="URI replica set")
+    parser.add_argument("--setup", action="store_true",
+                        help="Включить pre-images и пересчитать rollups (другие потребители должны быть остановлены)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Событий в одной транзакции")
+    args = parser.parse_args()
+
+    with MongoDBConnection(args.uri) as db_conn:
+        db_ops = MongoDBBaseOperations(db_conn)
+        maintainer = CategoryCountMaintainer(db_ops, batch_size=args.batch_size)
+
+        try:
+            if args.setup:
+                print_section("ПОДГОТОВКА")
+                maintainer.enable_pre_images()
+                result = maintainer.rebuild_rollups()
+                print(f"   • Rollups: {StatisticsHelper.format_number(result.count)} за {StatisticsHelper.format_time(result.execution_time_ms)}")
+
+            print_section("ПОТРЕБИТЕЛЬ CHANGE STREAM PRODUCTS")
+            maintainer.run()
+        except ConsumerLeaseHeld as e:
+            # Пересчет при работающем потребителе испортил бы счетчики
+            print(f" ❌ {e}: остановите работающий потребитель")
+            return 1
+        except KeyboardInterrupt:
+            print(f"\n Остановлено, событий: {StatisticsHelper.format_number(maintainer.events_processed)}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,14 +9,11 @@ DRY: Избегание повторения кода
 import sys
 from pathlib import Path
 
-# Добавляем core в Python path
-current_dir = Path(__file__).parent.parent
-sys.path.append(str(current_dir / "core"))
-
-from core.database import MongoDBConnection
-from core.database import MongoDBBaseOperations
-from core.services import CategoryQueryService, ProductQueryService
-from core.models import StatisticsHelper
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import CategoryQueryService, ProductQueryService
+from ..core.profiling import main_with_profile
+from ..core.models import StatisticsHelper, QueryTemplates
 
 def print_section(title: str) -> None:
     """Печать раздела"""
@@ -96,9 +93,18 @@ def execute_queries_part_2_1():
             regex_result = list(bench_ops.find("categories", {"path": {"$regex": "^Строительство и ремонт/"}}))
             time_regex = time.time() - start
             
+            # Подход 3: диапазон по префиксу пути (индекс path_1, simple collation)
+            subtree_result = CategoryQueryService(bench_ops).find_subtree("Строительство и ремонт", include_self=False)
+            time_subtree = subtree_result.execution_time_sec
+            subtree_query = QueryTemplates.by_path_prefix("path", "Строительство и ремонт", "path_array.{index}", False)
+            subtree_stages = bench_ops.plan_stages(
+                bench_ops.explain_query("categories", subtree_query, QueryTemplates.PATH_COLLATION)
+            )
+            
             print(f"\n Сравнение подходов к поиску:")
             print(f"   • Path array: {time_patharray*1000:.2f} мсек, {len(patharray_result)} результатов")
             print(f"   • Regex path:   {time_regex*1000:.2f} мсек, {len(regex_result)} результатов")
+            print(f"   • Path prefix:  {time_subtree*1000:.2f} мсек, {len(subtree_result.documents)} результатов ({' → '.join(subtree_stages)})")
             
             if time_patharray < time_regex:
                 speedup = time_regex / time_patharray
@@ -125,4 +131,4 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(main_with_profile("category_navigation", main, "Часть 2.1: навигация по категориям"))
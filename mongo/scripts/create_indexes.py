@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Index Creation Script
+"""
+
+import sys
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import IndexingService
+from ..core.models import StatisticsHelper
+
+def main():
+    """Создание индексов categories и products"""
+    print(f"\n{'='*60}")
+    print(" СОЗДАНИЕ ИНДЕКСОВ")
+    print(f"{'='*60}")
+
+    with MongoDBConnection() as db_conn:
+        db_ops = MongoDBBaseOperations(db_conn)
+        index_results = IndexingService(db_ops).create_all_indexes()
+
+        for collection, result in index_results.items():
+            print(f"\n Индексы коллекции {collection}")
+            print(f"   • Время: {StatisticsHelper.format_time(result.execution_time_ms)}")
+            print(f"   • Количество: {StatisticsHelper.format_number(result.count)}")
+            print(f"   • {result.query_info}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Parallel Export to Parquet Script
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+current_dir = Path(__file__).parent.parent
+
+from ..core.database import MongoDBConnection
+from ..core.export import ParallelCollectionExporter, DEFAULT_PRODUCT_FIELDS
+from ..core.models import StatisticsHelper
+
+def print_section(title: str) -> None:
+    """Печать заголовка раздела MongoDB"""
+    print(f"\n{'='*60}")
+    print(f" {title}")
+    print(f"{'='*60}")
+
+def main():
+    """Экспорт коллекции в Parquet по диапазонам _id"""
+    parser = argparse.ArgumentParser(description="Параллельный экспорт коллекции в Parquet")
+    parser.add_argument("--collection", default="products", help="Коллекция MongoDB")
+    parser.add_argument("--output", default=str(current_dir / "export"), help="Каталог part-файлов")
+    parser.add_argument("--fields", default=",".join(DEFAULT_PRODUCT_FIELDS), help="Поля через запятую")
+    parser.add_argument("--workers", default="4", help="Число процессов или список для кривой масштабирования: 1,2,4,8")
+    parser.add_argument("--sample-size", type=int, default=0, help="Границы по $sample вместо $bucketAuto")
+    args = parser.parse_args()
+
+    fields = [field.strip() for field in args.fields.split(",") if field.strip()]
+    worker_counts = [int(w) for w in args.workers.split(",")]
+
+    with MongoDBConnection() as db_conn:
+        timings = []
+        for workers in worker_counts:
+            print_section(f"ЭКСПОРТ {args.collection.upper()}: {workers} процессов")
+
+            exporter = ParallelCollectionExporter(db_conn, workers=workers)
+            output_dir = str(Path(args.output) / f"workers_{workers}") if len(worker_counts) > 1 else args.output
+            result = exporter.export(args.collection, output_dir, fields, sample_size=args.sample_size)
+
+            rate = result.count / max(result.execution_time_sec, 1e-6)
+            print(f"   • Строк: {StatisticsHelper.format_number(result.count)}")
+            print(f"   • Part-файлов: {len(result.documents)}")
+            print(f"   • Время: {StatisticsHelper.format_time(result.execution_time_ms)} ({rate:,.0f} строк/сек)")
+            print(f"   • Каталог: {output_dir}")
+            timings.append((workers, result.execution_time_sec))
+
+        if len(timings) > 1:
+            print_section("МАСШТАБИРОВАНИЕ")
+            base_workers, base_time = timings[0]
+            print(f"{'Процессов':>10} | {'Время, с':>9} | {'Ускорение':>9} | {'Эффективность':>13}")
+            print(f"{'-'*10} | {'-'*9} | {'-'*9} | {'-'*13}")
+            for workers, seconds in timings:
+                speedup = base_time / max(seconds, 1e-6)
+                efficiency = speedup / (workers / base_workers) * 100
+                print(f"{workers:>10} | {seconds:>9.2f} | {speedup:>8.2f}x | {efficiency:>12.0f}%")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+    Synthetic Catalog Generation Script (parquet for the loader and scale benchmarks)
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+current_dir = Path(__file__).parent.parent
+
+from ..core.synthetic import SyntheticCatalogGenerator, CatalogSpec
+from ..core.models import StatisticsHelper
+
+def print_section(title: str) -> None:
+    """Печать заголовка раздела"""
+    print(f"\n{'='*60}")
+    print(f" {title}")
+    print(f"{'='*60}")
+
+def parse_rows(value: str) -> int:
+    """Число строк: 1000000, 10M, 500K"""
+    multipliers = {"K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+    value = value.strip().upper().replace("_", "")
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+def main():
+    """Генерация синтетического каталога в part-файлы parquet"""
+    parser = argparse.ArgumentParser(description="Синтетический каталог в схеме исходного parquet")
+    parser.add_argument("--rows", type=parse_rows, default=1_000_000, help="Число товаров: 1000000, 10M, 100M")
+    parser.add_argument("--seed", type=int, default=42, help="Seed: одинаковый seed - одинаковые файлы")
+    parser.add_argument("--categories", type=int, default=5000, help="Число категорий")
+    parser.add_argument("--partners", type=int, default=3, help="Число партнеров")
+    parser.add_argument("--category-skew", type=float, default=1.1, help="Показатель Zipf товаров на категорию")
+    parser.add_argument("--chunk-rows", type=parse_rows, default=1_000_000, help="Строк в part-файле")
+    parser.add_argument("--workers", type=int, default=4, help="Число процессов")
+    parser.add_argument("--output", default=str(current_dir / "synthetic"), help="Каталог part-файлов")
+    parser.add_argument("--single-file", help="Дополнительно склеить части в один parquet")
+    args = parser.parse_args()
+
+    spec = CatalogSpec(rows=args.rows, seed=args.seed, categories=args.categories, partners=args.partners,
+                       category_skew=args.category_skew, chunk_rows=args.chunk_rows)
+
+    print_section(f"СИНТЕТИЧЕСКИЙ КАТАЛОГ: {StatisticsHelper.format_number(spec.rows)} товаров")
+    print(f" Seed: {spec.seed}, категорий: {spec.categories}, партнеров: {spec.partners}")
+    print(f" Part-файлов: {spec.chunks}, процессов: {args.workers}")
+
+    result = SyntheticCatalogGenerator(spec, workers=args.workers).generate(args.output, args.single_file)
+
+    rate = result.count / max(result.execution_time_sec, 1e-6)
+    size_mb = sum(part["bytes"] for part in result.documents) / 1024**2
+    print(f"\n   • Строк: {StatisticsHelper.format_number(result.count)}")
+    print(f"   • Размер: {size_mb:.1f} MB")
+    print(f"   • Время: {StatisticsHelper.format_time(result.execution_time_ms)} ({rate:,.0f} строк/сек)")
+    print(f"   • Каталог: {args.output}")
+    if args.single_file:
+        print(f"   • Файл: {args.single_file}")
+
+    print_section("ГЛУБИНА ИЕРАРХИИ (ТОВАРЫ)")
+    depth_counts = [sum(counts) for counts in zip(*(part["depth_counts"] for part in result.documents))]
+    for depth, count in enumerate(depth_counts, 1):
+        share = count / max(result.count, 1) * 100
+        print(f"   Уровень {depth}: {StatisticsHelper.format_number(count):>12} ({share:5.1f}%)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
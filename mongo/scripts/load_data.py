@@ -11,13 +11,11 @@ import sys
 import os
 from pathlib import Path
 
-# Добавляем core в Python path
-current_dir = Path(__file__).parent
-sys.path.append(str(current_dir / "core"))
-
-from core.database import MongoDBConnection
-from core.services import DataLoaderService, IndexingService
-from core.models import StatisticsHelper
+from ..core.database import MongoDBConnection
+from ..core.services import DataLoaderService, IndexingService
+from ..core.profiling import main_with_profile
+from ..core.stage_dag import check_cancelled
+from ..core.models import StatisticsHelper
 
 def print_section(title: str) -> None:
     """Печать раздела с оформлением"""
@@ -26,7 +24,7 @@ def print_section(title: str) -> None:
     print(f"{'='*60}")
 
 def print_result(description: str, result, additional_stats: dict = None) -> None:
-   """Форматированный вывод результата"""
+    """Форматированный вывод результата"""
     print(f"\n {description}")
     print(f"   • Время: {StatisticsHelper.format_time(result.execution_time_ms)}")
     print(f"   • Количество: {StatisticsHelper.format_number(result.count)}")
@@ -35,16 +33,21 @@ def print_result(description: str, result, additional_stats: dict = None) -> Non
         for key, value in additional_stats.items():
             print(f"   • {key}: {value}")
 
-def main():
-    """Основная функция загрузки данных"""
+# Исходный датасет; синтетический каталог - python -m mongo.scripts.generate_catalog
+DEFAULT_PARQUET_PATH = "C:/VSCode projects/Databases/clickhouse-mongo-subd/SnapShotForMongoDB/ozon_inference_2025_10_17_offers_2025_10_17.pq"
+
+def add_arguments(parser) -> None:
+    """Аргументы командной строки загрузки"""
+    parser.add_argument("--parquet", default=DEFAULT_PARQUET_PATH,
+                        help="Parquet-файл или каталог part-файлов (generate_catalog)")
+
+def main(create_indexes: bool = True, parquet_path: str = DEFAULT_PARQUET_PATH):
+    """Основная функция загрузки данных (create_indexes=False - индексы отдельной стадией)"""
     print_section("ЗАГРУЗКА ДАННЫХ MONGODB")
     
-    # Путь к данным
-    parquet_path = "C:/VSCode projects/Databases/clickhouse-mongo-subd/SnapShotForMongoDB/ozon_inference_2025_10_17_offers_2025_10_17.pq"
-    
     # Подключение к базе данных
     with MongoDBConnection() as db_conn:
-        from core.database import MongoDBBaseOperations
+        from ..core.database import MongoDBBaseOperations
         db_ops = MongoDBBaseOperations(db_conn)
         
         # Инициализация сервисов
@@ -60,6 +63,7 @@ def main():
         
         print_result("Коллекция categories загружена", categories_result, categories_stats)
         
+        check_cancelled()
         # Загрузка товаров
         print_section("ЗАГРУЗКА КОЛЛЕКЦИИ PRODUCTS")
         
@@ -68,14 +72,35 @@ def main():
         
         print_result("Коллекция products загружена", products_result, products_stats)
         
-        # Создание индексов
-        print_section("СОЗДАНИЕ ИНДЕКСОВ")
+        check_cancelled()
+        # Индекс автодополнения (категории, пути, типы товаров)
+        print_section("ИНДЕКС АВТОДОПОЛНЕНИЯ")
+        
+        autocomplete_path = str(Path(parquet_path).with_suffix(".autocomplete.json"))
+        _, autocomplete_stats = data_loader.build_autocomplete_index(parquet_path, autocomplete_path)
+        print(f" Записей: {StatisticsHelper.format_number(autocomplete_stats['entries'])}")
+        print(f" Файл: {autocomplete_stats['output']}")
         
-        print(" Создание индексов для оптимизации...")
-        index_results = index_service.create_all_indexes()
+        check_cancelled()
+        # Снапшот каталога для чтения без MongoDB
+        print_section("СНАПШОТ КАТАЛОГА (ARROW IPC)")
         
-        for collection, result in index_results.items():
-            print_result(f"Индексы коллекции {collection}", result)
+        snapshot_dir = str(Path(parquet_path).with_suffix(".snapshot"))
+        snapshot_stats = data_loader.write_snapshot(parquet_path, snapshot_dir)
+        print(f" Категорий: {StatisticsHelper.format_number(snapshot_stats['categories'])}")
+        print(f" Товаров: {StatisticsHelper.format_number(snapshot_stats['products'])}")
+        print(f" Каталог: {snapshot_stats['output']}")
+        
+        check_cancelled()
+        # Создание индексов
+        if create_indexes:
+            print_section("СОЗДАНИЕ ИНДЕКСОВ")
+            
+            print(" Создание индексов для оптимизации...")
+            index_results = index_service.create_all_indexes()
+            
+            for collection, result in index_results.items():
+                print_result(f"Индексы коллекции {collection}", result)
         
         # Итоговая статистика
         print_section("ИТОГОВАЯ СТАТИСТИКА")
@@ -114,7 +139,8 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        main_with_profile("load_data", lambda args: main(parquet_path=args.parquet),
+                          "Загрузка данных в MongoDB", configure=add_arguments)
         print(f"\n Загрузка данных успешно завершена!")
     except Exception as e:
         print(f"\n Ошибка: {e}")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Breadcrumbs Schema v2 Migration Script
+"""
+
+import sys
+import argparse
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import ProductQueryService, IndexingService
+from ..core.schema_v2 import BreadcrumbMigrationService, PRODUCTS_V2
+from ..core.models import StatisticsHelper
+
+def print_section(title: str) -> None:
+    """Печать заголовка раздела MongoDB"""
+    print(f"\n{'='*60}")
+    print(f" {title}")
+    print(f"{'='*60}")
+
+def print_size_comparison(db_ops: MongoDBBaseOperations) -> None:
+    """Сравнение размеров products (v1) и products_v2"""
+    print(f"\n{'Коллекция':>12} | {'Данные, MB':>10} | {'Индексы, MB':>11} | {'Ср. документ, B':>15}")
+    print(f"{'-'*12} | {'-'*10} | {'-'*11} | {'-'*15}")
+
+    for collection in ["products", PRODUCTS_V2]:
+        stats = db_ops.get_collection_stats(collection)
+        print(f"{collection:>12} | {stats['size'] / 1024**2:>10.2f} | "
+              f"{stats['totalIndexSize'] / 1024**2:>11.2f} | {stats.get('avgObjSize', 0):>15,.0f}")
+
+    for index_name in ["category.breadcrumbs.name_1", "category.path_ids_1"]:
+        for collection in ["products", PRODUCTS_V2]:
+            sizes = db_ops.get_collection_stats(collection).get("indexSizes", {})
+            if index_name in sizes:
+                print(f"   • {collection}.{index_name}: {sizes[index_name] / 1024**2:.2f} MB")
+
+def print_latency_comparison(v1: ProductQueryService, v2: ProductQueryService, repeats: int) -> None:
+    """Сравнение задержек одинаковых запросов на v1 и v2"""
+    queries = [
+        ("type + breadcrumb", lambda s: s.find_products_by_type_and_category("Степлер строительный", "Пневмоинструменты")),
+        ("уровень 4 + type", lambda s: s.get_products_by_level(4, "Степлер строительный")),
+        ("агрегация 1-го уровня", lambda s: s.aggregate_by_first_level_categories())
+    ]
+
+    print(f"\n{'Запрос':>24} | {'v1':>12} | {'v2':>12} | {'Строк v1/v2':>12}")
+    print(f"{'-'*24} | {'-'*12} | {'-'*12} | {'-'*12}")
+
+    for name, query in queries:
+        v1_results = [query(v1) for _ in range(repeats)]
+        v2_results = [query(v2) for _ in range(repeats)]
+        v1_time = min(r.execution_time_ms for r in v1_results)
+        v2_time = min(r.execution_time_ms for r in v2_results)
+        rows = f"{len(v1_results[0].documents)}/{len(v2_results[0].documents)}"
+        print(f"{name:>24} | {StatisticsHelper.format_time(v1_time):>12} | "
+              f"{StatisticsHelper.format_time(v2_time):>12} | {rows:>12}")
+
+def main():
+    """Миграция products -> products_v2 и сравнение схем"""
+    parser = argparse.ArgumentParser(description="Миграция breadcrumbs в схему v2")
+    parser.add_argument("--workers", type=int, default=4, help="Параллельных потоков миграции")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Документов в bulk_write")
+    parser.add_argument("--catch-up-idle", type=float, default=2.0,
+                        help="Пауза change stream (сек), после которой догоняющее чтение завершается")
+    parser.add_argument("--compare-only", action="store_true", help="Только сравнение v1/v2")
+    parser.add_argument("--repeats", type=int, default=3, help="Повторов каждого запроса")
+    args = parser.parse_args()
+
+    with MongoDBConnection() as db_conn:
+        db_ops = MongoDBBaseOperations(db_conn)
+
+        if not args.compare_only:
+            migration = BreadcrumbMigrationService(db_ops, workers=args.workers, batch_size=args.batch_size)
+
+            print_section("ПОСТРОЕНИЕ CATEGORY_NODES")
+            nodes_result, cache = migration.build_category_nodes()
+            print(f"   • Узлов: {StatisticsHelper.format_number(len(cache.nodes))} ({nodes_result.query_info})")
+            print(f"   • Время: {StatisticsHelper.format_time(nodes_result.execution_time_ms)}")
+
+            print_section("МИГРАЦИЯ PRODUCTS -> PRODUCTS_V2")
+            result = migration.migrate(cache, idle_timeout_sec=args.catch_up_idle)
+            rate = result.count / max(result.execution_time_sec, 1e-6)
+            print(f"   • Документов: {StatisticsHelper.format_number(result.count)}")
+            print(f"   • Время: {StatisticsHelper.format_time(result.execution_time_ms)} ({rate:,.0f} док/сек)")
+            print(f"   • {result.query_info}")
+            if migration.skipped:
+                print(f"   ⚠️ Пропущено без узла категории: {len(migration.skipped)}, "
+                      f"например: {', '.join(map(str, migration.skipped[:5]))}")
+
+            for collection, index_result in IndexingService(db_ops).create_v2_indexes().items():
+                print(f"   • Индексы {collection}: {StatisticsHelper.format_time(index_result.execution_time_ms)}")
+
+        print_section("РАЗМЕР: V1 vs V2")
+        print_size_comparison(db_ops)
+
+        print_section("ЗАДЕРЖКА: V1 vs V2")
+        print_latency_comparison(ProductQueryService(db_ops), ProductQueryService(db_ops, schema_version=2), args.repeats)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
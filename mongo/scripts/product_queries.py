@@ -4,16 +4,12 @@
 """
 
 import sys
-from pathlib import Path
 
-# Добавляем core в Python path
-current_dir = Path(__file__).parent.parent
-sys.path.append(str(current_dir / "core"))
-
-from core.database import MongoDBConnection
-from core.database import MongoDBBaseOperations
-from core.services import ProductQueryService
-from core.models import StatisticsHelper
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import ProductQueryService
+from ..core.profiling import main_with_profile
+from ..core.models import StatisticsHelper, QueryTemplates
 
 def print_section(title: str) -> None:
     """Печать заголовка раздела MongoDB"""
@@ -69,7 +65,13 @@ def execute_queries_part_2_2():
         
         result2 = product_service.get_products_by_level(4)
         
-        print_query_result("Товары с 4-мя breadcrumbs (уровень иерархии)", result2)
+        print_query_result("Товары с category.depth=4 (уровень иерархии)", result2)
+        
+        # Проверка плана: запрос по уровню должен идти через индекс MongoDB
+        for level_query in (QueryTemplates.by_depth(4), QueryTemplates.by_depth(4, "Степлер строительный")):
+            stages = db_ops.plan_stages(db_ops.explain_query("products", level_query))
+            status = "IXSCAN" if "IXSCAN" in stages else "COLLSCAN"
+            print(f"    План {level_query}: {' → '.join(stages)} ({status})")
         
         # Примеры 4-го уровня MongoDB
         if result2.documents:
@@ -134,6 +136,11 @@ def execute_queries_part_2_2():
         print(f"   • Breadcrumbs: {time_breadcrumbs*1000:.2f} мсек, {len(breadcrumb_results):,} результатов")
         print(f"   • Эмуляция JOIN: {time_join*1000:.2f} мсек, {len(join_results):,} результатов (100 категорий)")
         
+        # Пакетный поиск по offer_id: дедупликация + параллельные $in-чанки
+        offer_ids = [doc['offer_id'] for doc in breadcrumb_results[:5000]]
+        batch_result, missing = product_service.get_by_ids(offer_ids, fields=["name", "type"])
+        print(f"   • get_by_ids: {batch_result.execution_time_ms:.2f} мсек, {len(batch_result.documents):,} товаров по {len(set(offer_ids)):,} id (не найдено: {len(missing)})")
+        
         if time_breadcrumbs < time_join:
             speedup = time_join / time_breadcrumbs
             print(f"    Breadcrumbs быстрее в {speedup:.1f} раз")
@@ -160,4 +167,4 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(main_with_profile("product_queries", main, "Часть 2.2: товары и embedded documents"))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+    MongoDB Category Restructure Script (rename / move with product fan-out)
+"""
+
+import sys
+import argparse
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import CategoryRestructureService
+from ..core.models import StatisticsHelper
+
+def print_progress(done: int, total: int, products: int, seconds: float) -> None:
+    """Прогресс обновления товаров"""
+    rate = products / max(seconds, 1e-6)
+    print(f"   • {done}/{total} категорий, {StatisticsHelper.format_number(products)} товаров, {rate:,.0f} товаров/сек")
+
+def main():
+    """Переименование или перенос поддерева категорий"""
+    parser = argparse.ArgumentParser(description="Переименование/перенос категории с обновлением товаров")
+    parser.add_argument("old_path", help="Текущий путь, например 'Строительство и ремонт/Инструменты'")
+    parser.add_argument("new_path", help="Новый путь")
+    parser.add_argument("--partner", default="_ozon", help="Партнер")
+    parser.add_argument("--workers", type=int, default=8, help="Параллельных потоков")
+    parser.add_argument("--chunk-size", type=int, default=50, help="Категорий в одном bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать затронутые категории")
+    args = parser.parse_args()
+
+    with MongoDBConnection() as db_conn:
+        db_ops = MongoDBBaseOperations(db_conn)
+        service = CategoryRestructureService(db_ops, workers=args.workers, chunk_size=args.chunk_size)
+
+        pending = service.pending(args.old_path, args.new_path, args.partner)
+        if pending:
+            # План уже сохранен в журнале: повтор продолжит прерванную операцию
+            print(f"\n Незавершенная операция: {len(pending['changes'])} категорий, этап {pending['stage']}")
+        else:
+            changes = service.plan(args.old_path, args.new_path, args.partner)
+            affected = sum(change["category"].get("metadata", {}).get("total_products", 0) for change in changes)
+            print(f"\n Затронуто категорий: {StatisticsHelper.format_number(len(changes))}")
+            print(f" Ожидаемо товаров: {StatisticsHelper.format_number(affected)}")
+            for change in changes[:5]:
+                print(f"   • {change['category']['path']} → {change['path']}")
+
+        if args.dry_run:
+            return 0
+
+        result = service.restructure(args.old_path, args.new_path, args.partner, progress=print_progress)
+        print(f"\n {result.query_info}")
+        print(f"   • Время: {StatisticsHelper.format_time(result.execution_time_ms)}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
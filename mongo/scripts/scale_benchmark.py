@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+    Scale-Curve Benchmark: queries and loader phases vs catalog size and index set
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+current_dir = Path(__file__).parent.parent
+
+from ..core.database import MongoDBConnection
+from ..core.scale_bench import ScaleBenchmark, INDEX_SETS
+from ..core.models import StatisticsHelper
+from .generate_catalog import parse_rows
+
+def print_section(title: str) -> None:
+    """Печать заголовка раздела MongoDB"""
+    print(f"\n{'='*60}")
+    print(f" {title}")
+    print(f"{'='*60}")
+
+def format_rows(rows: int) -> str:
+    for suffix, size in (("M", 1_000_000), ("K", 1_000)):
+        if rows >= size and rows % size == 0:
+            return f"{rows // size}{suffix}"
+    return str(rows)
+
+def print_curves(report: dict, prefix: str, title: str, value_format) -> None:
+    """Таблица метрика x размер для каждого набора индексов"""
+    sizes = report["sizes"]
+    for index_set in report["index_sets"]:
+        print_section(f"{title}: индексы {index_set}")
+        header = " | ".join(f"{format_rows(rows):>9}" for rows in sizes)
+        print(f"{'Запрос':>36} | {header} | {'Наклон':>6}")
+        print(f"{'-'*36} | {' | '.join('-'*9 for _ in sizes)} | {'-'*6}")
+        for curve in report["curves"]:
+            if curve["index_set"] != index_set or not curve["metric"].startswith(prefix):
+                continue
+            values = " | ".join(f"{value_format(value):>9}" for value in curve["values"])
+            slope = f"{curve['slope']:.2f}" if curve["slope"] is not None else "-"
+            flag = "  ! сверхлинейно" if curve["superlinear"] else ""
+            print(f"{curve['metric'][len(prefix):]:>36} | {values} | {slope:>6}{flag}")
+
+def main():
+    """Матрица размеров каталога x наборов индексов и отчет масштабирования"""
+    parser = argparse.ArgumentParser(description="Кривые масштабирования запросов и загрузки")
+    parser.add_argument("--sizes", default="100K,300K,1M", help="Размеры каталога через запятую: 1M,10M,100M")
+    parser.add_argument("--index-sets", default=",".join(INDEX_SETS), help=f"Наборы индексов: {', '.join(INDEX_SETS)}")
+    parser.add_argument("--repeats", type=int, default=5, help="Повторов каждого запроса")
+    parser.add_argument("--seed", type=int, default=42, help="Seed синтетического каталога")
+    parser.add_argument("--categories", type=int, default=5000, help="Категорий в каталоге")
+    parser.add_argument("--workers", type=int, default=4, help="Процессов генератора")
+    parser.add_argument("--database", default="ecommerce_scale", help="База для загрузки (не лабораторная)")
+    parser.add_argument("--data-dir", default=str(current_dir / "synthetic"), help="Кэш сгенерированных parquet")
+    parser.add_argument("--output", default=str(current_dir / "scale_report"), help="Каталог отчета")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Наклон log-log, выше которого рост сверхлинейный")
+    args = parser.parse_args()
+
+    sizes = [parse_rows(size) for size in args.sizes.split(",") if size.strip()]
+    index_sets = [name.strip() for name in args.index_sets.split(",") if name.strip()]
+
+    with MongoDBConnection(database=args.database) as db_conn:
+        benchmark = ScaleBenchmark(db_conn, args.data_dir, args.output, seed=args.seed,
+                                   categories=args.categories, workers=args.workers,
+                                   repeats=args.repeats, superlinear_threshold=args.threshold)
+        report = benchmark.run(sizes, index_sets)
+
+    print_section("ЗАГРУЗКА")
+    print(f"{'Строк':>9} | {'Время, с':>9} | {'док/с':>9} | {'insert док/с':>12} | Фазы, мс")
+    print(f"{'-'*9} | {'-'*9} | {'-'*9} | {'-'*12} | {'-'*30}")
+    seen = set()
+    for cell in report["matrix"]:
+        if cell["rows"] in seen:
+            continue
+        seen.add(cell["rows"])
+        load = cell["load"]
+        phases = ", ".join(f"{name}={ms:,.0f}" for name, ms in load["phases_ms"].items())
+        print(f"{format_rows(cell['rows']):>9} | {load['seconds']:>9.1f} | {load['docs_per_sec']:>9,} | "
+              f"{load['insert_docs_per_sec']:>12,} | {phases}")
+
+    print_curves(report, "latency_ms.", "ЗАДЕРЖКА p50, мс", lambda v: f"{v:.1f}")
+    print_curves(report, "docs_examined.", "ПРОСМОТРЕНО ДОКУМЕНТОВ", lambda v: StatisticsHelper.format_number(v))
+    print_curves(report, "data_bytes.", "ДАННЫЕ, MB", lambda v: f"{v / 1024**2:.1f}")
+    print_curves(report, "index_bytes.", "ИНДЕКСЫ, MB", lambda v: f"{v / 1024**2:.1f}")
+
+    superlinear = [curve for curve in report["curves"] if curve["superlinear"]]
+    print_section("СВЕРХЛИНЕЙНЫЙ РОСТ")
+    if not superlinear:
+        print(" Кривых со сверхлинейным ростом нет")
+    for curve in superlinear:
+        print(f"   • {curve['metric']} [{curve['index_set']}]: наклон {curve['slope']}, "
+              f"max на отрезке {curve['max_segment_slope']}")
+    print(f"\n Отчет: {Path(args.output) / 'scale_report.json'}")
+
+    return 1 if superlinear else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
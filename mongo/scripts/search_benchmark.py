@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+    Product Name Search Benchmark: BM25 index vs MongoDB $text
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+current_dir = Path(__file__).parent.parent
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.search import ProductSearchIndex
+from ..core.models import StatisticsHelper
+
+TEXT_INDEX = "name_text_benchmark"
+
+QUERIES = [
+    ("степлер строительный", None),
+    ("блендер стационарный", None),
+    ("пневматический пистолет", "Пневмоинструменты"),
+    ("книга", None),
+    ("чехол для телефона", None),
+]
+
+def print_section(title: str) -> None:
+    """Печать заголовка раздела MongoDB"""
+    print(f"\n{'='*60}")
+    print(f" {title}")
+    print(f"{'='*60}")
+
+def has_text_index(db_ops: MongoDBBaseOperations) -> bool:
+    """Есть ли на products текстовый индекс (он может быть только один)"""
+    indexes = db_ops.connection.get_collection("products").index_information()
+    return any(kind == "text" for info in indexes.values() for _, kind in info["key"])
+
+def run_queries(db_ops: MongoDBBaseOperations, index: ProductSearchIndex, args, with_text: bool) -> None:
+    """Задержки BM25 и (если есть текстовый индекс) $text по QUERIES"""
+    print(f"{'Запрос':>28} | {'BM25 p50':>10} | {'$text p50':>10} | {'Ускорение':>9}")
+    print(f"{'-'*28} | {'-'*10} | {'-'*10} | {'-'*9}")
+
+    for text, category in QUERIES:
+        bm25_times = [index.search(text, args.limit, category).execution_time_ms for _ in range(args.repeats)]
+        bm25_p50 = statistics.median(bm25_times)
+        label = text if not category else f"{text} [{category}]"
+        if not with_text:
+            print(f"{label[:28]:>28} | {StatisticsHelper.format_time(bm25_p50):>10} | {'-':>10} | {'-':>9}")
+            continue
+
+        query = {"$text": {"$search": text}}
+        if category:
+            query["category.breadcrumbs.name"] = category
+        options = {
+            "projection": {"score": {"$meta": "textScore"}, "name": 1},
+            "sort": [("score", {"$meta": "textScore"})],
+            "limit": args.limit
+        }
+        text_times = [db_ops.find("products", query, options).execution_time_ms for _ in range(args.repeats)]
+        text_p50 = statistics.median(text_times)
+        print(f"{label[:28]:>28} | {StatisticsHelper.format_time(bm25_p50):>10} | "
+              f"{StatisticsHelper.format_time(text_p50):>10} | {text_p50 / max(bm25_p50, 1e-6):>8.1f}x")
+
+def main():
+    """Сравнение задержек BM25-индекса и $text"""
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска по названиям товаров")
+    parser.add_argument("--index-dir", default=str(current_dir / "search_index"), help="Каталог индекса")
+    parser.add_argument("--rebuild", action="store_true", help="Перестроить индекс из products")
+    parser.add_argument("--repeats", type=int, default=20, help="Повторов каждого запроса")
+    parser.add_argument("--limit", type=int, default=10, help="Результатов на запрос")
+    parser.add_argument("--create-text-index", action="store_true",
+                        help="Создать текстовый индекс products.name для сравнения с $text (удаляется после прогона)")
+    args = parser.parse_args()
+
+    with MongoDBConnection() as db_conn:
+        db_ops = MongoDBBaseOperations(db_conn)
+
+        print_section("ИНДЕКС ПОИСКА ПО НАЗВАНИЯМ")
+        if args.rebuild or not (Path(args.index_dir) / "meta.json").exists():
+            start = time.time()
+            ProductSearchIndex.from_mongo(db_ops).save(args.index_dir)
+            print(f"   • Построен за {time.time() - start:.1f} сек: {args.index_dir}")
+
+        start = time.time()
+        index = ProductSearchIndex.load(args.index_dir)
+        print(f"   • Загружен (mmap) за {(time.time() - start) * 1000:.1f} мсек")
+        print(f"   • Документов: {StatisticsHelper.format_number(len(index.doc_keys))}")
+        print(f"   • Терминов: {StatisticsHelper.format_number(len(index.vocabulary))}")
+        print(f"   • Posting-записей: {StatisticsHelper.format_number(len(index.postings_doc))}")
+
+        # Текстовый индекс замедляет загрузку, раздувает размеры индексов и
+        # занимает единственный слот text - создается только по флагу
+        created = False
+        with_text = has_text_index(db_ops)
+        if not with_text and args.create_text_index:
+            db_ops.create_indexes("products", [{"keys": [("name", "text")], "default_language": "russian",
+                                                "name": TEXT_INDEX}])
+            created = with_text = True
+        elif not with_text:
+            print("\n Текстового индекса на products нет: $text пропущен (--create-text-index)")
+
+        try:
+            print_section("ЗАДЕРЖКА: BM25 vs $text")
+            run_queries(db_ops, index, args, with_text)
+        finally:
+            if created:
+                db_conn.get_collection("products").drop_index(TEXT_INDEX)
+                print(f"\n Текстовый индекс {TEXT_INDEX} удален")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Смешанная нагрузка: аналитические агрегации и точечные запросы с admission control и без
+"""
+
+import sys
+import time
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.admission import AdmissionController, Overloaded, DeadlineExceeded
+from ..core.services import CategoryQueryService, ProductQueryService, AnalyticsService
+
+def run_mixed_load(db_ops: MongoDBBaseOperations, analytics_clients: int, point_clients: int,
+                   duration_sec: float) -> dict:
+    """Клиенты в цикле до истечения duration_sec; задержки точечных запросов и отказы"""
+    analytics = AnalyticsService(db_ops)
+    categories = CategoryQueryService(db_ops)
+    products = ProductQueryService(db_ops)
+    stop_at = time.time() + duration_sec
+    lock = threading.Lock()
+    result = {"point_ms": [], "analytics_done": 0, "shed": 0, "deadline": 0}
+
+    def analytics_client(_):
+        while time.time() < stop_at:
+            try:
+                analytics.find_leaf_categories()
+                analytics.get_hierarchy_stats()
+                with lock:
+                    result["analytics_done"] += 1
+            except Overloaded:
+                with lock:
+                    result["shed"] += 1
+                time.sleep(0.05)
+            except DeadlineExceeded:
+                with lock:
+                    result["deadline"] += 1
+
+    def point_client(_):
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            try:
+                categories.find_root_categories("_ozon")
+                products.get_by_ids(["1606856085"])
+            except (Overloaded, DeadlineExceeded):
+                with lock:
+                    result["shed"] += 1
+                continue
+            with lock:
+                result["point_ms"].append((time.perf_counter() - start) * 1000)
+
+    with ThreadPoolExecutor(max_workers=analytics_clients + point_clients) as pool:
+        futures = [pool.submit(analytics_client, i) for i in range(analytics_clients)]
+        futures += [pool.submit(point_client, i) for i in range(point_clients)]
+        for future in futures:
+            future.result()
+    return result
+
+def main():
+    """Задержка точечных запросов под аналитической нагрузкой"""
+    parser = argparse.ArgumentParser(description="Admission control под смешанной нагрузкой")
+    parser.add_argument("--analytics-clients", type=int, default=16, help="Потоков аналитики")
+    parser.add_argument("--point-clients", type=int, default=16, help="Потоков точечных запросов")
+    parser.add_argument("--duration", type=float, default=20.0, help="Длительность каждого прогона, сек")
+    args = parser.parse_args()
+
+    with MongoDBConnection() as db_conn:
+        print("=" * 60)
+        print(" ADMISSION CONTROL: АНАЛИТИКА vs ТОЧЕЧНЫЕ ЗАПРОСЫ")
+        print("=" * 60)
+        print(f"\n {'Режим':<18} | {'p50, мс':>8} | {'p99, мс':>8} | {'Точечных':>8} | {'Аналитики':>9} | {'Отказов':>7}")
+        print(f" {'-'*18} | {'-'*8} | {'-'*8} | {'-'*8} | {'-'*9} | {'-'*7}")
+
+        controller = AdmissionController()
+        for mode, admission in [("без ограничений", None), ("admission control", controller)]:
+            db_ops = MongoDBBaseOperations(db_conn, admission=admission)
+            result = run_mixed_load(db_ops, args.analytics_clients, args.point_clients, args.duration)
+            latencies = sorted(result["point_ms"]) or [0.0]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f" {mode:<18} | {statistics.median(latencies):>8.1f} | {p99:>8.1f} | {len(result['point_ms']):>8} | "
+                  f"{result['analytics_done']:>9} | {result['shed'] + result['deadline']:>7}")
+
+        print("\n Ограничители:")
+        for name, stats in controller.stats().items():
+            print(f"   • {name}: пропущено {stats['admitted']}, отказов {stats['shed']}, "
+                  f"ожидание ~{stats['queue_wait_ms']} мс")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Заполнение category.depth для существующих товаров и проверка индекса
+"""
+
+import sys
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import DataLoaderService
+from ..core.models import StatisticsHelper, QueryTemplates
+
+def main():
+    """Backfill category.depth + индекс (category.depth, type)"""
+    
+    with MongoDBConnection() as db_conn:
+        db_ops = MongoDBBaseOperations(db_conn)
+        data_loader = DataLoaderService(db_ops)
+        
+        print("=" * 60)
+        print(" BACKFILL CATEGORY.DEPTH")
+        print("=" * 60)
+        
+        result = data_loader.backfill_category_depth()
+        print(f"\n Обновлено товаров: {StatisticsHelper.format_number(result.count)}")
+        print(f"   • Время: {StatisticsHelper.format_time(result.execution_time_ms)}")
+        
+        index_result = db_ops.create_indexes("products", [("category.depth", 1, "type", 1)])
+        print(f"\n {index_result.query_info}")
+        print(f"   • Время: {StatisticsHelper.format_time(index_result.execution_time_ms)}")
+        
+        # Проверка планов запросов по уровню
+        print("\n Планы запросов:")
+        all_indexed = True
+        for level in range(1, 9):
+            stages = db_ops.plan_stages(db_ops.explain_query("products", QueryTemplates.by_depth(level)))
+            all_indexed = all_indexed and "IXSCAN" in stages
+            print(f"   • Уровень {level}: {' → '.join(stages)}")
+        
+        if all_indexed:
+            print("\n Все запросы по уровню используют IXSCAN")
+            return 0
+        
+        print("\n Есть запросы без индекса")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Проверка согласованности денормализованных category в products
+"""
+
+import sys
+import argparse
+from collections import Counter
+
+from ..core.database import MongoDBConnection
+from ..core.consistency import ConsistencyChecker
+from ..core.models import StatisticsHelper
+
+def main():
+    """Аудит products против categories"""
+    parser = argparse.ArgumentParser(description="Проверка денормализации products/categories")
+    parser.add_argument("--workers", type=int, default=4, help="Процессов проверки")
+    parser.add_argument("--repair", action="store_true", help="Исправить найденные расхождения")
+    args = parser.parse_args()
+
+    with MongoDBConnection() as db_conn:
+        checker = ConsistencyChecker(db_conn, workers=args.workers)
+
+        print("=" * 60)
+        print(" ПРОВЕРКА СОГЛАСОВАННОСТИ ДЕНОРМАЛИЗАЦИИ")
+        print("=" * 60)
+
+        result = checker.check()
+        print(f"\n {result.query_info}")
+        print(f"   • Время: {StatisticsHelper.format_time(result.execution_time_ms)}")
+
+        by_problem = Counter(problem["problem"] for problem in result.documents)
+        for problem, count in by_problem.most_common():
+            print(f"   • {problem}: {StatisticsHelper.format_number(count)}")
+
+        for problem in result.documents[:10]:
+            print(f"     - {problem['_id']} ({problem['key']}): {problem['problem']}")
+
+        if not result.documents:
+            print("\n Расхождений нет")
+            return 0
+
+        if args.repair:
+            repair_result = checker.repair(result.documents)
+            print(f"\n {repair_result.query_info}")
+            print(f"   • Изменено документов: {StatisticsHelper.format_number(repair_result.count)}")
+            print(f"   • Время: {StatisticsHelper.format_time(repair_result.execution_time_ms)}")
+            return 0
+
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
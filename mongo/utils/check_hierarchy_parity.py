@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Сверка NumPy-движка иерархии с агрегациями MongoDB
+"""
+
+import sys
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import AnalyticsService, ProductQueryService
+from ..core.hierarchy_engine import HierarchyAnalyticsEngine
+from ..core.models import StatisticsHelper
+
+def _rows(documents, value_field: str):
+    """Пары (ключ, значение) для сравнения без учета порядка"""
+    return [(repr(doc.get('_id', doc.get('category_name'))), doc[value_field]) for doc in documents]
+
+def compare_ranked(mongo_docs, engine_docs, value_field: str) -> bool:
+    """Сравнение топ-N результатов с учетом равных значений на границе"""
+    mongo_rows = _rows(mongo_docs, value_field)
+    engine_rows = _rows(engine_docs, value_field)
+
+    if sorted(v for _, v in mongo_rows) != sorted(v for _, v in engine_rows):
+        return False
+    if not mongo_rows:
+        return True
+
+    # Порядок среди равных значений в MongoDB не определен
+    boundary = min(v for _, v in mongo_rows)
+    return {r for r in mongo_rows if r[1] > boundary} == {r for r in engine_rows if r[1] > boundary}
+
+def check_skipped_rows(engine: HierarchyAnalyticsEngine) -> bool:
+    """Товары без категории и категории с конфликтующим путем движок пропускает -
+    при них сверка не может считаться пройденной"""
+    ok = engine.skipped_products == 0 and engine.conflicting_categories == 0
+    print(f"\n Пропущенные строки: {'нет' if ok else 'ЕСТЬ'}")
+    print(f"   • Товаров без категории: {StatisticsHelper.format_number(engine.skipped_products)}")
+    print(f"   • Категорий с конфликтующим путем: {StatisticsHelper.format_number(engine.conflicting_categories)}")
+    return ok
+
+def print_check(name: str, mongo_result, engine_result, ok: bool) -> None:
+    """Вывод результата сверки"""
+    status = "совпадает" if ok else "РАСХОЖДЕНИЕ"
+    speedup = mongo_result.execution_time_ms / max(engine_result.execution_time_ms, 1e-6)
+    print(f"\n {name}: {status}")
+    print(f"   • MongoDB: {StatisticsHelper.format_time(mongo_result.execution_time_ms)}, {len(mongo_result.documents)} строк")
+    print(f"   • NumPy:   {StatisticsHelper.format_time(engine_result.execution_time_ms)}, {len(engine_result.documents)} строк")
+    print(f"   • Ускорение: {speedup:.1f}x")
+
+def main():
+    """Сверка результатов MongoDB и NumPy-движка"""
+
+    with MongoDBConnection() as db_conn:
+        db_ops = MongoDBBaseOperations(db_conn)
+        analytics = AnalyticsService(db_ops)
+        product_service = ProductQueryService(db_ops)
+
+        print("=" * 60)
+        print(" СВЕРКА NUMPY-ДВИЖКА С MONGODB")
+        print("=" * 60)
+
+        engine = HierarchyAnalyticsEngine.from_mongo(db_ops)
+        print(f"\n Узлов дерева: {StatisticsHelper.format_number(len(engine.node_paths))}")
+        print(f" Категорий: {StatisticsHelper.format_number(len(engine.category_ids))}")
+        print(f" Товаров: {StatisticsHelper.format_number(len(engine.product_cat))}")
+
+        checks = [check_skipped_rows(engine)]
+
+        mongo_result = analytics.get_hierarchy_stats()
+        engine_result = engine.get_hierarchy_stats()
+        ok = compare_ranked(mongo_result.documents, engine_result.documents, 'products')
+        print_check("Иерархическая статистика", mongo_result, engine_result, ok)
+        checks.append(ok)
+
+        mongo_result = analytics.get_partner_stats()
+        engine_result = engine.get_partner_stats()
+        ok = mongo_result.documents == engine_result.documents
+        print_check("Статистика по партнерам", mongo_result, engine_result, ok)
+        checks.append(ok)
+
+        mongo_result = product_service.aggregate_by_first_level_categories()
+        engine_result = engine.aggregate_by_first_level_categories()
+        ok = compare_ranked(mongo_result.documents, engine_result.documents, 'product_count')
+        print_check("Агрегация по 1-му уровню", mongo_result, engine_result, ok)
+        checks.append(ok)
+
+        if all(checks):
+            print("\n Все результаты совпадают")
+            return 0
+
+        print("\n Обнаружены расхождения")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Всплеск одинаковых запросов: без объединения, single-flight в потоках и в asyncio
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import CategoryQueryService
+from ..core.single_flight import SingleFlight, AsyncSingleFlight
+
+QUERIES = [
+    ("get_top_categories(10)", lambda s: s.get_top_categories(10)),
+    ("find_root_categories(_ozon)", lambda s: s.find_root_categories("_ozon")),
+]
+
+def burst_threads(service: CategoryQueryService, query, clients: int) -> list:
+    """clients потоков одновременно выполняют один запрос; задержки, мс"""
+    def timed(_):
+        start = time.perf_counter()
+        query(service)
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return list(pool.map(timed, range(clients)))
+
+async def burst_async(flight: AsyncSingleFlight, service: CategoryQueryService, name: str, query,
+                      clients: int) -> list:
+    """clients корутин одновременно; синхронный сервис выполняется в пуле потоков"""
+    loop = asyncio.get_running_loop()
+
+    async def timed():
+        start = time.perf_counter()
+        await flight.do(name, lambda: loop.run_in_executor(None, query, service))
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*[timed() for _ in range(clients)])
+
+def print_row(mode: str, latencies: list, hits: int) -> None:
+    print(f"   {mode:<22} | {hits:>9} | {statistics.median(latencies):>8.1f} | {max(latencies):>8.1f}")
+
+def main():
+    """Сравнение числа обращений к базе при всплеске одинаковых запросов"""
+    parser = argparse.ArgumentParser(description="Бенчмарк объединения одинаковых запросов")
+    parser.add_argument("--clients", type=int, default=50, help="Одновременных запросов во всплеске")
+    args = parser.parse_args()
+
+    with MongoDBConnection() as db_conn:
+        db_ops = MongoDBBaseOperations(db_conn)
+
+        print("=" * 60)
+        print(f" ВСПЛЕСК ОДИНАКОВЫХ ЗАПРОСОВ ({args.clients} клиентов)")
+        print("=" * 60)
+
+        for name, query in QUERIES:
+            print(f"\n {name}")
+            print(f"   {'Режим':<22} | {'Обращений':>9} | {'p50, мс':>8} | {'max, мс':>8}")
+            print(f"   {'-'*22} | {'-'*9} | {'-'*8} | {'-'*8}")
+
+            print_row("без объединения", burst_threads(CategoryQueryService(db_ops), query, args.clients), args.clients)
+
+            flight = SingleFlight()
+            latencies = burst_threads(CategoryQueryService(db_ops, single_flight=flight), query, args.clients)
+            print_row("single-flight (потоки)", latencies, flight.executions)
+
+            async_flight = AsyncSingleFlight()
+            latencies = asyncio.run(burst_async(async_flight, CategoryQueryService(db_ops), name, query, args.clients))
+            print_row("single-flight (asyncio)", latencies, async_flight.executions)
+            print(f"   • Объединено: {flight.coalesced} (потоки), {async_flight.coalesced} (asyncio)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Линт агрегаций сервисов: замечания, переписывания и статистика explain
+"""
+
+import sys
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.pipeline_lint import PipelineAnalyzer
+from ..core.services import AnalyticsService, ProductQueryService
+from ..core.models import StatisticsHelper
+
+def print_report(name: str, result, report) -> None:
+    """Вывод отчета анализатора по одной агрегации"""
+    print(f"\n {name} ({report.collection}): {StatisticsHelper.format_time(result.execution_time_ms)}")
+    for issue in report.issues:
+        print(f"   • {issue}")
+    for rewrite in report.rewrites:
+        print(f"   → {rewrite}")
+    for stage in report.explain_stats:
+        details = ", ".join(f"{k}={v}" for k, v in stage.items() if k != "stage")
+        print(f"   ≡ {stage['stage']}: {details}")
+
+def main():
+    """Прогон агрегаций сервисов через PipelineAnalyzer"""
+    explain = "--no-explain" not in sys.argv
+
+    with MongoDBConnection() as db_conn:
+        analyzer = PipelineAnalyzer()
+        db_ops = MongoDBBaseOperations(db_conn, analyzer=analyzer, explain_aggregations=explain)
+        analytics = AnalyticsService(db_ops)
+        product_service = ProductQueryService(db_ops)
+
+        print("=" * 60)
+        print(" ЛИНТ АГРЕГАЦИЙ")
+        print("=" * 60)
+
+        checks = [
+            ("Иерархическая статистика", analytics.get_hierarchy_stats),
+            ("Листовые категории", analytics.find_leaf_categories),
+            ("Статистика по партнерам", analytics.get_partner_stats),
+            ("Агрегация по 1-му уровню", product_service.aggregate_by_first_level_categories),
+        ]
+        for name, query in checks:
+            result = query()
+            print_report(name, result, analyzer.reports[-1])
+
+        errors = sum(1 for report in analyzer.reports for issue in report.issues if issue.severity == "error")
+        print(f"\n Ошибок: {errors}, замечаний: {sum(len(r.issues) for r in analyzer.reports) - errors}")
+        return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Проверка маршрутизации чтений на replica set из трех узлов (docker compose --profile replset3)
+"""
+
+import sys
+import time
+import argparse
+
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.services import DataLoaderService, CategoryQueryService, ProductQueryService, AnalyticsService
+from ..core.synthetic import CatalogSpec, generate_chunk
+
+REPLSET3_URI = "mongodb://localhost:27021,localhost:27022,localhost:27023/?replicaSet=rs3&w=majority"
+
+def seed_catalog(db_ops: MongoDBBaseOperations, rows: int) -> list:
+    """Небольшой синтетический каталог; offer_id части товаров для точечных запросов"""
+    df = generate_chunk(CatalogSpec(rows=rows, chunk_rows=rows), 0).to_pandas()
+    categories, _ = DataLoaderService._category_documents(df)
+    products = DataLoaderService._product_documents(df)
+    db = db_ops.connection.db
+    db.drop_collection("categories")
+    db.drop_collection("products")
+    db_ops.insert_many("categories", categories)
+    db_ops.insert_many("products", products)
+    return [doc["offer_id"] for doc in products[:50]]
+
+def wait_for_secondaries(connection: MongoDBConnection, expected: int, timeout_sec: float = 60) -> bool:
+    """Ожидание репликации каталога на secondary"""
+    stop_at = time.time() + timeout_sec
+    while time.time() < stop_at:
+        if connection.get_collection("products", route="analytics").count_documents({}) >= expected:
+            return True
+        time.sleep(1)
+    return False
+
+def main():
+    """Маршруты чтений: аналитика - secondary, точечные - nearest"""
+    parser = argparse.ArgumentParser(description="Маршрутизация чтений на replica set")
+    parser.add_argument("--uri", default=REPLSET3_URI, help="URI replica set")
+    parser.add_argument("--rows", type=int, default=20000, help="Товаров в тестовом каталоге")
+    parser.add_argument("--repeats", type=int, default=20, help="Повторов каждого запроса")
+    args = parser.parse_args()
+
+    with MongoDBConnection(args.uri) as db_conn:
+        db_ops = MongoDBBaseOperations(db_conn)
+        print("=" * 60)
+        print(" МАРШРУТИЗАЦИЯ ЧТЕНИЙ: REPLICA SET rs3")
+        print("=" * 60)
+
+        offer_ids = seed_catalog(db_ops, args.rows)
+        if not wait_for_secondaries(db_conn, args.rows):
+            print(" ❌ Каталог не реплицировался на secondary")
+            return 1
+
+        categories = CategoryQueryService(db_ops)
+        products = ProductQueryService(db_ops, facet_ttl_sec=0)
+        analytics = AnalyticsService(db_ops)
+        db_conn.route_metrics.reset()
+        for _ in range(args.repeats):
+            analytics.get_hierarchy_stats()
+            analytics.find_leaf_categories()
+            analytics.get_partner_stats()
+            products.aggregate_by_first_level_categories()
+            categories.find_root_categories("_ozon")
+            products.get_by_ids(offer_ids)
+        # Без маршрута - primary
+        db_ops.find("categories", {"level": 1})
+
+        primary = "%s:%s" % db_conn.client.primary
+        secondaries = {"%s:%s" % address for address in db_conn.client.secondaries}
+        print(f"\n Primary: {primary}, secondary: {', '.join(sorted(secondaries)) or '-'}")
+        print(f"\n {'Маршрут':<10} | {'Запросов':>8} | {'p50, мс':>8} | {'p95, мс':>8} | Узлы")
+        print(f" {'-'*10} | {'-'*8} | {'-'*8} | {'-'*8} | {'-'*30}")
+        summary = db_conn.route_metrics.summary()
+        for route, stats in sorted(summary.items()):
+            servers = ", ".join(
+                f"{server}{' (P)' if server == primary else ''}: {count}"
+                for server, count in sorted(stats["servers"].items())
+            )
+            print(f" {route:<10} | {stats['count']:>8} | {stats['p50_ms']:>8.2f} | {stats['p95_ms']:>8.2f} | {servers}")
+
+        analytics_servers = set(summary.get("analytics", {}).get("servers", {}))
+        if secondaries and primary in analytics_servers:
+            print("\n ❌ Аналитика читала с primary при доступных secondary")
+            return 1
+        print("\n ✅ Аналитика читает с secondary")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
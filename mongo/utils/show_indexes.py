@@ -3,16 +3,9 @@
 Отображение индексов - утилита для анализа производительности
 """
 
-import sys
-from pathlib import Path
-
-# Добавляем core в Python path
-current_dir = Path(__file__).parent.parent
-sys.path.append(str(current_dir / "core"))
-
-from core.database import MongoDBConnection
-from core.database import MongoDBBaseOperations
-from core.models import StatisticsHelper
+from ..core.database import MongoDBConnection
+from ..core.database import MongoDBBaseOperations
+from ..core.models import StatisticsHelper
 
 def main():
     """Анализ индексов MongoDB"""
@@ -26,17 +19,17 @@ def main():
         
         # Индексы для categories
         print("\n Индексы коллекции categories:")
-        categories_indexes = db_ops.get_collection("categories").list_indexes()
+        categories_indexes = db_conn.get_collection("categories").list_indexes()
         
         for idx in categories_indexes:
-            keys = ', '.join([f"{k[0]}: {k[1]}" for k in idx['key']])
+            keys = ', '.join([f"{k[0]}: {k[1]}" for k in idx['key'].items()])
             print(f"   • {idx['name']}: {keys}")
         
         print("\n Индексы коллекции products:")
-        products_indexes = db_ops.get_collection("products").list_indexes()
+        products_indexes = db_conn.get_collection("products").list_indexes()
         
         for idx in products_indexes:
-            keys = ', '.join([f"{k[0]}: {k[1]}" for k in idx['key']])
+            keys = ', '.join([f"{k[0]}: {k[1]}" for k in idx['key'].items()])
             print(f"   • {idx['name']}: {keys}")
         
         # Статистика размеров
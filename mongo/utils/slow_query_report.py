@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Отчет по журналу медленных запросов, сгруппированный по форме запроса
+"""
+
+import sys
+import time
+import argparse
+
+from ..core.database import MongoDBConnection
+from ..core.slow_queries import SlowQueryRecorder
+from ..core.models import StatisticsHelper
+
+def main():
+    """Группировка медленных запросов по форме"""
+    parser = argparse.ArgumentParser(description="Отчет по медленным запросам")
+    parser.add_argument("--jsonl", help="JSONL файл журнала вместо коллекции _slow_queries")
+    parser.add_argument("--hours", type=float, help="Только записи за последние N часов")
+    parser.add_argument("--top", type=int, default=20, help="Число форм в отчете")
+    args = parser.parse_args()
+
+    since = time.time() - args.hours * 3600 if args.hours else None
+    if args.jsonl:
+        entries = SlowQueryRecorder.load(jsonl_path=args.jsonl, since=since)
+    else:
+        with MongoDBConnection() as db_conn:
+            entries = SlowQueryRecorder.load(db_conn, since=since)
+
+    print("=" * 60)
+    print(" МЕДЛЕННЫЕ ЗАПРОСЫ ПО ФОРМЕ")
+    print("=" * 60)
+    print(f"\n Записей: {StatisticsHelper.format_number(len(entries))}")
+
+    for i, group in enumerate(SlowQueryRecorder.group_by_shape(entries)[:args.top], 1):
+        print(f"\n {i}. {group['operation']} {group['collection']}: {group['count']} раз, "
+              f"всего {StatisticsHelper.format_time(group['total_ms'])}")
+        print(f"   • p50: {StatisticsHelper.format_time(group['p50_ms'])}, "
+              f"max: {StatisticsHelper.format_time(group['max_ms'])}")
+        if group["plan"] is not None:
+            print(f"   • План: {' <- '.join(str(stage) for stage in group['plan'])}")
+            print(f"   • Ключей: {group['keys_examined']}, документов: {group['docs_examined']}, "
+                  f"возвращено: {group['n_returned']}")
+            if not group["index_used"]:
+                print("   • Индекс не используется")
+            if group["in_memory_sort"]:
+                print("   • Сортировка в памяти")
+        print(f"   • Форма: {group['shape_key'][:200]}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
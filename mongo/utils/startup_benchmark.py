@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк времени старта команд по python -X importtime (гейт регрессий)
+
+Запуск из корня репозитория:
+    python -m mongo.utils.startup_benchmark [--baseline FILE] [--update-baseline]
+"""
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+repo_root = Path(__file__).parent.parent.parent
+
+# Команда -> модуль; heavy=False - запросная команда, pandas/pyarrow/numpy запрещены
+COMMANDS = {
+    "main": ("mongo.main", False),
+    "show-indexes": ("mongo.utils.show_indexes", False),
+    "2.1": ("mongo.scripts.category_navigation", False),
+    "2.2": ("mongo.scripts.product_queries", False),
+    "3": ("mongo.scripts.analytics_aggregations", False),
+    "slow-query-report": ("mongo.utils.slow_query_report", False),
+    "load": ("mongo.scripts.load_data", True),
+}
+HEAVY_MODULES = ("pandas", "pyarrow", "numpy")
+
+def measure_import(module: str) -> dict:
+    """Одно измерение: суммарное время импорта (мкс) и список загруженных модулей"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=repo_root, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+
+    modules, total_us = set(), 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: self | cumulative | <отступ>name", отступ - уровень вложенности
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        if not name[1:].startswith(" "):
+            total_us += int(cumulative_us)
+    return {"total_ms": total_us / 1000, "modules": modules}
+
+def main():
+    """Измерение старта команд и проверка бюджета/базовой линии"""
+    parser = argparse.ArgumentParser(description="Бенчмарк времени старта команд")
+    parser.add_argument("--runs", type=int, default=5, help="Повторов на команду (берется медиана)")
+    parser.add_argument("--budget-ms", type=float, default=350.0, help="Лимит времени импорта запросной команды")
+    parser.add_argument("--baseline", default=str(Path(__file__).with_name("startup_baseline.json")),
+                        help="JSON с базовыми значениями")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Допустимый рост относительно базовой линии")
+    parser.add_argument("--update-baseline", action="store_true", help="Записать текущие значения как базовые")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+
+    print("=" * 60)
+    print(" ВРЕМЯ СТАРТА КОМАНД (python -X importtime)")
+    print("=" * 60)
+    print(f"\n {'Команда':<18} | {'Импорт, мс':>10} | {'База, мс':>9} | Статус")
+    print(f" {'-'*18} | {'-'*10} | {'-'*9} | {'-'*30}")
+
+    current, failures = {}, []
+    for command, (module, heavy) in COMMANDS.items():
+        try:
+            runs = [measure_import(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            failures.append(f"{command}: {e}")
+            print(f" {command:<18} | {'-':>10} | {'-':>9} | ошибка импорта")
+            continue
+
+        elapsed = statistics.median(run["total_ms"] for run in runs)
+        current[command] = round(elapsed, 1)
+        problems = []
+
+        if not heavy:
+            loaded = sorted(m for m in HEAVY_MODULES if m in runs[0]["modules"])
+            if loaded:
+                problems.append(f"импортирует {', '.join(loaded)}")
+            if elapsed > args.budget_ms:
+                problems.append(f"> бюджета {args.budget_ms:.0f} мс")
+        base = baseline.get(command)
+        if base is not None and elapsed > base * (1 + args.tolerance):
+            problems.append(f"+{(elapsed / base - 1) * 100:.0f}% к базе")
+
+        status = "; ".join(problems) if problems else "ok"
+        base_text = f"{base:.1f}" if base is not None else "-"
+        print(f" {command:<18} | {elapsed:>10.1f} | {base_text:>9} | {status}")
+        failures.extend(f"{command}: {problem}" for problem in problems)
+
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"\n Базовая линия записана: {baseline_path}")
+        return 0
+
+    if failures:
+        print("\n Регрессии времени старта:")
+        for failure in failures:
+            print(f"   • {failure}")
+        return 1
+
+    print("\n Время старта в пределах бюджета")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
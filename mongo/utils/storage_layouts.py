@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Эксперимент с вариантами хранения products: сжатие блоков, префиксное сжатие индексов, схема
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+from ..core.database import MongoDBConnection
+from ..core.storage_layout import StorageLayoutExperiment, all_variants, BLOCK_COMPRESSORS, SCHEMAS
+from ..core.models import StatisticsHelper
+
+def parse_prefix(value: str) -> list:
+    """on,off -> [True, False]"""
+    options = {"on": True, "off": False}
+    return [options[item.strip()] for item in value.split(",") if item.strip()]
+
+def main():
+    """Материализация каталога в коллекции layout_* и сравнение стоимости и задержек"""
+    parser = argparse.ArgumentParser(description="Сравнение вариантов хранения products")
+    parser.add_argument("--compressors", default=",".join(BLOCK_COMPRESSORS), help="block_compressor: snappy,zstd,none")
+    parser.add_argument("--prefix", default="on,off", help="Префиксное сжатие индексов: on,off")
+    parser.add_argument("--schemas", default=",".join(str(s) for s in SCHEMAS), help="Схема products: 1 (breadcrumbs), 2 (path_ids)")
+    parser.add_argument("--source", default="products", help="Исходная коллекция (схема v1)")
+    parser.add_argument("--limit", type=int, default=0, help="Ограничить число документов")
+    parser.add_argument("--repeats", type=int, default=5, help="Повторов каждого запроса")
+    parser.add_argument("--latency-weight", type=float, default=0.5, help="Вес задержки в оценке (0..1)")
+    parser.add_argument("--output", help="JSON с результатами")
+    parser.add_argument("--keep", action="store_true", help="Не удалять коллекции layout_*")
+    args = parser.parse_args()
+
+    variants = all_variants(
+        [c.strip() for c in args.compressors.split(",") if c.strip()],
+        parse_prefix(args.prefix),
+        [int(s) for s in args.schemas.split(",") if s.strip()],
+    )
+
+    with MongoDBConnection() as db_conn:
+        experiment = StorageLayoutExperiment(db_conn, variants, source=args.source, repeats=args.repeats)
+
+        print("=" * 60)
+        print(" ВАРИАНТЫ ХРАНЕНИЯ PRODUCTS")
+        print("=" * 60)
+        print(f"\n Вариантов: {len(variants)}, источник: {args.source}")
+
+        try:
+            results = experiment.run(args.limit, args.latency_weight)
+        finally:
+            if not args.keep:
+                experiment.cleanup()
+
+    print(f"\n {'Коллекция':<24} | {'Диск, MB':>8} | {'Данные, MB':>10} | {'Индексы, MB':>11} | "
+          f"{'док/с':>8} | {'Σ p50, мс':>9} | {'Оценка':>6}")
+    print(f" {'-'*24} | {'-'*8} | {'-'*10} | {'-'*11} | {'-'*8} | {'-'*9} | {'-'*6}")
+    for result in results:
+        marker = " *" if result["pareto"] else ""
+        warning = " (сжатие не применено)" if not result["compressor_applied"] else ""
+        print(f" {result['collection']:<24} | {result['storage_bytes'] / 1024**2:>8.1f} | "
+              f"{result['data_bytes'] / 1024**2:>10.1f} | {result['index_bytes'] / 1024**2:>11.1f} | "
+              f"{result['docs_per_sec']:>8,} | {result['total_latency_ms']:>9.1f} | {result['score']:>6.2f}{marker}{warning}")
+
+    print("\n Задержка p50 по запросам:")
+    for result in results:
+        latencies = ", ".join(f"{name}: {StatisticsHelper.format_time(ms)}" for name, ms in result["latency_ms"].items())
+        print(f"   • {result['collection']}: {latencies}")
+
+    best = results[0]
+    print(f"\n * - Парето-оптимальные варианты (нет варианта дешевле и быстрее одновременно)")
+    print(f" Рекомендация: {best['collection']} (block_compressor={best['block_compressor']}, "
+          f"prefix_compression={'on' if best['prefix_compression'] else 'off'}, схема v{best['schema_version']})")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2))
+        print(f" Результаты: {args.output}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Счетчики товаров по категориям через change stream (mongo.core.change_streams)
+
+Сквозным тестам нужен single-node replica set, без него они пропускаются:
+    docker compose --profile replset up -d mongodb-rs
+    python -m pytest tests/test_category_counts.py
+"""
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from mongo.core.change_streams import CategoryCountMaintainer, ConsumerLeaseHeld, ROLLUPS
+from mongo.core.database import MongoDBConnection, MongoDBBaseOperations
+from mongo.scripts.category_counts_consumer import REPLSET_URI
+
+TEST_DATABASE = "ecommerce_test_category_counts"
+
+CATEGORIES = [
+    {"_id": "_p_1", "partner": "_p", "category_id": "1", "name": "A", "path": "Root/A", "level": 2},
+    {"_id": "_p_2", "partner": "_p", "category_id": "2", "name": "B", "path": "Root/B", "level": 2},
+]
+
+def product(i, category):
+    return {"_id": f"_p_{i}", "partner": "_p", "offer_id": str(i), "name": f"Товар {i}",
+            "category": {"id": category["category_id"], "name": category["name"], "full_path": category["path"]}}
+
+def event(operation, before=None, after=None):
+    return {"operationType": operation, "fullDocumentBeforeChange": before, "fullDocument": after}
+
+# --- event_deltas ---
+
+def test_insert_and_delete_deltas():
+    doc = product(100, CATEGORIES[0])
+    key = ("_p", "1", "Root/A")
+    assert CategoryCountMaintainer.event_deltas(event("insert", after=doc)) == [(key, 1)]
+    assert CategoryCountMaintainer.event_deltas(event("delete", before=doc)) == [(key, -1)]
+
+def test_move_between_categories():
+    before, after = product(100, CATEGORIES[0]), product(100, CATEGORIES[1])
+    assert CategoryCountMaintainer.event_deltas(event("update", before, after)) == [
+        (("_p", "1", "Root/A"), -1), (("_p", "2", "Root/B"), 1)
+    ]
+
+def test_update_without_category_change_is_ignored():
+    doc = product(100, CATEGORIES[0])
+    renamed = dict(doc, name="Другое имя")
+    assert CategoryCountMaintainer.event_deltas(event("update", doc, renamed)) == []
+    # delete без pre-image: категория неизвестна
+    assert CategoryCountMaintainer.event_deltas(event("delete")) == []
+
+# --- сквозные тесты на replica set ---
+
+@pytest.fixture
+def db_ops():
+    client = MongoClient(REPLSET_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("replica set недоступен")
+    finally:
+        client.close()
+
+    with MongoDBConnection(REPLSET_URI, TEST_DATABASE) as conn:
+        conn.client.drop_database(TEST_DATABASE)
+        db = conn.db
+        # Устаревшие счетчики: пересчет должен их перезаписать
+        db.categories.insert_many([dict(c, metadata={"total_products": 100}) for c in CATEGORIES])
+        db.products.insert_many([product(1, CATEGORIES[0]), product(2, CATEGORIES[0]), product(3, CATEGORIES[1])])
+        yield MongoDBBaseOperations(conn)
+        conn.client.drop_database(TEST_DATABASE)
+
+def counts(db_ops):
+    db = db_ops.connection.db
+    categories = {c["_id"]: c["metadata"]["total_products"] for c in db.categories.find()}
+    rollups = {r["_id"]: r["total_products"] for r in db[ROLLUPS].find()}
+    return categories, rollups
+
+def true_counts(db_ops):
+    categories = {c["_id"]: 0 for c in CATEGORIES}
+    for doc in db_ops.connection.db.products.find():
+        categories[f"{doc['partner']}_{doc['category']['id']}"] += 1
+    return categories
+
+def test_rebuild_resets_stale_counts(db_ops):
+    maintainer = CategoryCountMaintainer(db_ops)
+    maintainer.enable_pre_images()
+    maintainer.rebuild_rollups()
+
+    categories, rollups = counts(db_ops)
+    assert categories == {"_p_1": 2, "_p_2": 1}
+    assert rollups == {"_p:Root": 3, "_p:Root/A": 2, "_p:Root/B": 1}
+
+def test_events_between_rebuild_and_stream_start_are_counted_once(db_ops):
+    maintainer = CategoryCountMaintainer(db_ops)
+    maintainer.enable_pre_images()
+    maintainer.rebuild_rollups()
+
+    # Изменения до запуска потока: раньше они терялись
+    products = db_ops.connection.db.products
+    products.insert_many([product(4, CATEGORIES[0]), product(5, CATEGORIES[0])])
+    products.update_one({"_id": "_p_1"}, {"$set": {"category": product(1, CATEGORIES[1])["category"]}})
+
+    assert maintainer.run(idle_timeout_sec=1) == 3
+    categories, rollups = counts(db_ops)
+    assert categories == true_counts(db_ops) == {"_p_1": 3, "_p_2": 2}
+    assert rollups["_p:Root"] == 5
+
+    # Повторный запуск продолжает с сохраненного token и ничего не пересчитывает
+    assert maintainer.run(idle_timeout_sec=1) == 0
+    assert counts(db_ops)[0] == true_counts(db_ops)
+
+def test_rebuild_discards_previous_resume_token(db_ops):
+    maintainer = CategoryCountMaintainer(db_ops)
+    maintainer.enable_pre_images()
+    maintainer.rebuild_rollups()
+    maintainer.run(idle_timeout_sec=1)
+
+    # События после сохраненного token уже войдут в новый пересчет
+    products = db_ops.connection.db.products
+    products.insert_one(product(6, CATEGORIES[1]))
+    products.delete_one({"_id": "_p_2"})
+    maintainer.rebuild_rollups()
+
+    assert maintainer.run(idle_timeout_sec=1) == 0
+    categories, rollups = counts(db_ops)
+    assert categories == true_counts(db_ops) == {"_p_1": 1, "_p_2": 2}
+    assert rollups["_p:Root"] == 3
+
+def test_rebuild_refuses_while_consumer_holds_lease(db_ops):
+    consumer = CategoryCountMaintainer(db_ops)
+    consumer.enable_pre_images()
+    consumer.rebuild_rollups()
+    consumer._acquire_lease("consumer")  # как внутри работающего run()
+
+    other = CategoryCountMaintainer(db_ops)
+    with pytest.raises(ConsumerLeaseHeld):
+        other.rebuild_rollups()
+    with pytest.raises(ConsumerLeaseHeld):
+        other.run(idle_timeout_sec=1)
+
+    # После остановки потребителя пересчет проходит
+    consumer._release_lease()
+    other.rebuild_rollups()
+    assert counts(db_ops)[0] == true_counts(db_ops)
+
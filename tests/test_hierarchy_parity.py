@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Сверка NumPy-движка иерархии (mongo.core.hierarchy_engine) с агрегациями сервисов
+
+Ожидаемые значения считаются по документам загрузчика (DataLoaderService) так же,
+как их считают pipeline AnalyticsService/ProductQueryService - MongoDB не нужна.
+"""
+
+import pandas as pd
+
+from mongo.core.hierarchy_engine import HierarchyAnalyticsEngine
+from mongo.core.services import DataLoaderService
+from mongo.utils.check_hierarchy_parity import check_skipped_rows, compare_ranked
+
+ROWS = [
+    # Partner_Name, Offer_ID, Category_ID, Category_FullPathName
+    ("_ozon", 1, 10, "Дом\\Кухня\\Посуда"),
+    ("_ozon", 2, 10, "Дом\\Кухня\\Посуда"),
+    ("_ozon", 3, 11, "Дом\\Кухня"),
+    ("_ozon", 4, 12, "Дом\\Сад"),
+    ("_ozon", 5, 20, "Электроника\\Телефоны"),
+    ("_ozon", 6, 20, "Электроника\\Телефоны"),
+    ("_ozon", 7, 20, "Электроника\\Телефоны"),
+    ("_wb", 1, 10, "Дом\\Кухня\\Посуда"),
+    ("_wb", 2, 30, "Одежда"),
+]
+
+def catalog(rows=ROWS) -> pd.DataFrame:
+    return pd.DataFrame([
+        {"Partner_Name": partner, "Offer_ID": offer_id, "Offer_Name": f"Товар {offer_id}", "Offer_Type": "t",
+         "Category_ID": category_id, "Category_FullPathName": path}
+        for partner, offer_id, category_id, path in rows
+    ])
+
+def mongo_hierarchy_stats(categories):
+    """$unwind path_array + $group по (level, name) с суммой total_products"""
+    totals = {}
+    for doc in categories:
+        for name in doc["path_array"]:
+            key = (doc["level"], name)
+            totals[key] = totals.get(key, 0) + doc["metadata"]["total_products"]
+    return [{"_id": {"level": level, "name": name}, "products": count} for (level, name), count in totals.items()]
+
+def mongo_partner_stats(categories):
+    """$group по (partner, level), сортировка по partner и level"""
+    stats = {}
+    for doc in categories:
+        entry = stats.setdefault((doc["partner"], doc["level"]), [0, 0])
+        entry[0] += 1
+        entry[1] += doc["metadata"]["total_products"]
+    return [{"_id": {"partner": partner, "level": level}, "categories": c, "products": p}
+            for (partner, level), (c, p) in sorted(stats.items())]
+
+def mongo_first_level(products):
+    """$group по первой хлебной крошке товара"""
+    counts = {}
+    for doc in products:
+        name = doc["category"]["breadcrumbs"][0]["name"]
+        counts[name] = counts.get(name, 0) + 1
+    return [{"category_name": name, "product_count": count} for name, count in counts.items()]
+
+def test_engine_matches_service_aggregations():
+    df = catalog()
+    categories, _ = DataLoaderService._category_documents(df)
+    products = DataLoaderService._product_documents(df)
+    engine = HierarchyAnalyticsEngine.from_dataframe(df)
+
+    assert check_skipped_rows(engine)
+    assert len(engine.product_cat) == len(products)
+    assert compare_ranked(mongo_hierarchy_stats(categories), engine.get_hierarchy_stats().documents, "products")
+    assert engine.get_partner_stats().documents == mongo_partner_stats(categories)
+    assert compare_ranked(mongo_first_level(products),
+                          engine.aggregate_by_first_level_categories().documents, "product_count")
+
+def test_conflicting_category_path_fails_parity():
+    # Тот же (partner, Category_ID) с другим путем: движок берет первый путь
+    df = catalog(ROWS + [("_ozon", 8, 12, "Дом\\Баня")])
+    engine = HierarchyAnalyticsEngine.from_dataframe(df)
+
+    assert engine.conflicting_categories == 1
+    assert not check_skipped_rows(engine)
+
+def test_products_without_category_fail_parity():
+    categories = [("_ozon", 10, ["Дом", "Кухня"])]
+    products = [("_ozon", 10), ("_ozon", 99), ("_wb", 10)]
+    engine = HierarchyAnalyticsEngine(categories, products)
+
+    assert engine.skipped_products == 2
+    assert len(engine.product_cat) == 1
+    assert not check_skipped_rows(engine)
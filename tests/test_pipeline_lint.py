@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Переписывания и статистика explain анализатора агрегаций (mongo.core.pipeline_lint)
+"""
+
+from mongo.core.pipeline_lint import PipelineAnalyzer
+
+analyzer = PipelineAnalyzer()
+
+def moved(pipeline):
+    return analyzer.optimize(pipeline)[0] != pipeline
+
+# --- $match перед $project/$addFields ---
+
+def test_match_moves_before_project_that_keeps_field():
+    pipeline = [{"$project": {"category.id": 1, "name": 1}}, {"$match": {"category.id": "5"}}]
+    assert analyzer.optimize(pipeline)[0] == [pipeline[1], pipeline[0]]
+
+def test_match_on_parent_of_kept_path_moves():
+    assert moved([{"$project": {"category": 1}}, {"$match": {"category.id": "5"}}])
+
+def test_match_on_sibling_path_stays():
+    # Проекция убирает category.id: $match после нее ничего не находит
+    assert not moved([{"$project": {"category.name": 1}}, {"$match": {"category.id": "5"}}])
+
+def test_match_on_whole_object_stays():
+    # {"category.name": 1} урезает category - сравнение всего объекта меняется
+    assert not moved([{"$project": {"category.name": 1}}, {"$match": {"category": {"name": "A"}}}])
+
+def test_match_on_similar_name_stays():
+    assert not moved([{"$project": {"cat": 1}}, {"$match": {"category": "A"}}])
+
+def test_match_on_excluded_id_stays():
+    assert not moved([{"$project": {"_id": 0, "name": 1}}, {"$match": {"_id": 5}}])
+    assert moved([{"$project": {"name": 1}}, {"$match": {"_id": 5}}])
+
+def test_match_on_computed_path_stays():
+    assert not moved([{"$addFields": {"category.id": "$x"}}, {"$match": {"category.id": "5"}}])
+    assert not moved([{"$addFields": {"category": "$x"}}, {"$match": {"category.id": "5"}}])
+    assert not moved([{"$addFields": {"category.id": "$x"}}, {"$match": {"category": None}}])
+    assert moved([{"$addFields": {"category.depth": "$x"}}, {"$match": {"category.id": "5"}}])
+
+# --- $project перед $sort ---
+
+def grouped(project, sort):
+    return [{"$group": {"_id": "$a", "n": {"$first": "$n"}}}, {"$sort": sort}, {"$project": project}, {"$limit": 5}]
+
+def test_project_moves_before_sort_when_sort_keys_kept():
+    assert moved(grouped({"n": 1}, {"n.a": 1}))
+
+def test_project_keeping_sibling_path_stays_after_sort():
+    assert not moved(grouped({"n.b": 1}, {"n.a": 1}))
+
+def test_project_without_limit_stays_after_sort():
+    assert not moved(grouped({"n": 1}, {"n": 1})[:-1])
+
+# --- статистика explain ---
+
+def test_explain_stats_for_pipeline_stages():
+    explain = {"stages": [
+        {"$cursor": {"executionStats": {"executionStages": {"stage": "IXSCAN", "nReturned": 10}}}},
+        {"$group": {}, "usedDisk": True, "spills": 2, "executionTimeMillisEstimate": 15},
+    ]}
+    assert [entry["stage"] for entry in PipelineAnalyzer.explain_stats(explain)] == ["IXSCAN", "$cursor", "$group"]
+    assert PipelineAnalyzer.explain_stats(explain)[-1]["usedDisk"] is True
+
+def test_explain_stats_for_fully_pushed_down_pipeline():
+    # MongoDB 7.0 SBE: нет "stages", сброс на диск в дереве executionStats
+    explain = {
+        "queryPlanner": {"winningPlan": {"queryPlan": {"stage": "GROUP"}}},
+        "executionStats": {"executionStages": {
+            "stage": "group", "usedDisk": True, "spills": 3, "executionTimeMillisEstimate": 40,
+            "inputStage": {"stage": "ixseek", "nReturned": 1000},
+        }},
+    }
+    stats = PipelineAnalyzer.explain_stats(explain)
+    assert [entry["stage"] for entry in stats] == ["group", "ixseek"]
+    assert stats[0]["usedDisk"] is True and stats[0]["spills"] == 3 and stats[0]["time_ms"] == 40
+
+def test_explain_stats_from_query_planner_only():
+    explain = {"queryPlanner": {"winningPlan": {"queryPlan": {
+        "stage": "GROUP", "inputStage": {"stage": "COLLSCAN"}}}}}
+    assert [entry["stage"] for entry in PipelineAnalyzer.explain_stats(explain)] == ["GROUP", "COLLSCAN"]